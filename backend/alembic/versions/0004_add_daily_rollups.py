@@ -0,0 +1,77 @@
+"""add daily_rollups table for dashboard summaries"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0004_add_daily_rollups"
+down_revision = "0003_add_predicted_fields"
+branch_labels = None
+depends_on = None
+
+TRANSACTION_TYPES = ("income", "expense", "transfer")
+
+# The aggregation rollups.rebuild() performed at this revision, as one
+# INSERT ... SELECT per dialect. local_date is the Asia/Jakarta day of the
+# naive-UTC occurred_at (Jakarta has no DST, so +7 hours on SQLite).
+BACKFILL_SQL = {
+    "postgresql": """
+        INSERT INTO daily_rollups (id, user_id, local_date, category_id, type, amount_sum, tx_count)
+        SELECT gen_random_uuid()::text, user_id, local_date, category_id, type, amount_sum, tx_count
+        FROM (
+            SELECT user_id,
+                   (occurred_at AT TIME ZONE 'UTC' AT TIME ZONE 'Asia/Jakarta')::date AS local_date,
+                   category_id, type, SUM(amount) AS amount_sum, COUNT(*) AS tx_count
+            FROM transactions
+            GROUP BY 1, 2, 3, 4
+        ) AS totals
+    """,
+    "sqlite": """
+        INSERT INTO daily_rollups (id, user_id, local_date, category_id, type, amount_sum, tx_count)
+        SELECT lower(hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-' || hex(randomblob(2)) || '-'
+                     || hex(randomblob(2)) || '-' || hex(randomblob(6))),
+               user_id, local_date, category_id, type, amount_sum, tx_count
+        FROM (
+            SELECT user_id, date(occurred_at, '+7 hours') AS local_date,
+                   category_id, type, SUM(amount) AS amount_sum, COUNT(*) AS tx_count
+            FROM transactions
+            GROUP BY 1, 2, 3, 4
+        )
+    """,
+}
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_rollups",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("local_date", sa.Date(), nullable=False),
+        sa.Column("category_id", sa.String(), nullable=True),
+        sa.Column(
+            "type",
+            # The enum type already exists on Postgres (created with transactions in 0001).
+            sa.Enum(*TRANSACTION_TYPES, name="transactiontype").with_variant(
+                postgresql.ENUM(*TRANSACTION_TYPES, name="transactiontype", create_type=False),
+                "postgresql",
+            ),
+            nullable=False,
+        ),
+        sa.Column("amount_sum", sa.Numeric(16, 2), nullable=False),
+        sa.Column("tx_count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_daily_rollups_user_date",
+        "daily_rollups",
+        ["user_id", "local_date"],
+        unique=False,
+    )
+
+    # Backfill from existing transactions.
+    op.execute(BACKFILL_SQL[op.get_bind().dialect.name])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_daily_rollups_user_date", table_name="daily_rollups")
+    op.drop_table("daily_rollups")
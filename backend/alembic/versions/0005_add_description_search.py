@@ -0,0 +1,78 @@
+"""add description search index (pg_trgm on Postgres, FTS5 trigram on SQLite)"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0005_add_description_search"
+down_revision = "0004_add_daily_rollups"
+branch_labels = None
+depends_on = None
+
+# pg_trgm GIN index on Postgres; on SQLite an FTS5 trigram table keyed on
+# transaction ids through transactions_fts_keys, kept in sync by triggers.
+POSTGRES_UP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)",
+)
+SQLITE_UP = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5(
+        id UNINDEXED, description, tokenize='trigram'
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS transactions_fts_keys (tx_id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL)",
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO transactions_fts(id, description) VALUES (new.id, new.description);
+        INSERT INTO transactions_fts_keys(tx_id, fts_rowid) VALUES (new.id, last_insert_rowid());
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+        DELETE FROM transactions_fts
+        WHERE rowid = (SELECT fts_rowid FROM transactions_fts_keys WHERE tx_id = old.id);
+        DELETE FROM transactions_fts_keys WHERE tx_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description ON transactions BEGIN
+        UPDATE transactions_fts SET description = new.description
+        WHERE rowid = (SELECT fts_rowid FROM transactions_fts_keys WHERE tx_id = new.id);
+    END
+    """,
+    # Index rows that existed before the triggers.
+    "INSERT INTO transactions_fts(id, description) SELECT id, description FROM transactions",
+    "INSERT INTO transactions_fts_keys(tx_id, fts_rowid) SELECT id, rowid FROM transactions_fts",
+)
+SQLITE_DOWN = (
+    "DROP TRIGGER IF EXISTS transactions_fts_ai",
+    "DROP TRIGGER IF EXISTS transactions_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_fts_au",
+    "DROP TABLE IF EXISTS transactions_fts_keys",
+    "DROP TABLE IF EXISTS transactions_fts",
+)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        for statement in POSTGRES_UP:
+            op.execute(statement)
+    elif dialect == "sqlite":
+        # The trigram tokenizer needs SQLite >= 3.34 with FTS5; without it search stays unindexed (ILIKE).
+        bind = op.get_bind()
+        version = bind.exec_driver_sql("SELECT sqlite_version()").scalar()
+        fts5 = bind.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar()
+        if not fts5 or tuple(int(part) for part in version.split(".")[:2]) < (3, 34):
+            return
+        for statement in SQLITE_UP:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_transactions_description_trgm")
+    elif dialect == "sqlite":
+        for statement in SQLITE_DOWN:
+            op.execute(statement)
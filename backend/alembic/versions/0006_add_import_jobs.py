@@ -0,0 +1,47 @@
+"""add import_jobs table for CSV/Excel imports"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "0006_add_import_jobs"
+down_revision = "0005_add_description_search"
+branch_labels = None
+depends_on = None
+
+IMPORT_STATUSES = ("pending", "running", "completed", "failed")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("source", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=True),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("default_account_id", sa.String(), nullable=True),
+        sa.Column("status", sa.Enum(*IMPORT_STATUSES, name="importstatus"), nullable=False),
+        sa.Column("total_rows", sa.Integer(), nullable=True),
+        sa.Column("processed_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("created_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("failed_rows", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("summary", sa.JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_import_jobs_user_created_at",
+        "import_jobs",
+        ["user_id", "created_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_import_jobs_user_created_at", table_name="import_jobs")
+    op.drop_table("import_jobs")
+    sa.Enum(*IMPORT_STATUSES, name="importstatus").drop(op.get_bind(), checkfirst=True)
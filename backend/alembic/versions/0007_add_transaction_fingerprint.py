@@ -0,0 +1,31 @@
+"""add transactions.fingerprint for duplicate detection on bulk/imported rows"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_transaction_fingerprint"
+down_revision = "0006_add_import_jobs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows keep NULL: they were never deduplicated, so backfilling could
+    # collide on the unique index. Only new bulk/imported rows get a fingerprint.
+    op.add_column("transactions", sa.Column("fingerprint", sa.String(length=64), nullable=True))
+    op.create_index(
+        "ux_transactions_user_fingerprint",
+        "transactions",
+        ["user_id", "fingerprint"],
+        unique=True,
+    )
+    op.add_column(
+        "import_jobs", sa.Column("duplicate_rows", sa.Integer(), nullable=False, server_default="0")
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("import_jobs", "duplicate_rows")
+    op.drop_index("ux_transactions_user_fingerprint", table_name="transactions")
+    op.drop_column("transactions", "fingerprint")
@@ -0,0 +1,234 @@
+"""
+Pickle-free, memory-mappable export of the TF-IDF + linear category model.
+
+Layout of an export directory:
+  - manifest.json   -> labels, tokenizer settings, probability mode, dtype
+  - vocab.txt       -> one vocabulary term per line, line number = feature index
+  - idf.npy         -> float32[n_features]
+  - coef.npy        -> float32 or int8 [n_features, n_outputs] (feature-major)
+  - coef_scale.npy  -> float32[n_outputs], only when int8-quantized
+  - intercept.npy   -> float32[n_outputs]
+
+Arrays are opened with np.load(mmap_mode="r") so every worker process shares
+the same page-cache pages. Scoring uses NumPy only; scikit-learn is needed
+for exporting, never for serving.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+
+
+@dataclass
+class SparseRows:
+    """Minimal CSR matrix: row i spans indices/data[indptr[i]:indptr[i + 1]]."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    data: np.ndarray
+    n_cols: int
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return (len(self.indptr) - 1, self.n_cols)
+
+
+class ArrayTfidfVectorizer:
+    """Re-implements TfidfVectorizer.transform for the word analyzer on exported arrays."""
+
+    def __init__(
+        self,
+        vocabulary: dict[str, int],
+        idf: np.ndarray,
+        ngram_range: tuple[int, int] = (1, 1),
+        lowercase: bool = True,
+        token_pattern: str = r"(?u)\b\w\w+\b",
+        norm: str | None = "l2",
+        sublinear_tf: bool = False,
+    ):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.ngram_range = ngram_range
+        self.lowercase = lowercase
+        self.token_regex = re.compile(token_pattern)
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+
+    def _features(self, text: str) -> dict[int, int]:
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_regex.findall(text)
+        counts: dict[int, int] = {}
+        vocab = self.vocabulary
+        min_n, max_n = self.ngram_range
+        n_tokens = len(tokens)
+        for n in range(min_n, min(max_n, n_tokens) + 1):
+            for i in range(n_tokens - n + 1):
+                term = tokens[i] if n == 1 else " ".join(tokens[i : i + n])
+                idx = vocab.get(term)
+                if idx is not None:
+                    counts[idx] = counts.get(idx, 0) + 1
+        return counts
+
+    def transform(self, texts: Sequence[str]) -> SparseRows:
+        indptr = [0]
+        indices: list[int] = []
+        counts: list[int] = []
+        for text in texts:
+            feats = self._features(text or "")
+            indices.extend(feats.keys())
+            counts.extend(feats.values())
+            indptr.append(len(indices))
+
+        indptr_arr = np.asarray(indptr, dtype=np.int64)
+        indices_arr = np.asarray(indices, dtype=np.int64)
+        data = np.asarray(counts, dtype=np.float32)
+        if self.sublinear_tf and data.size:
+            data = np.log(data) + 1.0
+        if data.size:
+            data *= self.idf[indices_arr]
+            if self.norm == "l2":
+                lengths = np.diff(indptr_arr)
+                nonempty = lengths > 0
+                norms = np.ones(len(lengths), dtype=np.float32)
+                norms[nonempty] = np.sqrt(np.add.reduceat(data * data, indptr_arr[:-1][nonempty]))
+                norms[norms == 0] = 1.0
+                data /= np.repeat(norms, lengths)
+        return SparseRows(indptr=indptr_arr, indices=indices_arr, data=data, n_cols=len(self.idf))
+
+
+class ArrayLinearModel:
+    """Linear scorer over a feature-major coefficient matrix (float32 or int8 + scale)."""
+
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        proba: str = "softmax",
+        coef_scale: np.ndarray | None = None,
+    ):
+        self.coef = coef
+        self.intercept = intercept
+        self.proba = proba
+        self.coef_scale = coef_scale
+
+    def decision_function(self, X: SparseRows) -> np.ndarray:
+        n_rows = X.shape[0]
+        n_out = self.coef.shape[1]
+        scores = np.zeros((n_rows, n_out), dtype=np.float32)
+        if X.data.size:
+            contrib = self.coef[X.indices].astype(np.float32, copy=False) * X.data[:, None]
+            lengths = np.diff(X.indptr)
+            nonempty = lengths > 0
+            scores[nonempty] = np.add.reduceat(contrib, X.indptr[:-1][nonempty], axis=0)
+        if self.coef_scale is not None:
+            scores *= self.coef_scale
+        scores += self.intercept
+        return scores
+
+    def predict_proba(self, X: SparseRows) -> np.ndarray:
+        scores = self.decision_function(X).astype(np.float64)
+        if self.proba == "sigmoid":
+            # Binary model: a single output column for the positive class.
+            pos = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - pos, pos])
+        if self.proba == "ovr":
+            probs = 1.0 / (1.0 + np.exp(-scores))
+            total = probs.sum(axis=1, keepdims=True)
+            return probs / np.where(total > 0, total, 1.0)
+        exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _proba_mode(model, n_outputs: int) -> str:
+    if n_outputs == 1:
+        return "sigmoid"
+    multi_class = getattr(model, "multi_class", None)
+    solver = getattr(model, "solver", None)
+    if type(model).__name__ == "LogisticRegression" and solver != "liblinear" and multi_class in ("auto", "multinomial"):
+        return "softmax"
+    return "ovr"
+
+
+def export_arrays(vectorizer, model, label_encoder: dict[str, int], out_dir: Path, quantize: bool = False) -> Path:
+    """
+    Write a fitted TfidfVectorizer + linear classifier as flat arrays into `out_dir`.
+    """
+    if getattr(vectorizer, "analyzer", "word") != "word" or not hasattr(vectorizer, "vocabulary_"):
+        raise ValueError("array export supports only a fitted word-level TfidfVectorizer")
+    if not hasattr(model, "coef_") or not hasattr(model, "intercept_"):
+        raise ValueError("array export supports only linear models with coef_/intercept_")
+
+    classes = [int(c) for c in model.classes_]
+    if classes != list(range(len(classes))):
+        raise ValueError("model classes must be the label-encoder indices 0..n-1")
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    vocab_terms = [""] * len(vectorizer.vocabulary_)
+    for term, idx in vectorizer.vocabulary_.items():
+        vocab_terms[idx] = term
+    (out_dir / "vocab.txt").write_text("\n".join(vocab_terms), encoding="utf-8")
+
+    np.save(out_dir / "idf.npy", np.asarray(vectorizer.idf_, dtype=np.float32))
+    coef = np.ascontiguousarray(np.asarray(model.coef_, dtype=np.float32).T)
+    if quantize:
+        scale = np.abs(coef).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        np.save(out_dir / "coef.npy", np.round(coef / scale).astype(np.int8))
+        np.save(out_dir / "coef_scale.npy", scale.astype(np.float32))
+    else:
+        np.save(out_dir / "coef.npy", coef)
+    np.save(out_dir / "intercept.npy", np.asarray(model.intercept_, dtype=np.float32))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "label_encoder": label_encoder,
+        "ngram_range": list(vectorizer.ngram_range),
+        "lowercase": bool(vectorizer.lowercase),
+        "token_pattern": vectorizer.token_pattern,
+        "norm": vectorizer.norm,
+        "sublinear_tf": bool(vectorizer.sublinear_tf),
+        "proba": _proba_mode(model, coef.shape[1]),
+        "quantized": bool(quantize),
+    }
+    with (out_dir / MANIFEST_NAME).open("w") as f:
+        json.dump(manifest, f)
+    return out_dir
+
+
+def load_arrays(directory: Path) -> tuple[ArrayTfidfVectorizer, ArrayLinearModel, dict[str, int]]:
+    """
+    Open an export directory with memory-mapped arrays.
+    """
+    with (directory / MANIFEST_NAME).open() as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"unsupported array format version: {manifest.get('format_version')}")
+
+    terms = (directory / "vocab.txt").read_text(encoding="utf-8").split("\n")
+    vectorizer = ArrayTfidfVectorizer(
+        vocabulary={term: idx for idx, term in enumerate(terms)},
+        idf=np.load(directory / "idf.npy", mmap_mode="r"),
+        ngram_range=tuple(manifest["ngram_range"]),
+        lowercase=manifest["lowercase"],
+        token_pattern=manifest["token_pattern"],
+        norm=manifest["norm"],
+        sublinear_tf=manifest["sublinear_tf"],
+    )
+    coef_scale = np.load(directory / "coef_scale.npy") if manifest.get("quantized") else None
+    model = ArrayLinearModel(
+        coef=np.load(directory / "coef.npy", mmap_mode="r"),
+        intercept=np.load(directory / "intercept.npy"),
+        proba=manifest["proba"],
+        coef_scale=coef_scale,
+    )
+    return vectorizer, model, manifest["label_encoder"]
@@ -0,0 +1,160 @@
+"""
+Background auto-categorization for transactions created without a category.
+
+create_transaction commits the row with the requested status, no category and
+predicted_confidence NULL ("pending"), then submits its id here. A daemon
+thread drains the queue in micro-batches and scores each batch with one
+predict_categories() call per user, which tries the user's confirmed history
+first, then the shared keyword rules, then the model. It fills
+predicted_category_id/predicted_confidence and, on a match, sets category_id
+and status=predicted as inline prediction does; a row with no match keeps its
+status and gets confidence 0, so it is no longer pending.
+"""
+
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import models, rollups
+from app.ai.category_classifier import predict_categories
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 64
+# How long the worker waits for a batch to fill after the first id arrives.
+BATCH_WAIT_SECONDS = 0.05
+RECOVERY_LIMIT = 1000
+
+
+def _pending_filter(query):
+    return query.filter(
+        models.Transaction.category_id.is_(None),
+        models.Transaction.predicted_confidence.is_(None),
+    )
+
+
+class CategorizationWorker:
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = BATCH_SIZE,
+        batch_wait: float = BATCH_WAIT_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="categorize-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, tx_id: str) -> None:
+        self._queue.put(tx_id)
+        self.start()
+
+    def drain(self, timeout: float = 5.0) -> bool:
+        """Block until every submitted id has been processed; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def requeue_pending(self, limit: int = RECOVERY_LIMIT) -> int:
+        """Submit rows left pending by a previous process (e.g. after a crash)."""
+        db = self.session_factory()
+        try:
+            ids = [
+                row.id
+                for row in _pending_filter(db.query(models.Transaction.id))
+                .order_by(models.Transaction.created_at)
+                .limit(limit)
+            ]
+        finally:
+            db.close()
+        for tx_id in ids:
+            self._queue.put(tx_id)
+        return len(ids)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("Auto-categorization batch of %d failed", len(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _process(self, ids: list[str]) -> None:
+        """Score the still-pending rows among `ids` (history -> rules -> model) and commit."""
+        db = self.session_factory()
+        try:
+            rows = _pending_filter(db.query(models.Transaction).filter(models.Transaction.id.in_(ids))).all()
+            if not rows:
+                return
+            by_user: dict[str, list[models.Transaction]] = {}
+            for tx in rows:
+                by_user.setdefault(tx.user_id, []).append(tx)
+            for user_id, user_rows in by_user.items():
+                results = predict_categories(
+                    [tx.description or "" for tx in user_rows], user_id=user_id, db=db
+                )
+                for tx, result in zip(user_rows, results):
+                    tx.predicted_category_id = result.category_id
+                    tx.predicted_confidence = result.confidence
+                    if result.category_id:
+                        # Move the amount from the uncategorized rollup to the predicted category.
+                        rollups.apply_transaction(db, tx, sign=-1)
+                        tx.category_id = result.category_id
+                        tx.status = models.TransactionStatus.predicted
+                        rollups.apply_transaction(db, tx)
+            db.commit()
+            for user_id, user_rows in by_user.items():
+                rollups.invalidate_cached(user_id, [rollups.local_date_of(tx.occurred_at) for tx in user_rows])
+            self.processed += len(rows)
+            self.batches += 1
+        finally:
+            db.close()
+
+
+categorization_worker = CategorizationWorker()
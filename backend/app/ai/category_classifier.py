@@ -3,18 +3,27 @@ Baseline category classifier utilities (TF-IDF + Linear model).
 
 Provides:
   - train(texts, labels, threshold) -> saves artifacts to ml_artifacts/
-  - load_model() -> lazy load artifacts
+    (joblib pickle, or memory-mapped arrays with artifact_format="arrays")
+  - load_model() -> resident classifier, reloaded when artifacts change
+  - model_stats() -> load count/age of the resident classifier
+  - prediction_cache_stats() -> hit/miss counters of the description LRU cache
+  - export_current_to_arrays() -> convert joblib artifacts to the array format
   - predict(input) -> category_id | None with confidence/top_k
+  - predict_many(inputs) -> vectorized predict for a batch of descriptions
 """
 
 from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Sequence
 
 import numpy as np
 
@@ -26,6 +35,10 @@ ROOT_DIR = Path(__file__).resolve().parents[2]  # backend/
 ARTIFACT_DIR = ROOT_DIR / "ml_artifacts"
 MODEL_PATH = ARTIFACT_DIR / "category_model.pkl"
 META_PATH = ARTIFACT_DIR / "category_meta.json"
+ARRAY_DIR_NAME = "category_arrays"
+# Minimum seconds between stat() checks of the artifacts on the hot path.
+MODEL_REVALIDATE_SECONDS = 2.0
+PREDICTION_CACHE_SIZE = 10_000
 
 
 def _threshold_default() -> float:
@@ -41,6 +54,7 @@ class PredictionResult:
     confidence: float
     top_k: list[tuple[str, float]]
     model_version: str | None = None
+    source: str = "model"  # model | rule | user
 
 
 class CategoryClassifier:
@@ -55,58 +69,136 @@ class CategoryClassifier:
     def predict(self, text: str, top_k: int = 3) -> PredictionResult:
         if not text:
             return PredictionResult(category_id=None, confidence=0.0, top_k=[], model_version=self.model_version)
-
-        X = self.vectorizer.transform([text])
+        return self.predict_many([text], top_k=top_k)[0]
+
+    def predict_many(self, texts: Sequence[str], top_k: int = 3) -> list[PredictionResult]:
+        """
+        Vectorized prediction: one transform, one scoring pass and an
+        argpartition top-k over the whole batch. Empty texts yield empty results.
+        """
+        results: list[Optional[PredictionResult]] = [None] * len(texts)
+        idx = [i for i, text in enumerate(texts) if text]
+        if idx:
+            X = self.vectorizer.transform([texts[i] for i in idx])
+            probs = self._probabilities(X, len(idx))
+            n_classes = probs.shape[1]
+            k = max(0, min(top_k, n_classes))
+            best = probs.argmax(axis=1) if n_classes else np.zeros(len(idx), dtype=int)
+            if k:
+                top_idx = np.argpartition(-probs, k - 1, axis=1)[:, :k]
+                top_scores = np.take_along_axis(probs, top_idx, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind="stable")
+                top_idx = np.take_along_axis(top_idx, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for row, i in enumerate(idx):
+                confidence = float(probs[row, best[row]]) if n_classes else 0.0
+                top = []
+                if k:
+                    for label_idx, score in zip(top_idx[row].tolist(), top_scores[row].tolist()):
+                        label = self.index_to_label.get(label_idx)
+                        if label is not None:
+                            top.append((label, float(score)))
+                category_id = self.index_to_label.get(int(best[row])) if confidence >= self.threshold else None
+                results[i] = PredictionResult(
+                    category_id=category_id,
+                    confidence=confidence,
+                    top_k=top,
+                    model_version=self.model_version,
+                )
+        empty = PredictionResult(category_id=None, confidence=0.0, top_k=[], model_version=self.model_version)
+        return [r if r is not None else empty for r in results]
+
+    def _probabilities(self, X, n_rows: int) -> np.ndarray:
         if hasattr(self.model, "predict_proba"):
-            probs = self.model.predict_proba(X)[0]
-        elif hasattr(self.model, "decision_function"):
-            scores = self.model.decision_function(X)
+            return np.asarray(self.model.predict_proba(X))
+        if hasattr(self.model, "decision_function"):
+            scores = np.asarray(self.model.decision_function(X))
+            if scores.ndim == 1:
+                scores = np.column_stack([-scores, scores])
             # Convert decision scores to pseudo-probabilities
-            exp = np.exp(scores - np.max(scores))
-            probs = exp / exp.sum()
-        else:
-            probs = np.zeros(len(self.index_to_label))
+            exp = np.exp(scores - scores.max(axis=1, keepdims=True))
+            return exp / exp.sum(axis=1, keepdims=True)
+        return np.zeros((n_rows, len(self.index_to_label)))
 
-        best_idx = int(np.argmax(probs))
-        confidence = float(probs[best_idx]) if probs.size else 0.0
-        category_id = self.index_to_label.get(best_idx)
 
-        sorted_indices = np.argsort(probs)[::-1]
-        top = []
-        for idx in sorted_indices[:top_k]:
-            label = self.index_to_label.get(int(idx))
-            if label is None:
-                continue
-            top.append((label, float(probs[int(idx)])))
+def _ensure_artifact_dir():
+    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
 
-        if confidence < self.threshold:
-            return PredictionResult(category_id=None, confidence=confidence, top_k=top, model_version=self.model_version)
 
-        return PredictionResult(category_id=category_id, confidence=confidence, top_k=top, model_version=self.model_version)
+def _array_dir() -> Path:
+    return ARTIFACT_DIR / ARRAY_DIR_NAME
 
 
-def _ensure_artifact_dir():
-    ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+def _artifact_signature() -> Optional[tuple[int, int, int]]:
+    # META_PATH is written last on every publish, so it alone marks a new version;
+    # the pickle is included to catch artifacts copied in by hand.
+    try:
+        meta_stat = META_PATH.stat()
+    except FileNotFoundError:
+        return None
+    try:
+        model_stat = MODEL_PATH.stat()
+        model_sig = (model_stat.st_mtime_ns, model_stat.st_size)
+    except FileNotFoundError:
+        model_sig = (0, 0)
+    return (*model_sig, meta_stat.st_mtime_ns)
 
 
-def load_model() -> Optional[CategoryClassifier]:
+def _read_meta() -> dict:
+    with META_PATH.open() as f:
+        return json.load(f)
+
+
+def _load_from_disk() -> Optional[CategoryClassifier]:
     """
-    Lazy-load classifier from artifacts. Returns None if artifacts missing or load fails.
+    Load classifier artifacts in the format named by the metadata file.
+    Returns None if artifacts missing or load fails.
     """
+    if not META_PATH.exists():
+        logger.info("Category model artifacts not found at %s", ARTIFACT_DIR)
+        return None
+
+    try:
+        meta = _read_meta()
+    except (OSError, ValueError) as exc:  # pragma: no cover
+        logger.exception("Failed to read category classifier metadata: %s", exc)
+        return None
+
+    if meta.get("format") == "arrays":
+        return _load_arrays(meta)
+    return _load_joblib(meta)
+
+
+def _load_arrays(meta: dict) -> Optional[CategoryClassifier]:
+    from app.ai.array_model import load_arrays
+
+    try:
+        vectorizer, model, label_encoder = load_arrays(_array_dir() / meta["arrays_path"])
+    except Exception as exc:  # pragma: no cover
+        logger.exception("Failed to load category classifier arrays: %s", exc)
+        return None
+    return CategoryClassifier(
+        vectorizer=vectorizer,
+        model=model,
+        label_encoder=label_encoder,
+        model_version=meta.get("model_version", "unknown"),
+        threshold=float(meta.get("threshold", _threshold_default())),
+    )
+
+
+def _load_joblib(meta: dict) -> Optional[CategoryClassifier]:
     try:
         from joblib import load
     except ImportError:
         logger.warning("joblib not installed; cannot load classifier artifacts")
         return None
 
-    if not MODEL_PATH.exists() or not META_PATH.exists():
+    if not MODEL_PATH.exists():
         logger.info("Category model artifacts not found at %s", ARTIFACT_DIR)
         return None
 
     try:
         obj = load(MODEL_PATH)
-        with META_PATH.open() as f:
-            meta = json.load(f)
         threshold = float(meta.get("threshold", _threshold_default()))
         return CategoryClassifier(
             vectorizer=obj["vectorizer"],
@@ -120,14 +212,127 @@ def load_model() -> Optional[CategoryClassifier]:
         return None
 
 
+class _ResidentModel:
+    """
+    Process-wide holder for the loaded classifier.
+
+    Readers take `self.model` without locking; reloads happen under `_lock` and
+    replace the reference in one assignment, so in-flight predictions keep using
+    the classifier they started with.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.model: Optional[CategoryClassifier] = None
+        self.signature: Optional[tuple[int, int, int]] = None
+        self.meta_key: Optional[tuple] = None
+        self.loaded = False
+        self.load_count = 0
+        self.loaded_at: Optional[float] = None
+        self.checked_at = 0.0
+
+    def get(self, force: bool = False) -> Optional[CategoryClassifier]:
+        if not force and self._fresh():
+            return self.model
+
+        with self._lock:
+            if not force and self._fresh():
+                return self.model
+            self.checked_at = time.monotonic()
+            signature = _artifact_signature()
+            if not force and self.loaded and signature == self.signature:
+                return self.model
+            if not force and self._same_version(signature):
+                # Only the metadata file was touched; keep the resident copy.
+                self.signature = signature
+                return self.model
+
+            model = _load_from_disk() if signature is not None else None
+            if model is None and signature is not None and self.model is not None:
+                # Keep serving the previous version if the new artifacts are unreadable.
+                return self.model
+            self.model = model
+            self.signature = signature
+            self.meta_key = self._meta_key() if model is not None else None
+            self.loaded = True
+            if model is not None:
+                self.load_count += 1
+                self.loaded_at = time.time()
+                logger.info("Loaded category classifier (version=%s)", model.model_version)
+            return self.model
+
+    def _fresh(self) -> bool:
+        return self.loaded and time.monotonic() - self.checked_at < MODEL_REVALIDATE_SECONDS
+
+    def _same_version(self, signature: Optional[tuple[int, int, int]]) -> bool:
+        if self.model is None or signature is None or self.signature is None:
+            return False
+        if signature[:2] != self.signature[:2]:
+            return False
+        return self.meta_key is not None and self._meta_key() == self.meta_key
+
+    @staticmethod
+    def _meta_key() -> Optional[tuple]:
+        try:
+            meta = _read_meta()
+        except (OSError, ValueError):
+            return None
+        return (meta.get("model_version"), meta.get("format", "joblib"), meta.get("arrays_path"))
+
+    def reset(self) -> None:
+        with self._lock:
+            self.model = None
+            self.signature = None
+            self.meta_key = None
+            self.loaded = False
+            self.checked_at = 0.0
+
+    def stats(self) -> dict:
+        model = self.model
+        return {
+            "loaded": model is not None,
+            "model_version": model.model_version if model is not None else None,
+            "load_count": self.load_count,
+            "loaded_at": datetime.utcfromtimestamp(self.loaded_at).isoformat() if self.loaded_at else None,
+            "age_seconds": round(time.time() - self.loaded_at, 3) if self.loaded_at else None,
+        }
+
+
+_resident = _ResidentModel()
+
+
+def load_model(force_reload: bool = False) -> Optional[CategoryClassifier]:
+    """
+    Return the resident classifier, loading it on first use.
+
+    Artifacts are re-stat'ed at most every MODEL_REVALIDATE_SECONDS and only
+    unpickled again when they changed on disk. Returns None if artifacts are
+    missing or fail to load.
+    """
+    return _resident.get(force=force_reload)
+
+
+def reset_model_cache() -> None:
+    """Drop the resident classifier; the next load_model() reads from disk."""
+    _resident.reset()
+
+
+def model_stats() -> dict:
+    """Load count/age of the resident classifier."""
+    return _resident.stats()
+
+
 def train(
     texts: Iterable[str],
     labels: Iterable[str],
     threshold: float = 0.5,
     model_version: Optional[str] = None,
+    artifact_format: str = "joblib",
+    quantize: bool = False,
 ) -> None:
     """
     Train a baseline TF-IDF + Logistic Regression classifier and persist artifacts.
+    artifact_format="arrays" writes the pickle-free, mmap-able format (optionally int8).
     """
     try:
         from sklearn.feature_extraction.text import TfidfVectorizer
@@ -157,34 +362,281 @@ def train(
     clf = LogisticRegression(max_iter=1000, multi_class="auto", n_jobs=2)
     clf.fit(X, y)
 
+    publish_artifacts(
+        vectorizer,
+        clf,
+        label_encoder,
+        model_version=model_version,
+        threshold=threshold,
+        artifact_format=artifact_format,
+        quantize=quantize,
+    )
+
+
+def publish_artifacts(
+    vectorizer,
+    model,
+    label_encoder: dict[str, int],
+    model_version: Optional[str] = None,
+    threshold: float = 0.5,
+    artifact_format: str = "joblib",
+    quantize: bool = False,
+) -> str:
+    """
+    Persist a fitted vectorizer/model pair and point the metadata file at it.
+
+    The metadata file is replaced last, which is what serving processes watch,
+    so they switch to the new version only once every artifact is in place.
+    """
+    if artifact_format not in ("joblib", "arrays"):
+        raise ValueError("artifact_format must be 'joblib' or 'arrays'")
+
     model_version = model_version or f"v{datetime.utcnow().strftime('%Y%m%d%H%M%S')}"
     _ensure_artifact_dir()
+    meta = {
+        "model_version": model_version,
+        "created_at": datetime.utcnow().isoformat(),
+        "threshold": threshold,
+        "format": artifact_format,
+    }
+
+    if artifact_format == "arrays":
+        from app.ai.array_model import export_arrays
+
+        # Each version gets its own directory; workers still mapping the old one keep valid pages.
+        export_arrays(vectorizer, model, label_encoder, _array_dir() / model_version, quantize=quantize)
+        meta["arrays_path"] = model_version
+        meta["quantized"] = quantize
+    else:
+        try:
+            from joblib import dump
+        except ImportError as exc:
+            raise RuntimeError("joblib is required to persist classifier artifacts") from exc
+
+        # Write to temp files and rename so a serving process never sees a partial artifact.
+        tmp_model = MODEL_PATH.with_suffix(".pkl.tmp")
+        dump({"vectorizer": vectorizer, "model": model, "label_encoder": label_encoder}, tmp_model)
+        os.replace(tmp_model, MODEL_PATH)
+
+    tmp_meta = META_PATH.with_suffix(".json.tmp")
+    with tmp_meta.open("w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, META_PATH)
+    logger.info(
+        "Saved category classifier artifacts to %s (version=%s, format=%s)",
+        ARTIFACT_DIR,
+        model_version,
+        artifact_format,
+    )
+    return model_version
 
+
+def export_current_to_arrays(quantize: bool = False) -> str:
+    """
+    Convert the joblib artifacts on disk to the memory-mapped array format.
+    """
     try:
-        from joblib import dump
+        from joblib import load
     except ImportError as exc:
-        raise RuntimeError("joblib is required to persist classifier artifacts") from exc
-
-    dump({"vectorizer": vectorizer, "model": clf, "label_encoder": label_encoder}, MODEL_PATH)
-    with META_PATH.open("w") as f:
-        json.dump(
-            {
-                "model_version": model_version,
-                "created_at": datetime.utcnow().isoformat(),
-                "threshold": threshold,
-            },
-            f,
+        raise RuntimeError("joblib is required to read classifier artifacts") from exc
+
+    meta = _read_meta()
+    obj = load(MODEL_PATH)
+    return publish_artifacts(
+        obj["vectorizer"],
+        obj["model"],
+        obj["label_encoder"],
+        model_version=meta.get("model_version"),
+        threshold=float(meta.get("threshold", _threshold_default())),
+        artifact_format="arrays",
+        quantize=quantize,
+    )
+
+
+def normalize_description(text: Optional[str]) -> str:
+    """Lowercase and collapse whitespace; the TF-IDF tokenizer ignores both."""
+    return " ".join((text or "").lower().split())
+
+
+class _PredictionCache:
+    """
+    Bounded LRU of PredictionResult keyed on (model_version, top_k, normalized description).
+    Emptied as soon as it sees a different model version.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: OrderedDict[tuple[str, int, str], PredictionResult] = OrderedDict()
+        self._model_version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self, model_version: str) -> None:
+        if model_version != self._model_version:
+            self._data.clear()
+            self._model_version = model_version
+
+    def get(self, model_version: str, top_k: int, text: str) -> Optional[PredictionResult]:
+        key = (model_version, top_k, text)
+        with self._lock:
+            self._check_version(model_version)
+            result = self._data.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, model_version: str, top_k: int, text: str, result: PredictionResult) -> None:
+        if self.maxsize <= 0:
+            return
+        key = (model_version, top_k, text)
+        with self._lock:
+            self._check_version(model_version)
+            self._data[key] = result
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._model_version = None
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "model_version": self._model_version,
+            }
+
+
+_prediction_cache = _PredictionCache(PREDICTION_CACHE_SIZE)
+
+
+def prediction_cache_stats() -> dict:
+    return _prediction_cache.stats()
+
+
+def clear_prediction_cache() -> None:
+    _prediction_cache.clear()
+
+
+def visible_category_ids(db, user_id: str) -> set[str]:
+    """Ids of the categories `user_id` may assign: the global ones plus their own."""
+    from app import models
+
+    category = models.Category
+    return {
+        category_id
+        for (category_id,) in db.query(category.id).filter(
+            (category.user_id == None) | (category.user_id == user_id)  # noqa: E711
         )
-    logger.info("Saved category classifier artifacts to %s (version=%s)", ARTIFACT_DIR, model_version)
+    }
+
+
+def predict_category(
+    description: str,
+    model: Optional[CategoryClassifier] = None,
+    user_id: Optional[str] = None,
+    db=None,
+) -> PredictionResult:
+    """
+    Convenience wrapper: the user's own history, then keyword rules, then load
+    model (if not provided) and predict. Passing `db` lets the user history be
+    built on first use and drops history hits, rule hits and model labels on
+    categories the user cannot see.
+    Returns category_id=None if nothing hits or below threshold.
+    Model results are served from the LRU cache when the description repeats.
+    """
+    return predict_categories([description], model=model, user_id=user_id, db=db)[0]
 
 
-def predict_category(description: str, model: Optional[CategoryClassifier] = None) -> PredictionResult:
+def predict_categories(
+    descriptions: Sequence[str],
+    model: Optional[CategoryClassifier] = None,
+    top_k: int = 3,
+    user_id: Optional[str] = None,
+    db=None,
+) -> list[PredictionResult]:
     """
-    Convenience wrapper: load model (if not provided) and predict.
-    Returns category_id=None if no model or below threshold.
+    Batch counterpart of predict_category(); cache misses are scored in one pass.
     """
+    from app.ai.rules import get_rule_index
+    from app.ai.user_overrides import user_overrides
+
+    results: list[Optional[PredictionResult]] = [None] * len(descriptions)
+    visible = visible_category_ids(db, user_id) if db is not None and user_id is not None else None
+    history = user_overrides.get(user_id, db=db) if user_id is not None else None
+    rules = get_rule_index()
+    for i, description in enumerate(descriptions):
+        personal = history.best(normalize_description(description)) if history is not None else None
+        if personal is not None and (visible is None or personal[0] in visible):
+            category_id, share = personal
+            results[i] = PredictionResult(
+                category_id=category_id,
+                confidence=share,
+                top_k=[(category_id, share)],
+                model_version=None,
+                source="user",
+            )
+            continue
+        category_id = rules.match(description)
+        if category_id is not None and (visible is None or category_id in visible):
+            results[i] = PredictionResult(
+                category_id=category_id,
+                confidence=1.0,
+                top_k=[(category_id, 1.0)],
+                model_version=None,
+                source="rule",
+            )
+
+    remaining = [i for i, result in enumerate(results) if result is None]
+    if not remaining:
+        return results  # type: ignore[return-value]
     if model is None:
         model = load_model()
     if model is None:
-        return PredictionResult(category_id=None, confidence=0.0, top_k=[], model_version=None)
-    return model.predict(description or "")
+        for i in remaining:
+            results[i] = PredictionResult(category_id=None, confidence=0.0, top_k=[], model_version=None)
+        return results  # type: ignore[return-value]
+
+    version = model.model_version
+    pending: dict[str, list[int]] = {}
+    for i in remaining:
+        text = normalize_description(descriptions[i])
+        cached = _prediction_cache.get(version, top_k, text)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(text, []).append(i)
+
+    if pending:
+        texts = list(pending)
+        for text, result in zip(texts, model.predict_many(texts, top_k=top_k)):
+            _prediction_cache.put(version, top_k, text, result)
+            for i in pending[text]:
+                results[i] = result
+    if visible is not None:
+        for i in remaining:
+            results[i] = _restrict_to_visible(results[i], visible)
+    return results  # type: ignore[return-value]
+
+
+def _restrict_to_visible(result: PredictionResult, visible: set[str]) -> PredictionResult:
+    """Drop labels the user cannot see; cached results are shared, so build a new one."""
+    top = [(label, score) for label, score in result.top_k if label in visible]
+    if len(top) == len(result.top_k) and (result.category_id is None or result.category_id in visible):
+        return result
+    return replace(
+        result,
+        category_id=result.category_id if result.category_id in visible else None,
+        top_k=top,
+    )
@@ -0,0 +1,289 @@
+"""
+Incremental (online) category model trained from user corrections.
+
+Uses a stateless HashingVectorizer plus an SGDClassifier(loss="log_loss"), so
+new examples are folded in with partial_fit() instead of a full refit. The
+learner state and a (updated_at, id) watermark are kept in
+ml_artifacts/category_online.pkl; each run only reads corrections newer than
+the watermark, streams them in fixed-size chunks and publishes the result as
+a new model_version through publish_artifacts(), which serving processes
+hot-reload.
+
+A correction is a confirmed transaction whose category_id differs from the
+predicted_category_id the model suggested.
+
+The label set is fixed when the learner is built (SGD cannot grow its
+classes) and holds only global categories; user-owned categories are served
+by the per-user history in app.ai.user_overrides. When there is no saved
+state, or global categories were added since it was built, the run rebuilds
+from the whole history with train_from_database() instead of publishing a
+model fitted on corrections alone.
+
+train_from_database() builds the same learner from the whole confirmed
+history of global categories: rows are streamed with a server-side cursor (yield_per) and
+featurized chunk by chunk, so peak memory depends on chunk_size, not on the
+number of rows.
+"""
+
+from __future__ import annotations
+
+import logging
+import sys
+import time
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.ai.category_classifier import ARTIFACT_DIR, CategoryClassifier, publish_artifacts
+
+logger = logging.getLogger(__name__)
+
+ONLINE_STATE_PATH = ARTIFACT_DIR / "category_online.pkl"
+N_FEATURES = 2**18
+CHUNK_SIZE = 500
+
+
+class IncrementalCategoryModel:
+    def __init__(self, labels: Sequence[str], n_features: int = N_FEATURES):
+        try:
+            from sklearn.feature_extraction.text import HashingVectorizer
+            from sklearn.linear_model import SGDClassifier
+        except ImportError as exc:
+            raise RuntimeError("scikit-learn is required for training; install it first") from exc
+
+        if not labels:
+            raise ValueError("at least one label is required")
+        self.label_encoder: dict[str, int] = {label: idx for idx, label in enumerate(labels)}
+        self.vectorizer = HashingVectorizer(
+            lowercase=True,
+            ngram_range=(1, 2),
+            n_features=n_features,
+            alternate_sign=False,
+            norm="l2",
+        )
+        self.model = SGDClassifier(loss="log_loss", alpha=1e-5, random_state=0)
+        self.classes = np.arange(len(self.label_encoder))
+        self.watermark: tuple[Optional[datetime], Optional[str]] = (None, None)
+        self.rows_seen = 0
+        self.fitted = False
+
+    def partial_fit(self, texts: Sequence[str], labels: Sequence[str]) -> int:
+        """
+        Fold one chunk into the model. Labels unknown to the model are skipped
+        (SGD cannot grow its class set); returns the number of rows used.
+        """
+        pairs = [(text or "", self.label_encoder[label]) for text, label in zip(texts, labels) if label in self.label_encoder]
+        if not pairs:
+            return 0
+        X = self.vectorizer.transform([text for text, _ in pairs])
+        y = np.fromiter((idx for _, idx in pairs), dtype=np.int64, count=len(pairs))
+        self.model.partial_fit(X, y, classes=self.classes)
+        self.rows_seen += len(pairs)
+        self.fitted = True
+        return len(pairs)
+
+    def classifier(self, model_version: str, threshold: float = 0.5) -> CategoryClassifier:
+        return CategoryClassifier(
+            vectorizer=self.vectorizer,
+            model=self.model,
+            label_encoder=self.label_encoder,
+            model_version=model_version,
+            threshold=threshold,
+        )
+
+    def save(self, path=None) -> None:
+        from joblib import dump
+
+        path = path or ONLINE_STATE_PATH
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".pkl.tmp")
+        dump(self, tmp)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path=None) -> Optional["IncrementalCategoryModel"]:
+        from joblib import load
+
+        path = path or ONLINE_STATE_PATH
+        if not path.exists():
+            return None
+        return load(path)
+
+
+def _known_labels(db: Session) -> list[str]:
+    """Global category ids in creation order; user-owned categories never become model labels."""
+    category = models.Category
+    return [
+        row.id
+        for row in db.query(category.id)
+        .filter(category.user_id == None)  # noqa: E711
+        .order_by(category.created_at, category.id)
+    ]
+
+
+def _global_category_ids():
+    category = models.Category
+    return select(category.id).where(category.user_id.is_(None))
+
+
+def _corrections_query(watermark: tuple[Optional[datetime], Optional[str]]):
+    tx = models.Transaction
+    query = select(tx.description, tx.category_id, tx.updated_at, tx.id).where(
+        tx.status == models.TransactionStatus.confirmed,
+        tx.category_id.in_(_global_category_ids()),
+        tx.predicted_category_id.is_not(None),
+        tx.category_id != tx.predicted_category_id,
+    )
+    after_ts, after_id = watermark
+    if after_ts is not None:
+        query = query.where(
+            or_(tx.updated_at > after_ts, and_(tx.updated_at == after_ts, tx.id > (after_id or "")))
+        )
+    return query.order_by(tx.updated_at, tx.id)
+
+
+def consume_corrections(
+    db: Session,
+    chunk_size: int = CHUNK_SIZE,
+    threshold: float = 0.5,
+    publish: bool = True,
+    state: Optional[IncrementalCategoryModel] = None,
+) -> dict:
+    """
+    Train on corrections newer than the saved watermark and publish a new model_version.
+
+    Without saved state, or when global categories were added since the state
+    was built, rebuilds from the whole history via train_from_database().
+    """
+    state = state or IncrementalCategoryModel.load()
+    new_labels = set(_known_labels(db)) - set(state.label_encoder) if state is not None else None
+    if state is None or new_labels:
+        logger.info(
+            "Rebuilding the online model from history (%s)",
+            "no saved state" if state is None else f"{len(new_labels)} new categories",
+        )
+        stats = train_from_database(db, chunk_size=chunk_size, threshold=threshold, publish=publish)
+        return {
+            "rows_read": stats["rows"],
+            "rows_used": stats["rows_used"],
+            "rows_skipped": stats["rows"] - stats["rows_used"],
+            "chunks": stats["chunks"],
+            "total_rows_seen": stats["rows_used"],
+            "model_version": stats["model_version"],
+            "rebuilt": True,
+        }
+
+    rows_read = rows_used = chunks = 0
+    result = db.execute(_corrections_query(state.watermark)).yield_per(chunk_size)
+    for chunk in result.partitions():
+        rows_read += len(chunk)
+        rows_used += state.partial_fit([row.description for row in chunk], [row.category_id for row in chunk])
+        state.watermark = (chunk[-1].updated_at, chunk[-1].id)
+        chunks += 1
+
+    model_version = None
+    if rows_read:
+        state.save()
+        if publish and state.fitted:
+            model_version = publish_artifacts(
+                state.vectorizer,
+                state.model,
+                state.label_encoder,
+                model_version=f"online-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}",
+                threshold=threshold,
+            )
+    logger.info("Consumed %d corrections (%d used, %d chunks) -> %s", rows_read, rows_used, chunks, model_version)
+    return {
+        "rows_read": rows_read,
+        "rows_used": rows_used,
+        "rows_skipped": rows_read - rows_used,
+        "chunks": chunks,
+        "total_rows_seen": state.rows_seen,
+        "model_version": model_version,
+        "rebuilt": False,
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover - non-POSIX
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _confirmed_history_filter(query):
+    tx = models.Transaction
+    # User-owned categories stay out of the shared model; the per-user history covers them.
+    return query.where(
+        tx.status == models.TransactionStatus.confirmed,
+        tx.category_id.in_(_global_category_ids()),
+    )
+
+
+def train_from_database(
+    db: Session,
+    chunk_size: int = CHUNK_SIZE,
+    epochs: int = 1,
+    threshold: float = 0.5,
+    publish: bool = True,
+) -> dict:
+    """
+    Train the incremental model from scratch on every confirmed transaction,
+    streaming `chunk_size` rows at a time. Replaces the saved online state, so
+    later consume_corrections() runs continue from this snapshot. The label
+    set is rebuilt from the current global categories.
+    """
+    tx = models.Transaction
+    labels = _known_labels(db)
+    if not labels:
+        raise ValueError("no global categories to train on")
+
+    state = IncrementalCategoryModel(labels)
+    started = time.perf_counter()
+    rows_read = rows_used = chunks = 0
+    watermark: tuple[Optional[datetime], Optional[str]] = (None, None)
+    for _ in range(max(1, epochs)):
+        # Ordering by the random UUID primary key gives SGD a shuffled stream for free.
+        query = _confirmed_history_filter(select(tx.description, tx.category_id, tx.updated_at, tx.id)).order_by(tx.id)
+        for chunk in db.execute(query).yield_per(chunk_size).partitions():
+            rows_used += state.partial_fit([row.description for row in chunk], [row.category_id for row in chunk])
+            for row in chunk:
+                key = (row.updated_at, row.id)
+                if watermark[0] is None or (key[0] is not None and key > watermark):
+                    watermark = key
+            rows_read += len(chunk)
+            chunks += 1
+    elapsed = time.perf_counter() - started
+    state.watermark = watermark
+    state.save()
+
+    model_version = None
+    if publish and state.fitted:
+        model_version = publish_artifacts(
+            state.vectorizer,
+            state.model,
+            state.label_encoder,
+            model_version=f"stream-{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}",
+            threshold=threshold,
+        )
+    stats = {
+        "rows": rows_read,
+        "rows_used": rows_used,
+        "epochs": max(1, epochs),
+        "chunks": chunks,
+        "chunk_size": chunk_size,
+        "labels": len(labels),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows_read / elapsed, 1) if elapsed > 0 else None,
+        "peak_rss_mb": _peak_rss_mb(),
+        "model_version": model_version,
+    }
+    logger.info("Streaming training finished: %s", stats)
+    return stats
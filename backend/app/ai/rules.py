@@ -0,0 +1,158 @@
+"""
+Keyword -> category rules consulted before the TF-IDF model.
+
+Rules live in ml_artifacts/category_rules.json and ship with the model
+artifacts, so they only hold deployment-wide rules for global categories:
+
+    {"global": {"grab": "<category_id>", "indomaret": "<category_id>"}}
+
+Per-user preferences come from the user's confirmed history
+(app.ai.user_overrides) instead; a legacy "users" section is ignored.
+Callers check a hit against the categories visible to the user before using
+it (see predict_categories()).
+
+Keywords are normalized and tokenized the same way as descriptions and
+compiled into a token trie, so one scan over the description finds every
+rule in O(tokens x longest keyword). The longest match wins (leftmost on
+ties). The file is re-stat'ed at most every RULES_REVALIDATE_SECONDS and
+recompiled when it changes.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from typing import Optional
+
+from app.ai.category_classifier import ARTIFACT_DIR, normalize_description
+
+logger = logging.getLogger(__name__)
+
+RULES_PATH = ARTIFACT_DIR / "category_rules.json"
+RULES_REVALIDATE_SECONDS = 2.0
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    return _TOKEN_RE.findall(normalize_description(text))
+
+
+class _TrieNode:
+    __slots__ = ("children", "category_id")
+
+    def __init__(self):
+        self.children: dict[str, _TrieNode] = {}
+        self.category_id: Optional[str] = None
+
+
+class KeywordTrie:
+    def __init__(self, rules: dict[str, str] | None = None):
+        self.root = _TrieNode()
+        self.size = 0
+        for keyword, category_id in (rules or {}).items():
+            self.add(keyword, category_id)
+
+    def add(self, keyword: str, category_id: str) -> None:
+        tokens = tokenize(keyword)
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.children.setdefault(token, _TrieNode())
+        if node.category_id is None:
+            self.size += 1
+        node.category_id = category_id
+
+    def match(self, tokens: list[str]) -> Optional[str]:
+        best: Optional[str] = None
+        best_len = 0
+        root_children = self.root.children
+        for start in range(len(tokens)):
+            node = root_children.get(tokens[start])
+            depth = 1
+            while node is not None:
+                if node.category_id is not None and depth > best_len:
+                    best, best_len = node.category_id, depth
+                if start + depth >= len(tokens):
+                    break
+                node = node.children.get(tokens[start + depth])
+                depth += 1
+        return best
+
+
+class RuleIndex:
+    def __init__(self, global_rules: dict[str, str] | None = None):
+        self.global_trie = KeywordTrie(global_rules)
+
+    def match(self, description: Optional[str]) -> Optional[str]:
+        if not self.global_trie.size:
+            return None
+        tokens = tokenize(description)
+        if not tokens:
+            return None
+        return self.global_trie.match(tokens)
+
+    def stats(self) -> dict:
+        return {"global_rules": self.global_trie.size}
+
+
+class _RuleStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.index = RuleIndex()
+        self.mtime_ns: Optional[int] = None
+        self.checked_at = 0.0
+        self.checked = False
+
+    def get(self, force: bool = False) -> RuleIndex:
+        if not force and self.checked and time.monotonic() - self.checked_at < RULES_REVALIDATE_SECONDS:
+            return self.index
+        with self._lock:
+            self.checked_at = time.monotonic()
+            self.checked = True
+            try:
+                mtime_ns = RULES_PATH.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime_ns = None
+            if not force and mtime_ns == self.mtime_ns:
+                return self.index
+            if mtime_ns is None:
+                self.index = RuleIndex()
+            else:
+                try:
+                    with RULES_PATH.open() as f:
+                        raw = json.load(f)
+                    if raw.get("users"):
+                        logger.warning("Ignoring per-user rules in %s; only global rules are supported", RULES_PATH)
+                    self.index = RuleIndex(raw.get("global"))
+                    logger.info("Loaded category rules: %s", self.index.stats())
+                except (OSError, ValueError, AttributeError) as exc:
+                    # Keep serving the previous rules if the new file is broken.
+                    logger.exception("Failed to load category rules: %s", exc)
+            self.mtime_ns = mtime_ns
+            return self.index
+
+    def reset(self) -> None:
+        with self._lock:
+            self.index = RuleIndex()
+            self.mtime_ns = None
+            self.checked = False
+
+
+_store = _RuleStore()
+
+
+def get_rule_index() -> RuleIndex:
+    return _store.get()
+
+
+def reload_rules() -> RuleIndex:
+    """Recompile the rules file now instead of waiting for the next revalidation."""
+    return _store.get(force=True)
+
+
+def reset_rules() -> None:
+    _store.reset()
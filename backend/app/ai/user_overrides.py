@@ -0,0 +1,152 @@
+"""
+Per-user category history consulted before rules and the global model.
+
+For each user we keep normalized description -> {category_id: count} built
+from their confirmed transactions. When one category clearly dominates a
+description (at least MIN_COUNT confirmations and MIN_SHARE of them), the
+prediction is a dict lookup with confidence = that share.
+
+Histories are built lazily with one grouped query, held in an LRU across
+users (MAX_USERS) and updated in place on every confirmed write and delete;
+deleting a category drops the user's history so it is rebuilt without it.
+The index is per process, so predict_categories() also checks a hit against
+the categories the user can still see.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import models
+from app.ai.category_classifier import normalize_description
+
+MAX_USERS = 1000
+MIN_COUNT = 2
+MIN_SHARE = 0.75
+
+
+class UserHistory:
+    __slots__ = ("counts",)
+
+    def __init__(self):
+        self.counts: dict[str, dict[str, int]] = {}
+
+    def add(self, text: str, category_id: str, n: int = 1) -> None:
+        if not text:
+            return
+        per_category = self.counts.setdefault(text, {})
+        per_category[category_id] = per_category.get(category_id, 0) + n
+
+    def remove(self, text: str, category_id: str, n: int = 1) -> None:
+        per_category = self.counts.get(text)
+        if not per_category or category_id not in per_category:
+            return
+        remaining = per_category[category_id] - n
+        if remaining > 0:
+            per_category[category_id] = remaining
+        else:
+            del per_category[category_id]
+            if not per_category:
+                del self.counts[text]
+
+    def best(self, text: str) -> Optional[tuple[str, float]]:
+        per_category = self.counts.get(text)
+        if not per_category:
+            return None
+        category_id, count = max(per_category.items(), key=lambda item: item[1])
+        total = sum(per_category.values())
+        if count < MIN_COUNT or count / total < MIN_SHARE:
+            return None
+        return category_id, count / total
+
+
+class UserOverrideIndex:
+    def __init__(self, max_users: int = MAX_USERS):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._users: OrderedDict[str, UserHistory] = OrderedDict()
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, user_id: str, db: Optional[Session] = None) -> Optional[UserHistory]:
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is not None:
+                self._users.move_to_end(user_id)
+                return history
+        if db is None:
+            return None
+        history = self._build(db, user_id)
+        with self._lock:
+            # Another request may have built it meanwhile; keep the first one.
+            existing = self._users.get(user_id)
+            if existing is not None:
+                return existing
+            self._users[user_id] = history
+            self.builds += 1
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+                self.evictions += 1
+        return history
+
+    @staticmethod
+    def _build(db: Session, user_id: str) -> UserHistory:
+        tx = models.Transaction
+        rows = (
+            db.query(tx.description, tx.category_id, func.count(tx.id))
+            .filter(
+                tx.user_id == user_id,
+                tx.status == models.TransactionStatus.confirmed,
+                tx.category_id.is_not(None),
+                tx.description.is_not(None),
+            )
+            .group_by(tx.description, tx.category_id)
+            .all()
+        )
+        history = UserHistory()
+        for description, category_id, count in rows:
+            history.add(normalize_description(description), category_id, int(count))
+        return history
+
+    def record(self, user_id: str, description: Optional[str], category_id: Optional[str]) -> None:
+        """Fold a confirmed write into a loaded history; unloaded users pick it up on build."""
+        if not category_id:
+            return
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is not None:
+                history.add(normalize_description(description), category_id)
+
+    def forget(self, user_id: str, description: Optional[str], category_id: Optional[str]) -> None:
+        """Undo record() for a deleted confirmed transaction."""
+        if not category_id:
+            return
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is not None:
+                history.remove(normalize_description(description), category_id)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "builds": self.builds,
+                "evictions": self.evictions,
+            }
+
+
+user_overrides = UserOverrideIndex()
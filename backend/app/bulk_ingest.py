@@ -0,0 +1,240 @@
+"""
+Set-based creation of many transactions for one user (bulk endpoint, imports).
+
+Per call: one IN query for the referenced accounts, one for the categories, one
+IN query for duplicate fingerprints, one batched classification of the
+uncategorized rows, one executemany INSERT and the rollup deltas, all in a
+single DB transaction. Rows that fail validation are skipped and reported by
+index, duplicates are skipped and listed separately; the rest are inserted.
+
+A fingerprint identifies a row by user, account, type, amount, Jakarta-local
+day and normalized description (category_classifier.normalize_description),
+plus its occurrence number among identical rows of the same upload (two
+identical parking fees on one day are both kept, re-uploading the statement
+matches both). The unique (user_id, fingerprint)
+index makes a concurrent duplicate fail the INSERT, which is retried once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import models, rollups, schemas
+from app.ai.category_classifier import normalize_description, predict_categories
+from app.ai.user_overrides import user_overrides
+
+
+@dataclass
+class RowError:
+    index: int
+    message: str
+
+
+@dataclass
+class IngestResult:
+    created: list[dict[str, Any]] = field(default_factory=list)
+    errors: list[RowError] = field(default_factory=list)
+    duplicates: list[int] = field(default_factory=list)
+
+
+def fingerprint_key(
+    user_id: str,
+    account_id: str,
+    tx_type: models.TransactionType,
+    amount: Any,
+    occurred_at: datetime,
+    description: Optional[str],
+) -> str:
+    cents = int((Decimal(str(amount)) * 100).to_integral_value())
+    return "|".join(
+        (
+            user_id,
+            account_id,
+            models.TransactionType(tx_type).value,
+            str(cents),
+            rollups.local_date_of(occurred_at).isoformat(),
+            normalize_description(description),
+        )
+    )
+
+
+def fingerprint(key: str, occurrence: int = 0) -> str:
+    return hashlib.sha256(f"{key}|{occurrence}".encode()).hexdigest()
+
+
+def _existing_fingerprints(db: Session, user_id: str, fingerprints: list[str]) -> set[str]:
+    tx = models.Transaction
+    if not fingerprints:
+        return set()
+    return set(db.scalars(select(tx.fingerprint).where(tx.user_id == user_id, tx.fingerprint.in_(fingerprints))))
+
+
+def _validation_message(exc: ValidationError) -> str:
+    err = exc.errors()[0]
+    loc = ".".join(str(part) for part in err.get("loc", ()))
+    return f"{loc}: {err.get('msg', 'invalid value')}" if loc else err.get("msg", "invalid value")
+
+
+def validate_rows(
+    raw_rows: list[dict[str, Any]], start_index: int = 0
+) -> tuple[list[tuple[int, schemas.TransactionCreate]], list[RowError]]:
+    """Schema-validate raw rows; returns (index, payload) pairs and per-row errors."""
+    valid, errors = [], []
+    for offset, raw in enumerate(raw_rows):
+        try:
+            valid.append((start_index + offset, schemas.TransactionCreate.model_validate(raw)))
+        except ValidationError as exc:
+            errors.append(RowError(start_index + offset, _validation_message(exc)))
+    return valid, errors
+
+
+def ingest(
+    db: Session,
+    user_id: str,
+    rows: list[tuple[int, schemas.TransactionCreate]],
+    classify: bool = True,
+    commit: bool = True,
+    occurrences: Optional[dict[str, int]] = None,
+) -> IngestResult:
+    """
+    Insert validated (index, payload) rows for `user_id`. Returns the inserted
+    column values (with ids), per-row errors and the indexes of duplicates.
+    Pass the same `occurrences` dict for every chunk of one upload so identical
+    rows are numbered across chunks. With commit=True, caches are invalidated
+    and confirmed rows folded into the user's category history.
+    """
+    result = IngestResult()
+    if not rows:
+        return result
+
+    account_ids = {payload.account_id for _, payload in rows}
+    owned_accounts = {
+        account_id
+        for (account_id,) in db.query(models.Account.id).filter(
+            models.Account.user_id == user_id, models.Account.id.in_(account_ids)
+        )
+    }
+    category_ids = {payload.category_id for _, payload in rows if payload.category_id}
+    visible_categories = set()
+    if category_ids:
+        visible_categories = {
+            category_id
+            for (category_id,) in db.query(models.Category.id).filter(
+                (models.Category.user_id == None) | (models.Category.user_id == user_id),  # noqa: E711
+                models.Category.id.in_(category_ids),
+            )
+        }
+
+    candidates: list[tuple[int, schemas.TransactionCreate, str]] = []
+    occurrences = {} if occurrences is None else occurrences
+    for index, payload in rows:
+        if payload.account_id not in owned_accounts:
+            result.errors.append(RowError(index, "Invalid account"))
+        elif payload.category_id and payload.category_id not in visible_categories:
+            result.errors.append(RowError(index, "Invalid category"))
+        else:
+            key = fingerprint_key(
+                user_id, payload.account_id, payload.type, payload.amount, payload.occurred_at, payload.description
+            )
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            row_fingerprint = fingerprint(key, occurrence)
+            candidates.append((index, payload, row_fingerprint))
+
+    existing = _existing_fingerprints(db, user_id, [fp for _, _, fp in candidates])
+    accepted: list[tuple[int, schemas.TransactionCreate]] = []
+    fingerprints: list[str] = []
+    for index, payload, row_fingerprint in candidates:
+        if row_fingerprint in existing:
+            result.duplicates.append(index)
+        else:
+            accepted.append((index, payload))
+            fingerprints.append(row_fingerprint)
+
+    uncategorized = [i for i, (_, payload) in enumerate(accepted) if not payload.category_id]
+    predictions: dict[int, Any] = {}
+    if classify and uncategorized:
+        results = predict_categories(
+            [accepted[i][1].description or "" for i in uncategorized], user_id=user_id, db=db
+        )
+        predictions = dict(zip(uncategorized, results))
+
+    values = []
+    for i, (_, payload) in enumerate(accepted):
+        category_id = payload.category_id
+        status_value = payload.status
+        prediction = predictions.get(i)
+        if prediction is not None and prediction.category_id:
+            category_id = prediction.category_id
+            status_value = models.TransactionStatus.predicted
+        values.append(
+            {
+                "id": models._uuid(),
+                "user_id": user_id,
+                "account_id": payload.account_id,
+                "category_id": category_id,
+                "predicted_category_id": prediction.category_id if prediction is not None else None,
+                "predicted_confidence": prediction.confidence if prediction is not None else None,
+                "type": payload.type,
+                "amount": Decimal(str(payload.amount)),
+                "currency": payload.currency,
+                "description": payload.description,
+                "occurred_at": payload.occurred_at,
+                "source": payload.source,
+                "status": status_value,
+                "fingerprint": fingerprints[i],
+            }
+        )
+
+    values = _insert_new(db, user_id, values, [index for index, _ in accepted], result)
+    if values:
+        rollups.apply_transactions(db, [SimpleNamespace(**row) for row in values])
+    result.created = values
+    result.errors.sort(key=lambda err: err.index)
+    result.duplicates.sort()
+    if commit:
+        db.commit()
+        after_commit(user_id, values)
+    return result
+
+
+def _insert_new(
+    db: Session, user_id: str, values: list[dict[str, Any]], indexes: list[int], result: IngestResult
+) -> list[dict[str, Any]]:
+    """INSERT the rows; if a concurrent upload took some fingerprints meanwhile, drop those and retry once."""
+    for attempt in range(2):
+        if not values:
+            return values
+        try:
+            with db.begin_nested():
+                # executemany: the statement compiles once (cached) and the driver batches the rows.
+                db.execute(insert(models.Transaction.__table__), values)
+            return values
+        except IntegrityError:
+            if attempt:
+                raise
+            taken = _existing_fingerprints(db, user_id, [row["fingerprint"] for row in values])
+            kept = [(index, row) for index, row in zip(indexes, values) if row["fingerprint"] not in taken]
+            result.duplicates += [index for index, row in zip(indexes, values) if row["fingerprint"] in taken]
+            indexes, values = [index for index, _ in kept], [row for _, row in kept]
+    return values
+
+
+def after_commit(user_id: str, values: list[dict[str, Any]]) -> None:
+    """Cache invalidation and history updates once inserted rows are committed."""
+    if not values:
+        return
+    rollups.invalidate_cached(user_id, {rollups.local_date_of(row["occurred_at"]) for row in values})
+    for row in values:
+        if row["status"] == models.TransactionStatus.confirmed:
+            user_overrides.record(user_id, row["description"], row["category_id"])
@@ -0,0 +1,506 @@
+"""
+Caching for per-user read models (dashboard summaries etc.).
+
+Values live in a pluggable CacheBackend shared by every uvicorn worker:
+    - InProcessBackend: bounded LRU/TTL dict (default; tests, single worker)
+    - RedisBackend: speaks the Redis protocol (RESP) over a plain socket, so
+      any Redis-compatible server works without a client library
+
+Invalidation is generation based: each user has a counter per generation
+name ("data" by default) that is part of every cache key, and a write bumps
+it with INCR. Old entries become unreachable at once in every worker and
+age out through their TTL. Call invalidate_user() after committing a write.
+
+Generations (and the ETags built from data_version()) are only trusted when
+every worker sees the same counter: a shared backend, or a single worker
+(settings.web_concurrency). Otherwise, and while Redis is unreachable, they
+read as None and callers skip the cache / send no ETag.
+"""
+
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, Optional, TypeVar
+from urllib.parse import unquote, urlparse
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CACHE_MAX_ENTRIES = 10_000
+DEFAULT_GENERATION = "data"
+# Bumped only by writes that land in already closed (past) periods.
+CLOSED_GENERATION = "closed"
+_MISSING = object()
+T = TypeVar("T")
+
+
+class LRUCache:
+    """Size-bounded LRU with TTL; keys are tuples whose first element is the owner (user_id)."""
+
+    def __init__(self, maxsize: int, ttl_seconds: Optional[float]):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._by_user: dict[Hashable, set[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _unlink(self, key: tuple) -> None:
+        keys = self._by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[0]]
+
+    def get(self, key: tuple, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self._unlink(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        expires_at = float("inf") if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            self._by_user.setdefault(key[0], set()).add(key)
+            while len(self._data) > self.maxsize:
+                old_key, _ = self._data.popitem(last=False)
+                self._unlink(old_key)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: Hashable) -> int:
+        with self._lock:
+            keys = self._by_user.pop(user_id, set())
+            for key in keys:
+                self._data.pop(key, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def invalidate_key(self, key: tuple) -> None:
+        with self._lock:
+            if self._data.pop(key, _MISSING) is not _MISSING:
+                self._unlink(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._by_user.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class CacheBackend(ABC):
+    # True when every worker process talks to the same store.
+    shared = False
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]: ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None: ...
+
+    def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        return [self.get(key) for key in keys]
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def incr(self, key: str) -> Optional[int]:
+        """Atomically increment an integer counter (created at 0); never evicted. None if unreachable."""
+
+    @abstractmethod
+    def counter(self, key: str, initial: int) -> Optional[int]:
+        """Read an integer counter, creating it at `initial` if missing. None if unreachable."""
+
+    @abstractmethod
+    def clear(self, prefix: str = "") -> None: ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InProcessBackend(CacheBackend):
+    """
+    Values sit in an LRUCache keyed (namespace, key), so clear("summary:") is a
+    per-owner invalidation instead of a scan.
+    """
+
+    def __init__(self, maxsize: int = CACHE_MAX_ENTRIES):
+        self._values = LRUCache(maxsize, ttl_seconds=None)
+        # Counters are kept apart from the LRU: evicting one would reset a
+        # generation and could resurrect stale entries.
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _slot(key: str) -> tuple[str, str]:
+        return (key.split(":", 1)[0], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._values.get(self._slot(key))
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        self._values.set(self._slot(key), value, ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        self._values.invalidate_key(self._slot(key))
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def counter(self, key: str, initial: int) -> int:
+        with self._lock:
+            return self._counters.setdefault(key, initial)
+
+    def clear(self, prefix: str = "") -> None:
+        if not prefix:
+            self._values.clear()
+            with self._lock:
+                self._counters.clear()
+            return
+        self._values.invalidate_user(prefix.rstrip(":"))
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._values.stats()}
+
+
+class RedisError(Exception):
+    pass
+
+
+class _RespConnection:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile("rb")
+
+    def command(self, *args: Any) -> Any:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self.sock.sendall(b"".join(parts))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload
+        if kind == b"-":
+            raise RedisError(payload.decode(errors="replace"))
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            return data[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length < 0:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"unexpected reply type {kind!r}")
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisBackend(CacheBackend):
+    """
+    Minimal RESP2 client with a small connection pool. Network failures are
+    logged and treated as cache misses; the backend then stays out of the
+    request path for RETRY_AFTER_SECONDS instead of timing out on every call.
+    """
+
+    RETRY_AFTER_SECONDS = 5.0
+    shared = True
+
+    def __init__(self, url: str, timeout: float = 0.5, key_prefix: str = "fintrack:"):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self._pool: list[_RespConnection] = []
+        self._lock = threading.Lock()
+        self._down_until = 0.0
+        self.errors = 0
+
+    def _connect(self) -> _RespConnection:
+        conn = _RespConnection(self.host, self.port, self.timeout)
+        if self.password:
+            conn.command("AUTH", self.password)
+        if self.db:
+            conn.command("SELECT", self.db)
+        return conn
+
+    def _execute(self, *args: Any, default: Any = None) -> Any:
+        if time.monotonic() < self._down_until:
+            return default
+        with self._lock:
+            conn = self._pool.pop() if self._pool else None
+        try:
+            if conn is None:
+                conn = self._connect()
+            result = conn.command(*args)
+        except (OSError, ConnectionError, RedisError) as exc:
+            self.errors += 1
+            if conn is not None:
+                conn.close()
+            if not isinstance(exc, RedisError):
+                self._down_until = time.monotonic() + self.RETRY_AFTER_SECONDS
+            logger.warning("Redis cache command %s failed: %s", args[0], exc)
+            return default
+        with self._lock:
+            self._pool.append(conn)
+        return result
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._execute("GET", self.key_prefix + key)
+
+    def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        if not keys:
+            return []
+        reply = self._execute("MGET", *(self.key_prefix + key for key in keys))
+        return reply if reply is not None else [None] * len(keys)
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[float] = None) -> None:
+        if ttl_seconds is None:
+            self._execute("SET", self.key_prefix + key, value)
+        else:
+            self._execute("SET", self.key_prefix + key, value, "PX", max(1, int(ttl_seconds * 1000)))
+
+    def delete(self, key: str) -> None:
+        self._execute("DEL", self.key_prefix + key)
+
+    def incr(self, key: str) -> Optional[int]:
+        reply = self._execute("INCR", self.key_prefix + key)
+        return int(reply) if reply is not None else None
+
+    def counter(self, key: str, initial: int) -> Optional[int]:
+        raw = self._execute("GET", self.key_prefix + key, default=_MISSING)
+        if raw is None:
+            self._execute("SET", self.key_prefix + key, initial, "NX")
+            raw = self._execute("GET", self.key_prefix + key, default=_MISSING)
+        return None if raw is None or raw is _MISSING else int(raw)
+
+    def clear(self, prefix: str = "") -> None:
+        cursor = b"0"
+        pattern = self.key_prefix + prefix + "*"
+        while True:
+            reply = self._execute("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+            if not reply:
+                return
+            cursor, keys = reply
+            if keys:
+                self._execute("DEL", *keys)
+            if cursor in (b"0", 0):
+                return
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "host": self.host, "port": self.port, "db": self.db, "errors": self.errors}
+
+
+def backend_from_url(url: Optional[str]) -> CacheBackend:
+    if not url or url.startswith("memory://"):
+        workers = get_settings().web_concurrency
+        if workers > 1:
+            logger.warning(
+                "memory:// cache is per process; with WEB_CONCURRENCY=%d cached read models and ETags "
+                "are disabled. Set CACHE_URL=redis://... to share them between workers.",
+                workers,
+            )
+        return InProcessBackend()
+    if url.startswith("redis://"):
+        return RedisBackend(url)
+    raise ValueError(f"unsupported cache url: {url}")
+
+
+_backend: Optional[CacheBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> CacheBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = backend_from_url(get_settings().cache_url)
+    return _backend
+
+
+def set_backend(backend: Optional[CacheBackend]) -> None:
+    """Swap the process-wide backend (tests, or after changing settings)."""
+    global _backend
+    _backend = backend
+
+
+def _generation_key(user_id: str, generation: str) -> str:
+    return f"gen:{generation}:{user_id}"
+
+
+def _clock_seed() -> int:
+    # Counters start from the wall clock (ms), so a restarted or flushed backend
+    # never hands out a generation (or ETag, see data_version) seen before.
+    return int(time.time() * 1000)
+
+
+def generations_shared() -> bool:
+    """Whether a generation read here is the one every worker sees."""
+    return get_backend().shared or get_settings().web_concurrency <= 1
+
+
+def user_generation(user_id: str, generation: str = DEFAULT_GENERATION) -> Optional[int]:
+    """The user's current generation, or None when it cannot be read reliably."""
+    if not generations_shared():
+        return None
+    return get_backend().counter(_generation_key(user_id, generation), _clock_seed())
+
+
+def data_version(user_id: str) -> Optional[int]:
+    """
+    Per-user data version: increases with every write the routers commit for
+    `user_id`. None when it cannot be read reliably (see generations_shared()).
+    """
+    return user_generation(user_id)
+
+
+def invalidate_user(user_id: str, generation: str = DEFAULT_GENERATION) -> Optional[int]:
+    """Make every cached read model of `user_id` unreachable; call after committing a write.
+
+    Returns the new generation, or None if the backend could not be updated.
+    """
+    if not generations_shared():
+        return None
+    user_generation(user_id, generation)
+    new_generation = get_backend().incr(_generation_key(user_id, generation))
+    if new_generation is None:
+        logger.error(
+            "Could not invalidate %s cache generation of user %s; cached entries may be stale until their TTL",
+            generation,
+            user_id,
+        )
+    return new_generation
+
+
+class UserScopedCache(Generic[T]):
+    """
+    Typed view over the backend for one namespace of per-user values.
+    Keys embed the user's generation counter, so invalidate_user() drops them all.
+
+    Read current_generation() once before querying the DB and pass it to get()
+    and set(): a value computed from data read before a concurrent write must
+    be stored under the generation that write has since replaced. When the
+    generation cannot be read the cache is bypassed.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: Optional[float],
+        encode: Callable[[T], bytes],
+        decode: Callable[[bytes], T],
+        generation: str = DEFAULT_GENERATION,
+    ):
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.encode = encode
+        self.decode = decode
+        self.generation = generation
+        self.hits = 0
+        self.misses = 0
+
+    def current_generation(self, user_id: str) -> Optional[int]:
+        return user_generation(user_id, self.generation)
+
+    def _key(self, user_id: str, parts: tuple, gen: int) -> str:
+        return ":".join([self.namespace, user_id, str(gen), *map(str, parts)])
+
+    def get(self, user_id: str, *parts: Any, gen: Optional[int] = None) -> Optional[T]:
+        if gen is None:
+            gen = self.current_generation(user_id)
+        raw = get_backend().get(self._key(user_id, parts, gen)) if gen is not None else None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.decode(raw)
+
+    def get_many(self, user_id: str, parts_list: list[tuple], gen: Optional[int] = None) -> list[Optional[T]]:
+        """One generation lookup and one backend round trip for several keys."""
+        if gen is None:
+            gen = self.current_generation(user_id)
+        if gen is None:
+            raws: list[Optional[bytes]] = [None] * len(parts_list)
+        else:
+            raws = get_backend().get_many([self._key(user_id, parts, gen) for parts in parts_list])
+        found = sum(raw is not None for raw in raws)
+        self.hits += found
+        self.misses += len(raws) - found
+        return [None if raw is None else self.decode(raw) for raw in raws]
+
+    def set(
+        self, user_id: str, parts: tuple, value: T, *, gen: Optional[int], ttl_seconds: Optional[float] = None
+    ) -> None:
+        """Store `value` under `gen`, the generation read before the data behind it was queried."""
+        if gen is None:
+            return
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        get_backend().set(self._key(user_id, parts, gen), self.encode(value), ttl)
+
+    def clear(self) -> None:
+        get_backend().clear(self.namespace + ":")
+
+    def stats(self) -> dict:
+        return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses, **get_backend().stats()}
@@ -0,0 +1,291 @@
+"""
+Optional in-memory columnar engine for dashboard summaries (DASHBOARD_ENGINE=columnar).
+
+Each loaded user gets NumPy columns sorted by occurred_at:
+    occurred    int64  epoch seconds (stored naive occurred_at read as UTC, like rollups)
+    amount      int64  minor units (cents)
+    category    int32  index into `category_ids` (0 = uncategorized)
+    type_code   int8   TYPE_CODES
+plus prefix sums: income/expense totals and, per category, expense amount and
+transaction count. A summary of any [start, end] is then two searchsorted calls
+and a few subtractions; the database is not touched.
+
+Users are kept in an LRU bounded by a memory budget. Appends that arrive in time
+order are written in place (capacity doubles as needed); any other change drops
+the user so the next summary reloads. Entries remember the cache data generation
+they reflect, so writes handled by another worker invalidate them as well.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import cache, models
+from app.config import get_settings
+from app.rollups import JAKARTA_TZ, PeriodAggregate
+
+TYPE_CODES = {t: i for i, t in enumerate(models.TransactionType)}
+INCOME = TYPE_CODES[models.TransactionType.income]
+EXPENSE = TYPE_CODES[models.TransactionType.expense]
+# A single user may use at most this share of the budget; bigger users stay on rollups.
+MAX_USER_SHARE = 0.25
+LOAD_CHUNK_SIZE = 5000
+
+
+def _epoch(occurred_at: datetime) -> int:
+    return int(occurred_at.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _local_midnight_epoch(day: date) -> int:
+    return int(datetime.combine(day, time.min, tzinfo=JAKARTA_TZ).timestamp())
+
+
+def _cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value())
+
+
+def _from_cents(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+class UserColumns:
+    def __init__(self, generation: int, capacity: int, category_ids: list[Optional[str]]):
+        self.generation = generation
+        self.length = 0
+        self.category_ids = category_ids
+        self.category_index = {cid: i for i, cid in enumerate(category_ids)}
+        # Ids of the transactions at the latest timestamp: an insert racing a
+        # concurrent load may already be in the columns when its append arrives.
+        self.tail_ids: set[str] = set()
+        self._allocate(max(capacity, 16), len(category_ids))
+
+    def _allocate(self, capacity: int, n_categories: int) -> None:
+        self.capacity = capacity
+        self.occurred = np.zeros(capacity, dtype=np.int64)
+        self.amount = np.zeros(capacity, dtype=np.int64)
+        self.category = np.zeros(capacity, dtype=np.int32)
+        self.type_code = np.zeros(capacity, dtype=np.int8)
+        # Prefix rows: row i holds the sums of the first i transactions.
+        self.income_prefix = np.zeros(capacity + 1, dtype=np.int64)
+        self.expense_prefix = np.zeros(capacity + 1, dtype=np.int64)
+        self.category_amount_prefix = np.zeros((capacity + 1, n_categories), dtype=np.int64)
+        self.category_count_prefix = np.zeros((capacity + 1, n_categories), dtype=np.int32)
+
+    def _grow(self, capacity: int, n_categories: int) -> None:
+        n = self.length
+        old = (
+            self.occurred, self.amount, self.category, self.type_code,
+            self.income_prefix, self.expense_prefix, self.category_amount_prefix, self.category_count_prefix,
+        )
+        old_categories = self.category_amount_prefix.shape[1]
+        self._allocate(capacity, n_categories)
+        self.occurred[:n], self.amount[:n], self.category[:n], self.type_code[:n] = (a[:n] for a in old[:4])
+        self.income_prefix[: n + 1] = old[4][: n + 1]
+        self.expense_prefix[: n + 1] = old[5][: n + 1]
+        self.category_amount_prefix[: n + 1, :old_categories] = old[6][: n + 1]
+        self.category_count_prefix[: n + 1, :old_categories] = old[7][: n + 1]
+
+    def fill(self, occurred: np.ndarray, amount: np.ndarray, category: np.ndarray, type_code: np.ndarray) -> None:
+        """Bulk-load columns already sorted by time (fresh entry only)."""
+        n = len(occurred)
+        if n > self.capacity:
+            self._allocate(n, len(self.category_ids))
+        self.occurred[:n], self.amount[:n], self.category[:n], self.type_code[:n] = occurred, amount, category, type_code
+        np.cumsum(np.where(type_code == INCOME, amount, 0), out=self.income_prefix[1 : n + 1])
+        is_expense = type_code == EXPENSE
+        np.cumsum(np.where(is_expense, amount, 0), out=self.expense_prefix[1 : n + 1])
+        rows = np.arange(n)
+        self.category_amount_prefix[1 : n + 1][rows, category] = np.where(is_expense, amount, 0)
+        self.category_count_prefix[1 : n + 1][rows, category] = is_expense
+        np.cumsum(self.category_amount_prefix[1 : n + 1], axis=0, out=self.category_amount_prefix[1 : n + 1])
+        np.cumsum(self.category_count_prefix[1 : n + 1], axis=0, out=self.category_count_prefix[1 : n + 1])
+        self.length = n
+
+    def append(self, tx_id: str, occurred: int, amount: int, category_id: Optional[str], type_code: int) -> bool:
+        """Append one transaction; False when it is out of time order (caller reloads)."""
+        n = self.length
+        if n and occurred < self.occurred[n - 1]:
+            return False
+        if n and occurred == self.occurred[n - 1]:
+            if tx_id in self.tail_ids:
+                return True
+            self.tail_ids.add(tx_id)
+        else:
+            self.tail_ids = {tx_id}
+        idx = self.category_index.get(category_id)
+        if idx is None:
+            idx = len(self.category_ids)
+            self.category_ids.append(category_id)
+            self.category_index[category_id] = idx
+        if n == self.capacity or idx >= self.category_amount_prefix.shape[1]:
+            self._grow(self.capacity * 2 if n == self.capacity else self.capacity, len(self.category_ids))
+        self.occurred[n], self.amount[n], self.category[n], self.type_code[n] = occurred, amount, idx, type_code
+        self.income_prefix[n + 1] = self.income_prefix[n] + (amount if type_code == INCOME else 0)
+        self.expense_prefix[n + 1] = self.expense_prefix[n] + (amount if type_code == EXPENSE else 0)
+        self.category_amount_prefix[n + 1] = self.category_amount_prefix[n]
+        self.category_count_prefix[n + 1] = self.category_count_prefix[n]
+        if type_code == EXPENSE:
+            self.category_amount_prefix[n + 1, idx] += amount
+            self.category_count_prefix[n + 1, idx] += 1
+        self.length = n + 1
+        return True
+
+    def aggregate(self, start: date, end: date) -> PeriodAggregate:
+        """Totals for Jakarta-local days [start, end]."""
+        occurred = self.occurred[: self.length]
+        lo = int(np.searchsorted(occurred, _local_midnight_epoch(start), side="left"))
+        hi = int(np.searchsorted(occurred, _local_midnight_epoch(end + timedelta(days=1)), side="left"))
+        amounts = self.category_amount_prefix[hi] - self.category_amount_prefix[lo]
+        counts = self.category_count_prefix[hi] - self.category_count_prefix[lo]
+        return PeriodAggregate(
+            income=_from_cents(self.income_prefix[hi] - self.income_prefix[lo]),
+            expense=_from_cents(self.expense_prefix[hi] - self.expense_prefix[lo]),
+            categories={
+                self.category_ids[i]: (_from_cents(amounts[i]), int(counts[i])) for i in np.flatnonzero(counts)
+            },
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            a.nbytes
+            for a in (
+                self.occurred, self.amount, self.category, self.type_code,
+                self.income_prefix, self.expense_prefix, self.category_amount_prefix, self.category_count_prefix,
+            )
+        )
+
+
+def _load(db: Session, user_id: str, generation: int) -> UserColumns:
+    tx = models.Transaction
+    query = (
+        select(tx.id, tx.occurred_at, tx.amount, tx.category_id, tx.type)
+        .where(tx.user_id == user_id)
+        .order_by(tx.occurred_at, tx.id)
+    )
+    occurred, amount, category, type_code = [], [], [], []
+    tail_ids: set[str] = set()
+    category_ids: list[Optional[str]] = [None]
+    index: dict[Optional[str], int] = {None: 0}
+    for chunk in db.execute(query).yield_per(LOAD_CHUNK_SIZE).partitions():
+        for row in chunk:
+            idx = index.get(row.category_id)
+            if idx is None:
+                idx = index[row.category_id] = len(category_ids)
+                category_ids.append(row.category_id)
+            epoch = _epoch(row.occurred_at)
+            if not occurred or epoch > occurred[-1]:
+                tail_ids = set()
+            tail_ids.add(row.id)
+            occurred.append(epoch)
+            amount.append(_cents(row.amount))
+            category.append(idx)
+            type_code.append(TYPE_CODES[models.TransactionType(row.type)])
+    columns = UserColumns(generation, len(occurred), category_ids)
+    columns.fill(
+        np.asarray(occurred, dtype=np.int64),
+        np.asarray(amount, dtype=np.int64),
+        np.asarray(category, dtype=np.int32),
+        np.asarray(type_code, dtype=np.int8),
+    )
+    columns.tail_ids = tail_ids
+    return columns
+
+
+class ColumnarStore:
+    def __init__(self, memory_budget_bytes: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self._lock = threading.Lock()
+        self._users: OrderedDict[str, UserColumns] = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+        self.appends = 0
+        self.rejected = 0
+
+    def _used(self) -> int:
+        return sum(c.nbytes for c in self._users.values())
+
+    def _evict_to_budget(self) -> None:
+        while self._users and self._used() > self.memory_budget_bytes:
+            self._users.popitem(last=False)
+            self.evictions += 1
+
+    def aggregate(self, db: Session, user_id: str, start: date, end: date) -> Optional[PeriodAggregate]:
+        """PeriodAggregate for [start, end], or None when the user does not fit the budget or the generation is unknown."""
+        generation = cache.user_generation(user_id)
+        if generation is None:
+            return None  # cannot tell whether a loaded copy is current
+        with self._lock:
+            columns = self._users.get(user_id)
+            if columns is not None and columns.generation == generation:
+                self._users.move_to_end(user_id)
+                return columns.aggregate(start, end)
+        columns = _load(db, user_id, generation)
+        with self._lock:
+            self.loads += 1
+            if columns.nbytes > self.memory_budget_bytes * MAX_USER_SHARE:
+                self._users.pop(user_id, None)
+                self.rejected += 1
+                return None
+            self._users[user_id] = columns
+            self._evict_to_budget()
+            return columns.aggregate(start, end)
+
+    def append(self, user_id: str, tx: models.Transaction, generation: Optional[int]) -> None:
+        """
+        Fold a committed insert into a loaded user. `generation` is the data
+        generation returned by the invalidation for this write; if any other
+        write happened since the entry was built, drop it instead.
+        """
+        with self._lock:
+            columns = self._users.get(user_id)
+            if columns is None:
+                return
+            appended = generation is not None and columns.generation == generation - 1 and columns.append(
+                tx.id,
+                _epoch(tx.occurred_at),
+                _cents(tx.amount),
+                tx.category_id,
+                TYPE_CODES[models.TransactionType(tx.type)],
+            )
+            if not appended:
+                del self._users[user_id]
+                return
+            columns.generation = generation
+            self.appends += 1
+            self._evict_to_budget()
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._users.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "bytes": self._used(),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "loads": self.loads,
+                "appends": self.appends,
+                "evictions": self.evictions,
+                "rejected": self.rejected,
+            }
+
+
+def enabled() -> bool:
+    return get_settings().dashboard_engine == "columnar"
+
+
+store = ColumnarStore(get_settings().columnar_memory_budget_mb * 1024 * 1024)
@@ -10,6 +10,20 @@ class Settings(BaseSettings):
     jwt_secret: str = os.getenv("JWT_SECRET", "changeme")
     jwt_algorithm: str = os.getenv("JWT_ALGORITHM", "HS256")
     access_token_expire_minutes: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+    # "inline" classifies before the INSERT; "deferred" commits first and classifies in the background.
+    auto_categorize_mode: str = os.getenv("AUTO_CATEGORIZE_MODE", "inline")
+    # Shared cache for read models: "memory://" (per process) or redis://host:port/db.
+    cache_url: str = os.getenv("CACHE_URL", os.getenv("REDIS_URL", "memory://"))
+    # Worker processes (uvicorn/gunicorn read the same variable). With more than
+    # one, "memory://" counters are not shared, so cache generations and ETags are
+    # disabled unless cache_url points at Redis.
+    web_concurrency: int = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # "rollups" (SQL over daily rollups) or "columnar" (per-user NumPy arrays held in memory).
+    dashboard_engine: str = os.getenv("DASHBOARD_ENGINE", "rollups")
+    columnar_memory_budget_mb: int = int(os.getenv("COLUMNAR_MEMORY_BUDGET_MB", "256"))
+    # Uploaded CSV/Excel files are streamed here before the import worker picks them up.
+    import_dir: str = os.getenv("IMPORT_DIR", "./uploads/imports")
+    import_max_mb: int = int(os.getenv("IMPORT_MAX_MB", "10"))
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -1,10 +1,10 @@
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, Response, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
-from app import models
+from app import cache, models, rollups
 from app.database import get_db
 from app.security import decode_token
 
@@ -26,3 +26,44 @@ def get_current_user(
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
+
+
+class NotModified(Exception):
+    """Raised by conditional_get; answered with 304 by the handler in app.main."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    user: models.User = Depends(get_current_user),
+) -> Optional[str]:
+    """
+    ETag from the user's id and data version plus today's Jakarta date (which
+    moves default ranges). Runs before the endpoint, so a matching If-None-Match
+    returns 304 without any list or aggregate query.
+
+    When the version cannot be read reliably (cache backend down, or per-process
+    counters with several workers) no ETag is sent and nothing is answered with 304.
+    """
+    version = cache.data_version(user.id)
+    if version is None:
+        response.headers["Cache-Control"] = "private, no-cache"
+        return None
+    etag = f'W/"{user.id}-{version}-{rollups.today_local().isoformat()}"'
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        raise NotModified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+    return etag
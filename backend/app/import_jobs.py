@@ -0,0 +1,412 @@
+"""
+CSV/Excel import jobs (see docs/pipeline_import_ocr.md).
+
+POST /imports streams the upload to IMPORT_DIR and creates a pending
+ImportJob; the worker thread below claims it and parses the file in chunks of
+CHUNK_SIZE rows, so memory stays bounded whatever the file size. Each chunk is
+mapped to TransactionCreate payloads and handed to bulk_ingest (one multi-row
+INSERT and one batched classification per chunk), and the job's progress
+counters are committed in the same transaction as the chunk's rows: a job
+interrupted mid-way is picked up again after STALE_AFTER_SECONDS and resumes
+after `processed_rows`. Rows already stored by an earlier upload (same
+fingerprint, see bulk_ingest) are skipped and counted in `duplicate_rows`.
+
+Columns (header names are case-insensitive):
+    date         YYYY-MM-DD, DD/MM/YYYY or an ISO datetime (dates are Jakarta days)
+    description
+    amount       a number; "Rp" and thousands commas are ignored
+    type         income/expense/transfer; if empty, a negative amount is an expense
+    account      account name or id; optional when the job has a default account
+    category     optional category name or id; empty rows are auto-categorized
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib.util
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app import bulk_ingest, models, schemas
+from app.database import SessionLocal
+from app.rollups import JAKARTA_TZ
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+MAX_STORED_ERRORS = 1000
+# A running job whose progress has not moved for this long is considered abandoned.
+STALE_AFTER_SECONDS = 300
+RECOVERY_LIMIT = 100
+
+REQUIRED_COLUMNS = ("date", "description", "amount")
+SOURCES = {".csv": "csv", ".xlsx": "excel"}
+
+# Integer part either plain digits or grouped in threes by "." (id-ID) or ","
+# (en-US), then an optional decimal part after the other separator. A lone
+# separator followed by exactly three digits is grouping, so "50.000" is 50000.
+_AMOUNT_RE = re.compile(
+    r"^(?P<sign>-?)(?P<int>[1-9]\d{0,2}(?P<group>[.,])\d{3}(?:(?P=group)\d{3})*|\d+)"
+    r"(?:(?P<point>[.,])(?P<frac>\d+))?$"
+)
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (unreadable, missing columns)."""
+
+
+def _parse_date(value: Any) -> datetime:
+    """Naive UTC datetime; date-only values mean midnight in Jakarta."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        day = value
+    else:
+        text = str(value or "").strip()
+        if not text:
+            raise ValueError("date is required")
+        try:
+            if "/" in text:
+                day = datetime.strptime(text, "%d/%m/%Y").date()
+            elif len(text) == 10:
+                day = date.fromisoformat(text)
+            else:
+                parsed = datetime.fromisoformat(text)
+                if parsed.tzinfo is not None:
+                    parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+                return parsed
+        except ValueError:
+            raise ValueError(f"invalid date {text!r} (expected YYYY-MM-DD or DD/MM/YYYY)")
+    local_midnight = datetime(day.year, day.month, day.day, tzinfo=JAKARTA_TZ)
+    return local_midnight.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_amount(value: Any) -> Decimal:
+    """Accepts "Rp 1.250.000", "1.250.000,50", "1,250.50", "-18000"; rejects mixed-up separators."""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return Decimal(str(value))
+    text = str(value or "").strip().replace(" ", "")
+    if text[:2].lower() == "rp":
+        text = text[2:]
+    match = _AMOUNT_RE.match(text)
+    if not match or (match["group"] and match["group"] == match["point"]):
+        raise ValueError(f"invalid amount {value!r}")
+    integer = match["int"].replace(match["group"] or "", "")
+    fraction = f".{match['frac']}" if match["frac"] else ""
+    return Decimal(f"{match['sign']}{integer}{fraction}")
+
+
+class RowMapper:
+    """Turns file rows into TransactionCreate dicts; account/category names resolved per job."""
+
+    def __init__(self, db: Session, user_id: str, default_account_id: Optional[str]):
+        self.default_account_id = default_account_id
+        self.accounts: dict[str, str] = {}
+        for account_id, name in db.query(models.Account.id, models.Account.name).filter(
+            models.Account.user_id == user_id
+        ):
+            self.accounts[account_id] = account_id
+            self.accounts.setdefault(name.strip().lower(), account_id)
+        self.categories: dict[str, str] = {}
+        # The user's own categories win over global ones with the same name.
+        for category_id, name in db.query(models.Category.id, models.Category.name).filter(
+            (models.Category.user_id == None) | (models.Category.user_id == user_id)  # noqa: E711
+        ).order_by(models.Category.user_id.is_(None)):
+            self.categories[category_id] = category_id
+            self.categories.setdefault(name.strip().lower(), category_id)
+
+    def map(self, row: dict[str, Any]) -> dict[str, Any]:
+        amount = _parse_amount(row.get("amount"))
+        type_text = str(row.get("type") or "").strip().lower()
+        if type_text:
+            try:
+                tx_type = models.TransactionType(type_text)
+            except ValueError:
+                raise ValueError(f"invalid type {type_text!r}")
+        else:
+            tx_type = models.TransactionType.expense if amount < 0 else models.TransactionType.income
+
+        account_text = str(row.get("account") or "").strip()
+        if account_text:
+            account_id = self.accounts.get(account_text) or self.accounts.get(account_text.lower())
+            if account_id is None:
+                raise ValueError(f"unknown account {account_text!r}")
+        elif self.default_account_id:
+            account_id = self.default_account_id
+        else:
+            raise ValueError("account is required")
+
+        category_id = None
+        category_text = str(row.get("category") or "").strip()
+        if category_text:
+            category_id = self.categories.get(category_text) or self.categories.get(category_text.lower())
+            if category_id is None:
+                raise ValueError(f"unknown category {category_text!r}")
+
+        description = str(row.get("description") or "").strip() or None
+        return {
+            "account_id": account_id,
+            "category_id": category_id,
+            "type": tx_type,
+            "amount": float(abs(amount)),
+            "description": description,
+            "occurred_at": _parse_date(row.get("date")),
+            "source": "import",
+        }
+
+
+def _normalize_header(header: list[Any]) -> list[str]:
+    names = [str(name or "").strip().lower() for name in header]
+    missing = [name for name in REQUIRED_COLUMNS if name not in names]
+    if missing:
+        raise ImportFileError(f"Missing required columns: {', '.join(missing)}")
+    return names
+
+
+def _csv_rows(path: Path) -> tuple[Optional[int], Iterator[dict[str, Any]]]:
+    # First pass only counts records so progress can be reported; both passes stream.
+    with path.open(newline="", encoding="utf-8-sig") as handle:
+        total = max(sum(1 for _ in csv.reader(handle)) - 1, 0)
+
+    def rows() -> Iterator[dict[str, Any]]:
+        with path.open(newline="", encoding="utf-8-sig") as handle:
+            reader = csv.reader(handle)
+            names = _normalize_header(next(reader, []))
+            for values in reader:
+                yield dict(zip(names, values))
+
+    return total, rows()
+
+
+def excel_supported() -> bool:
+    """Whether openpyxl is installed, i.e. whether .xlsx uploads can be read."""
+    return importlib.util.find_spec("openpyxl") is not None
+
+
+def _excel_rows(path: Path) -> tuple[Optional[int], Iterator[dict[str, Any]]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:  # pragma: no cover - optional dependency
+        raise ImportFileError("Excel import requires openpyxl; upload a CSV instead")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    sheet = workbook.worksheets[0]
+    total = sheet.max_row - 1 if sheet.max_row else None
+
+    def rows() -> Iterator[dict[str, Any]]:
+        try:
+            values_iter = sheet.iter_rows(values_only=True)
+            names = _normalize_header(list(next(values_iter, ())))
+            for values in values_iter:
+                yield dict(zip(names, values))
+        finally:
+            workbook.close()
+
+    return total, rows()
+
+
+def _open_rows(job: models.ImportJob) -> tuple[Optional[int], Iterator[dict[str, Any]]]:
+    path = Path(job.file_path)
+    try:
+        if job.source == "excel":
+            return _excel_rows(path)
+        return _csv_rows(path)
+    except (OSError, UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f"Unreadable file: {exc}")
+
+
+def _is_blank(row: dict[str, Any]) -> bool:
+    return all(value is None or str(value).strip() == "" for value in row.values())
+
+
+def _count_occurrences(
+    mapper: RowMapper, user_id: str, rows: Iterator[dict[str, Any]], occurrences: dict[str, int]
+) -> None:
+    for row in rows:
+        if _is_blank(row):
+            continue
+        try:
+            payload = schemas.TransactionCreate.model_validate(mapper.map(row))
+        except ValueError:  # includes pydantic's ValidationError
+            continue
+        key = bulk_ingest.fingerprint_key(
+            user_id, payload.account_id, payload.type, payload.amount, payload.occurred_at, payload.description
+        )
+        occurrences[key] = occurrences.get(key, 0) + 1
+
+
+def _claim(db: Session, job_id: str) -> Optional[models.ImportJob]:
+    """Mark the job running unless another worker holds it; None when not claimable."""
+    job = models.ImportJob
+    now = datetime.utcnow()
+    claimable = (job.status == models.ImportStatus.pending) | (
+        (job.status == models.ImportStatus.running) & (job.updated_at < now - timedelta(seconds=STALE_AFTER_SECONDS))
+    )
+    claimed = (
+        db.query(job)
+        .filter(job.id == job_id, claimable)
+        .update({job.status: models.ImportStatus.running, job.updated_at: now}, synchronize_session=False)
+    )
+    db.commit()
+    return db.get(job, job_id) if claimed else None
+
+
+def process_job(db: Session, job_id: str, chunk_size: int = CHUNK_SIZE) -> Optional[models.ImportJob]:
+    """Run one import job to completion in the calling thread."""
+    job = _claim(db, job_id)
+    if job is None:
+        return None
+    summary = dict(job.summary or {})
+    errors: list[dict[str, Any]] = list(summary.get("errors", []))
+    # Numbering of identical rows across chunks (see bulk_ingest.fingerprint).
+    occurrences: dict[str, int] = {}
+    try:
+        total, rows = _open_rows(job)
+        job.total_rows = total
+        mapper = RowMapper(db, job.user_id, job.default_account_id)
+        # Rows 1..processed_rows were committed by an earlier, interrupted run;
+        # they are only re-read to restore the occurrence numbering.
+        row_number = job.processed_rows
+        _count_occurrences(mapper, job.user_id, islice(rows, row_number), occurrences)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            raw_rows, indexes, chunk_errors = [], [], []
+            for offset, row in enumerate(chunk, start=row_number + 1):
+                if _is_blank(row):
+                    continue
+                try:
+                    raw_rows.append(mapper.map(row))
+                    indexes.append(offset)
+                except ValueError as exc:
+                    chunk_errors.append(bulk_ingest.RowError(offset, str(exc)))
+            valid, invalid = bulk_ingest.validate_rows(raw_rows)
+            result = bulk_ingest.ingest(
+                db,
+                job.user_id,
+                [(indexes[i], payload) for i, payload in valid],
+                commit=False,
+                occurrences=occurrences,
+            )
+            chunk_errors += [bulk_ingest.RowError(indexes[err.index], err.message) for err in invalid]
+            chunk_errors += result.errors
+
+            row_number += len(chunk)
+            job.processed_rows = row_number
+            job.created_rows += len(result.created)
+            job.failed_rows += len(chunk_errors)
+            job.duplicate_rows += len(result.duplicates)
+            chunk_errors.sort(key=lambda err: err.index)
+            room = MAX_STORED_ERRORS - len(errors)
+            errors += [{"row": err.index, "message": err.message} for err in chunk_errors[:room]]
+            job.summary = {**summary, "errors": errors, "errors_truncated": job.failed_rows > len(errors)}
+            db.commit()
+            bulk_ingest.after_commit(job.user_id, result.created)
+        job.status = models.ImportStatus.completed
+    except ImportFileError as exc:
+        db.rollback()
+        job.status = models.ImportStatus.failed
+        job.error = str(exc)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        db.rollback()
+        job.status = models.ImportStatus.failed
+        job.error = f"Unreadable file: {exc}"
+    except Exception as exc:
+        db.rollback()
+        logger.exception("Import job %s failed", job_id)
+        job.status = models.ImportStatus.failed
+        job.error = f"Internal error: {exc.__class__.__name__}"
+    job.finished_at = datetime.utcnow()
+    db.commit()
+    return job
+
+
+class ImportWorker:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, chunk_size: int = CHUNK_SIZE):
+        self.session_factory = session_factory
+        self.chunk_size = chunk_size
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.processed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="import-worker", daemon=True)
+            self._thread.start()
+
+    def submit(self, job_id: str) -> None:
+        self._queue.put(job_id)
+        self.start()
+
+    def drain(self, timeout: float = 30.0) -> bool:
+        """Block until every submitted job has been processed; False on timeout."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def requeue_pending(self, limit: int = RECOVERY_LIMIT) -> int:
+        """Submit jobs that are pending or were abandoned mid-way by a previous process."""
+        job = models.ImportJob
+        cutoff = datetime.utcnow() - timedelta(seconds=STALE_AFTER_SECONDS)
+        db = self.session_factory()
+        try:
+            ids = [
+                row.id
+                for row in db.query(job.id)
+                .filter(
+                    (job.status == models.ImportStatus.pending)
+                    | ((job.status == models.ImportStatus.running) & (job.updated_at < cutoff))
+                )
+                .order_by(job.created_at)
+                .limit(limit)
+            ]
+        finally:
+            db.close()
+        for job_id in ids:
+            self._queue.put(job_id)
+        return len(ids)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            db = self.session_factory()
+            try:
+                process_job(db, job_id, self.chunk_size)
+                self.processed += 1
+            except Exception:  # pragma: no cover - keep the worker alive
+                logger.exception("Import job %s crashed the worker loop", job_id)
+            finally:
+                db.close()
+                self._queue.task_done()
+
+
+import_worker = ImportWorker()
@@ -1,21 +1,26 @@
 import os
 import time
 import logging
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from uuid import uuid4
 
 from typing import Any
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy import text
 from sqlalchemy.exc import OperationalError, IntegrityError
 
-from app import models
+from app import models, rollups
+from app.ai.categorize_worker import categorization_worker
+from app.config import get_settings
 from app.database import Base, engine
-from app.routers import accounts, auth, categories, transactions, dashboard
+from app.deps import NotModified
+from app.import_jobs import import_worker
+from app.routers import accounts, auth, categories, imports, transactions, dashboard
 from app.routers import ai as ai_router
 from app.security import get_password_hash
 
@@ -144,6 +149,7 @@ def seed_demo_data():
             )
             try:
                 db.add(tx)
+                rollups.apply_transaction(db, tx)
                 db.commit()
             except IntegrityError:
                 db.rollback()
@@ -154,7 +160,20 @@ def seed_demo_data():
 
 init_db_with_retry()
 
-app = FastAPI(title="Financial Tracker API", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    if get_settings().auto_categorize_mode == "deferred":
+        categorization_worker.requeue_pending()
+        categorization_worker.start()
+    import_worker.requeue_pending()
+    import_worker.start()
+    yield
+    import_worker.stop()
+    categorization_worker.stop()
+
+
+app = FastAPI(title="Financial Tracker API", version="0.1.0", lifespan=lifespan)
 logger = logging.getLogger(__name__)
 
 app.add_middleware(
@@ -164,12 +183,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(imports.UploadSizeLimitMiddleware)
 
 app.include_router(auth.router)
 app.include_router(accounts.router)
 app.include_router(categories.router)
 app.include_router(transactions.router)
 app.include_router(dashboard.router)
+app.include_router(imports.router)
 app.include_router(ai_router.router)
 
 
@@ -178,6 +199,8 @@ ERROR_CODE_MAP = {
     401: "UNAUTHORIZED",
     403: "FORBIDDEN",
     404: "NOT_FOUND",
+    409: "CONFLICT",
+    413: "PAYLOAD_TOO_LARGE",
     422: "VALIDATION_ERROR",
     429: "RATE_LIMITED",
     500: "INTERNAL_ERROR",
@@ -207,6 +230,11 @@ def http_exception_handler(request: Request, exc: HTTPException):
     return format_error(exc.status_code, detail, trace_id=trace_id)
 
 
+@app.exception_handler(NotModified)
+def not_modified_handler(request: Request, exc: NotModified):
+    return Response(status_code=304, headers={"ETag": exc.etag, "Cache-Control": "private, no-cache"})
+
+
 @app.exception_handler(RequestValidationError)
 def validation_exception_handler(request: Request, exc: RequestValidationError):
     # Pick first error message for brevity; could be expanded if needed.
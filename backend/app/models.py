@@ -4,13 +4,18 @@ from uuid import uuid4
 
 from sqlalchemy import (
     Column,
+    Date,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
+    Integer,
+    JSON,
     Numeric,
     String,
     Text,
 )
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import relationship
 
 from app.database import Base
@@ -27,6 +32,13 @@ class TransactionStatus(str, enum.Enum):
     confirmed = "confirmed"
 
 
+class ImportStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+
 def _uuid() -> str:
     return str(uuid4())
 
@@ -86,6 +98,13 @@ class Category(Base):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    # Same indexes as migration 0002, so create_all() databases get them too.
+    __table_args__ = (
+        Index("ix_transactions_user_occurred_at", "user_id", "occurred_at"),
+        Index("ix_transactions_user_category_occurred_at", "user_id", "category_id", "occurred_at"),
+        # Migration 0007; NULL fingerprints (manual entries) never conflict.
+        Index("ux_transactions_user_fingerprint", "user_id", "fingerprint", unique=True),
+    )
 
     id = Column(String, primary_key=True, default=_uuid)
     user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
@@ -100,6 +119,8 @@ class Transaction(Base):
     occurred_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     source = Column(String, default="manual")
     status = Column(Enum(TransactionStatus), default=TransactionStatus.confirmed, nullable=False)
+    # Duplicate detection for bulk/imported rows (see bulk_ingest.fingerprint); NULL for manual entries.
+    fingerprint = Column(String(64), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -115,3 +136,55 @@ class Transaction(Base):
         back_populates="predicted_transactions",
         foreign_keys=[predicted_category_id],
     )
+
+
+class DailyRollup(Base):
+    """
+    Per-user, per-Jakarta-day, per-category totals maintained on every transaction write.
+    Several rows may exist for the same key (concurrent first writes); readers always SUM.
+    """
+
+    __tablename__ = "daily_rollups"
+    __table_args__ = (
+        Index("ix_daily_rollups_user_date", "user_id", "local_date"),
+    )
+
+    id = Column(String, primary_key=True, default=_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    local_date = Column(Date, nullable=False)
+    category_id = Column(String, nullable=True)
+    type = Column(Enum(TransactionType), nullable=False)
+    amount_sum = Column(Numeric(16, 2), nullable=False, default=0)
+    tx_count = Column(Integer, nullable=False, default=0)
+
+
+class ImportJob(Base):
+    """
+    One uploaded CSV/Excel file. Progress counters are committed together with
+    each chunk of inserted rows, so a job interrupted mid-way resumes after
+    `processed_rows`. `summary` holds the (capped) per-row errors.
+    """
+
+    __tablename__ = "import_jobs"
+    __table_args__ = (
+        Index("ix_import_jobs_user_created_at", "user_id", "created_at"),
+    )
+
+    id = Column(String, primary_key=True, default=_uuid)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    source = Column(String, nullable=False)  # csv/excel
+    filename = Column(String, nullable=True)
+    file_path = Column(String, nullable=False)
+    # Used for rows without an `account` column value; no FK so the account can still be deleted.
+    default_account_id = Column(String, nullable=True)
+    status = Column(Enum(ImportStatus), default=ImportStatus.pending, nullable=False)
+    total_rows = Column(Integer, nullable=True)
+    processed_rows = Column(Integer, nullable=False, default=0)
+    created_rows = Column(Integer, nullable=False, default=0)
+    failed_rows = Column(Integer, nullable=False, default=0)
+    duplicate_rows = Column(Integer, nullable=False, default=0)
+    summary = Column(JSON().with_variant(postgresql.JSONB(), "postgresql"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,264 @@
+"""
+Daily per-user/category rollups backing the dashboard summary.
+
+Every transaction insert/delete adjusts the matching
+(user_id, local_date, category_id, type) row in the same DB transaction, so
+a summary only has to aggregate one row per day and category instead of every
+transaction in the range. local_date is the Asia/Jakarta calendar day of the
+stored (naive UTC) occurred_at.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Callable, Hashable, Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app import cache, models
+
+JAKARTA_TZ = ZoneInfo("Asia/Jakarta")
+BACKFILL_CHUNK_SIZE = 2000
+
+RollupKey = tuple[str, date, Optional[str], models.TransactionType]
+
+
+def local_date_of(occurred_at: datetime) -> date:
+    # The DB keeps the wall-clock value without offset and it is treated as UTC
+    # everywhere else (see _build_bounds/_resolve_period), so do the same here;
+    # an aware value (e.g. straight from a request payload) is converted instead.
+    if occurred_at.tzinfo is None:
+        occurred_at = occurred_at.replace(tzinfo=timezone.utc)
+    return occurred_at.astimezone(JAKARTA_TZ).date()
+
+
+def today_local() -> date:
+    return datetime.now(JAKARTA_TZ).date()
+
+
+def invalidate_cached(user_id: str, local_dates: Optional[Iterable[date]] = None) -> Optional[int]:
+    """
+    Drop the user's cached read models after committing a write. Caches of
+    closed periods (cache.CLOSED_GENERATION) survive unless the write touched
+    a day before today; pass local_dates=None when the affected days are unknown.
+    Returns the user's new data generation (None if the cache backend is down).
+    """
+    generation = cache.invalidate_user(user_id)
+    today = today_local()
+    if local_dates is None or any(d < today for d in local_dates):
+        cache.invalidate_user(user_id, cache.CLOSED_GENERATION)
+    return generation
+
+
+def _key(tx: models.Transaction) -> RollupKey:
+    return (tx.user_id, local_date_of(tx.occurred_at), tx.category_id, models.TransactionType(tx.type))
+
+
+def _apply_delta(db: Session, key: RollupKey, amount: Decimal, count: int) -> None:
+    user_id, local_date, category_id, tx_type = key
+    r = models.DailyRollup
+    category_clause = r.category_id.is_(None) if category_id is None else r.category_id == category_id
+    result = db.execute(
+        update(r)
+        .where(r.user_id == user_id, r.local_date == local_date, category_clause, r.type == tx_type)
+        .values(amount_sum=r.amount_sum + amount, tx_count=r.tx_count + count)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.add(
+            models.DailyRollup(
+                user_id=user_id,
+                local_date=local_date,
+                category_id=category_id,
+                type=tx_type,
+                amount_sum=amount,
+                tx_count=count,
+            )
+        )
+        db.flush()
+
+
+def _apply_deltas(db: Session, deltas: dict[RollupKey, list]) -> None:
+    """Set-based _apply_delta for many keys: one lookup, one executemany UPDATE, one INSERT."""
+    r = models.DailyRollup
+    dates_by_user: dict[str, set[date]] = defaultdict(set)
+    for user_id, local_date, _, _ in deltas:
+        dates_by_user[user_id].add(local_date)
+    existing: dict[RollupKey, str] = {}
+    for user_id, dates in dates_by_user.items():
+        rows = db.execute(
+            select(r.id, r.local_date, r.category_id, r.type).where(r.user_id == user_id, r.local_date.in_(dates))
+        )
+        for row in rows:
+            existing.setdefault((user_id, row.local_date, row.category_id, models.TransactionType(row.type)), row.id)
+
+    updates, inserts = [], []
+    for key, (amount, count) in deltas.items():
+        if key in existing:
+            updates.append({"rollup_id": existing[key], "delta_amount": amount, "delta_count": count})
+        else:
+            user_id, local_date, category_id, tx_type = key
+            inserts.append(
+                {
+                    "id": models._uuid(),
+                    "user_id": user_id,
+                    "local_date": local_date,
+                    "category_id": category_id,
+                    "type": tx_type,
+                    "amount_sum": amount,
+                    "tx_count": count,
+                }
+            )
+    table = r.__table__
+    if updates:
+        db.connection().execute(
+            update(table)
+            .where(table.c.id == bindparam("rollup_id"))
+            .values(
+                amount_sum=table.c.amount_sum + bindparam("delta_amount"),
+                tx_count=table.c.tx_count + bindparam("delta_count"),
+            ),
+            updates,
+        )
+    if inserts:
+        db.connection().execute(insert(table), inserts)
+
+
+def apply_transactions(db: Session, txs: Iterable[models.Transaction], sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) transactions from the rollups. Call before
+    the commit that persists/deletes them; deltas are merged per key first.
+    """
+    deltas: dict[RollupKey, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for tx in txs:
+        delta = deltas[_key(tx)]
+        delta[0] += Decimal(str(tx.amount)) * sign
+        delta[1] += sign
+    if len(deltas) > 1:
+        _apply_deltas(db, deltas)
+        return
+    for key, (amount, count) in deltas.items():
+        _apply_delta(db, key, amount, count)
+
+
+def apply_transaction(db: Session, tx: models.Transaction, sign: int = 1) -> None:
+    apply_transactions(db, [tx], sign)
+
+
+def uncategorize(db: Session, category_id: str) -> set[str]:
+    """
+    Move a category's rollups to the uncategorized (NULL) bucket, mirroring the
+    ORM nulling transactions.category_id when the category is deleted. Call
+    before that commit; returns the ids of the users whose rollups changed.
+    """
+    r = models.DailyRollup
+    user_ids = {user_id for (user_id,) in db.query(r.user_id).filter(r.category_id == category_id).distinct()}
+    if user_ids:
+        db.execute(
+            update(r)
+            .where(r.category_id == category_id)
+            .values(category_id=None)
+            .execution_options(synchronize_session=False)
+        )
+    return user_ids
+
+
+def rebuild(db: Session, user_id: Optional[str] = None, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """
+    Recompute rollups from raw transactions (all users or one) and commit.
+    Streams transactions, so memory grows with distinct days x categories only.
+    Returns the number of rollup rows written.
+    """
+    r = models.DailyRollup
+    tx = models.Transaction
+    delete_q = db.query(r)
+    if user_id is not None:
+        delete_q = delete_q.filter(r.user_id == user_id)
+    delete_q.delete(synchronize_session=False)
+
+    query = select(tx.user_id, tx.occurred_at, tx.category_id, tx.type, tx.amount)
+    if user_id is not None:
+        query = query.where(tx.user_id == user_id)
+    totals: dict[RollupKey, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for chunk in db.execute(query).yield_per(chunk_size).partitions():
+        for row in chunk:
+            key = (row.user_id, local_date_of(row.occurred_at), row.category_id, models.TransactionType(row.type))
+            totals[key][0] += Decimal(str(row.amount))
+            totals[key][1] += 1
+
+    rows = [
+        {
+            "id": models._uuid(),
+            "user_id": key[0],
+            "local_date": key[1],
+            "category_id": key[2],
+            "type": key[3],
+            "amount_sum": amount,
+            "tx_count": count,
+        }
+        for key, (amount, count) in totals.items()
+    ]
+    for start in range(0, len(rows), chunk_size):
+        db.execute(r.__table__.insert(), rows[start : start + chunk_size])
+    db.commit()
+    return len(rows)
+
+
+@dataclass
+class PeriodAggregate:
+    """Income/expense totals of a period plus expense (amount, tx_count) per category_id."""
+
+    income: Decimal = Decimal("0")
+    expense: Decimal = Decimal("0")
+    categories: dict[Optional[str], tuple[Decimal, int]] = field(default_factory=dict)
+
+    def add(self, category_id: Optional[str], tx_type: models.TransactionType, amount: Decimal, count: int) -> None:
+        if tx_type == models.TransactionType.income:
+            self.income += amount
+        elif tx_type == models.TransactionType.expense:
+            self.expense += amount
+            prev_amount, prev_count = self.categories.get(category_id, (Decimal("0"), 0))
+            self.categories[category_id] = (prev_amount + amount, prev_count + count)
+
+    def merge(self, other: "PeriodAggregate") -> None:
+        self.income += other.income
+        self.expense += other.expense
+        for category_id, (amount, count) in other.categories.items():
+            prev_amount, prev_count = self.categories.get(category_id, (Decimal("0"), 0))
+            self.categories[category_id] = (prev_amount + amount, prev_count + count)
+
+
+def aggregate_ranges(
+    db: Session,
+    user_id: str,
+    ranges: list[tuple[date, date]],
+    bucket_of: Callable[[date], Hashable] = lambda _: None,
+) -> dict[Hashable, PeriodAggregate]:
+    """
+    Aggregate the rollups of several disjoint [start, end] local-date ranges in
+    one query, folded into PeriodAggregates keyed by bucket_of(local_date).
+    """
+    if not ranges:
+        return {}
+    r = models.DailyRollup
+    rows = (
+        db.query(r.local_date, r.category_id, r.type, func.sum(r.amount_sum), func.sum(r.tx_count))
+        .filter(
+            r.user_id == user_id,
+            or_(*(and_(r.local_date >= start, r.local_date <= end) for start, end in ranges)),
+            r.type.in_([models.TransactionType.income, models.TransactionType.expense]),
+        )
+        .group_by(r.local_date, r.category_id, r.type)
+        .all()
+    )
+    result: dict[Hashable, PeriodAggregate] = defaultdict(PeriodAggregate)
+    for local_date, category_id, tx_type, amount, count in rows:
+        result[bucket_of(local_date)].add(
+            category_id, models.TransactionType(tx_type), Decimal(str(amount or 0)), int(count or 0)
+        )
+    return result
@@ -1,14 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import cache, models, rollups, schemas
+from app.ai.user_overrides import user_overrides
 from app.database import get_db
-from app.deps import get_current_user
+from app.deps import conditional_get, get_current_user
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
 
-@router.get("", response_model=list[schemas.AccountOut])
+@router.get("", response_model=list[schemas.AccountOut], dependencies=[Depends(conditional_get)])
 def list_accounts(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
     return db.query(models.Account).filter(models.Account.user_id == user.id).all()
 
@@ -24,11 +26,17 @@ def create_account(payload: schemas.AccountCreate, db: Session = Depends(get_db)
     db.add(account)
     db.commit()
     db.refresh(account)
+    cache.invalidate_user(user.id)
     return account
 
 
 @router.delete("/{account_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_account(account_id: str, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+def delete_account(
+    account_id: str,
+    cascade: bool = Query(default=False, description="Also delete the account's transactions"),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
     account = (
         db.query(models.Account)
         .filter(models.Account.user_id == user.id, models.Account.id == account_id)
@@ -36,6 +44,21 @@ def delete_account(account_id: str, db: Session = Depends(get_db), user: models.
     )
     if not account:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Account not found")
+    tx = models.Transaction
+    rows = db.execute(
+        select(tx.user_id, tx.occurred_at, tx.category_id, tx.type, tx.amount).where(tx.account_id == account.id)
+    ).all()
+    if rows and not cascade:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Account has {len(rows)} transactions; pass cascade=true to delete them with it",
+        )
+    # Take the cascaded transactions out of the rollups in the same commit.
+    rollups.apply_transactions(db, rows, sign=-1)
+    db.query(tx).filter(tx.account_id == account.id).delete(synchronize_session=False)
     db.delete(account)
     db.commit()
+    rollups.invalidate_cached(user.id, {rollups.local_date_of(row.occurred_at) for row in rows})
+    if rows:
+        user_overrides.invalidate(user.id)
     return None
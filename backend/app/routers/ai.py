@@ -1,23 +1,61 @@
 from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
 
 from app import schemas
-from app.ai.category_classifier import predict_category, load_model
+from app.ai.category_classifier import (
+    PredictionResult,
+    load_model,
+    model_stats,
+    predict_categories,
+    predict_category,
+    prediction_cache_stats,
+)
+from app.database import get_db
 from app.deps import get_current_user
 from app import models
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
 
-@router.post("/predict_category", response_model=schemas.PredictCategoryResponse)
-def predict_category_endpoint(
-    payload: schemas.PredictCategoryRequest,
-    user: models.User = Depends(get_current_user),  # noqa: ARG001
-):
-    model = load_model()
-    result = predict_category(payload.description, model=model)
+def _to_response(result: PredictionResult) -> schemas.PredictCategoryResponse:
     return schemas.PredictCategoryResponse(
         category_id=result.category_id,
         confidence=result.confidence,
         model_version=result.model_version,
         top_k=[schemas.CategoryScore(label=lbl, score=score) for lbl, score in result.top_k],
+        source=result.source,
     )
+
+
+@router.post("/predict_category", response_model=schemas.PredictCategoryResponse)
+def predict_category_endpoint(
+    payload: schemas.PredictCategoryRequest,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    model = load_model()
+    result = predict_category(payload.description, model=model, user_id=user.id, db=db)
+    return _to_response(result)
+
+
+@router.post("/predict_category/batch", response_model=schemas.PredictCategoryBatchResponse)
+def predict_category_batch_endpoint(
+    payload: schemas.PredictCategoryBatchRequest,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    model = load_model()
+    results = predict_categories(
+        [item.description for item in payload.items],
+        model=model,
+        top_k=payload.top_k,
+        user_id=user.id,
+        db=db,
+    )
+    return schemas.PredictCategoryBatchResponse(results=[_to_response(result) for result in results])
+
+
+@router.get("/model_stats", response_model=schemas.ModelStats)
+def model_stats_endpoint(user: models.User = Depends(get_current_user)):  # noqa: ARG001
+    load_model()
+    return schemas.ModelStats(**model_stats(), prediction_cache=prediction_cache_stats())
@@ -1,14 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import cache, models, rollups, schemas
+from app.ai.user_overrides import user_overrides
 from app.database import get_db
-from app.deps import get_current_user
+from app.deps import conditional_get, get_current_user
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
-@router.get("", response_model=list[schemas.CategoryOut])
+@router.get("", response_model=list[schemas.CategoryOut], dependencies=[Depends(conditional_get)])
 def list_categories(db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
     return (
         db.query(models.Category)
@@ -28,6 +29,7 @@ def create_category(payload: schemas.CategoryCreate, db: Session = Depends(get_d
     db.add(category)
     db.commit()
     db.refresh(category)
+    cache.invalidate_user(user.id)
     return category
 
 
@@ -40,6 +42,10 @@ def delete_category(category_id: str, db: Session = Depends(get_db), user: model
     )
     if not category:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    affected = rollups.uncategorize(db, category.id) | {user.id}
     db.delete(category)
     db.commit()
+    for user_id in affected:
+        rollups.invalidate_cached(user_id)
+        user_overrides.invalidate(user_id)
     return None
@@ -1,23 +1,42 @@
-from datetime import date, datetime, time, timezone
+from datetime import date, datetime, time, timedelta, timezone
 from decimal import Decimal
-import time as _time
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Literal, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 
-from app import models, schemas
+from app import cache, columnar, models, rollups, schemas
+from app.serialization import (
+    decode_aggregate,
+    decode_buckets,
+    decode_summary,
+    encode_aggregate,
+    encode_buckets,
+    encode_summary,
+)
 from app.database import get_db
-from app.deps import get_current_user
+from app.deps import conditional_get, get_current_user
 from app.rate_limit import check_rate_limit
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 JAKARTA_TZ = ZoneInfo("Asia/Jakarta")
 TWO_PLACES = Decimal("0.01")
 SUMMARY_CACHE_TTL_SECONDS = 300
-_summary_cache: dict[tuple[str, str, str, int], tuple[float, schemas.DashboardSummary]] = {}
+# Keyed (user_id, start, end, top_limit) in the shared backend; unreachable after any write by the user.
+_summary_cache = cache.UserScopedCache("summary", SUMMARY_CACHE_TTL_SECONDS, encode_summary, decode_summary)
+TIMESERIES_MAX_BUCKETS = 1000
+# Closed buckets never change unless a backdated write bumps the "closed" generation;
+# the TTL only bounds how long superseded generations linger in the backend.
+CLOSED_CACHE_TTL_SECONDS = 30 * 24 * 3600
+_closed_series_cache = cache.UserScopedCache(
+    "series", CLOSED_CACHE_TTL_SECONDS, encode_buckets, decode_buckets, generation=cache.CLOSED_GENERATION
+)
+_month_cache = cache.UserScopedCache(
+    "month", CLOSED_CACHE_TTL_SECONDS, encode_aggregate, decode_aggregate, generation=cache.CLOSED_GENERATION
+)
+Granularity = Literal["day", "week", "month"]
 
 
 def _to_decimal(value: Decimal | None) -> Decimal:
@@ -43,7 +62,59 @@ def _resolve_period(
     return start_dt, end_dt, start_date_local, end_date_local
 
 
-@router.get("/summary", response_model=schemas.DashboardSummary)
+def _month_end(month_start: date) -> date:
+    return (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+
+
+def _split_closed_months(start: date, end: date, today: date) -> tuple[list[date], list[tuple[date, date]]]:
+    """
+    Split [start, end] into whole calendar months that ended before today
+    (immutable, cacheable) and the remaining head/tail ranges to query fresh.
+    """
+    month = start if start.day == 1 else _month_end(start) + timedelta(days=1)
+    months = []
+    while _month_end(month) <= end and _month_end(month) < today:
+        months.append(month)
+        month = _month_end(month) + timedelta(days=1)
+    if not months:
+        return [], [(start, end)]
+    fresh = []
+    if start < months[0]:
+        fresh.append((start, months[0] - timedelta(days=1)))
+    tail_start = _month_end(months[-1]) + timedelta(days=1)
+    if tail_start <= end:
+        fresh.append((tail_start, end))
+    return months, fresh
+
+
+def _aggregate_period(db: Session, user_id: str, start: date, end: date) -> rollups.PeriodAggregate:
+    """
+    Closed months come from _month_cache (invalidated only by backdated writes);
+    uncached months and the head/tail partial ranges share one rollup query.
+    Per-category sums are merged before ranking, so the top-N stays exact.
+    """
+    months, fresh = _split_closed_months(start, end, rollups.today_local())
+    gen = _month_cache.current_generation(user_id)
+    cached = _month_cache.get_many(user_id, [(m.isoformat(),) for m in months], gen=gen)
+    missing = [m for m, agg in zip(months, cached) if agg is None]
+
+    ranges = sorted(fresh + [(m, _month_end(m)) for m in missing])
+    missing_set = set(missing)
+    by_bucket = rollups.aggregate_ranges(
+        db, user_id, ranges, bucket_of=lambda d: d.replace(day=1) if d.replace(day=1) in missing_set else None
+    )
+    total = by_bucket.pop(None, rollups.PeriodAggregate())
+    for month in missing:
+        agg = by_bucket.get(month, rollups.PeriodAggregate())
+        _month_cache.set(user_id, (month.isoformat(),), agg, gen=gen)
+        total.merge(agg)
+    for agg in cached:
+        if agg is not None:
+            total.merge(agg)
+    return total
+
+
+@router.get("/summary", response_model=schemas.DashboardSummary, dependencies=[Depends(conditional_get)])
 def get_summary(
     start_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta)"),
     end_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta)"),
@@ -51,63 +122,36 @@ def get_summary(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
-    start, end, start_date_local, end_date_local = _resolve_period(start_date, end_date)
+    _, _, start_date_local, end_date_local = _resolve_period(start_date, end_date)
 
-    cache_key = (user.id, start_date_local.isoformat(), end_date_local.isoformat(), top_limit)
-    cached = _summary_cache.get(cache_key)
-    now_ts = _time.time()
-    if cached and cached[0] > now_ts:
-        return cached[1]
+    cache_key = (start_date_local.isoformat(), end_date_local.isoformat(), top_limit)
+    gen = _summary_cache.current_generation(user.id)
+    cached = _summary_cache.get(user.id, *cache_key, gen=gen)
+    if cached is not None:
+        return cached
 
     check_rate_limit(user.id, "dashboard:summary")
+    aggregate = None
+    if columnar.enabled():
+        aggregate = columnar.store.aggregate(db, user.id, start_date_local, end_date_local)
+    if aggregate is None:
+        aggregate = _aggregate_period(db, user.id, start_date_local, end_date_local)
+    top = sorted(
+        ((cid, amount) for cid, (amount, count) in aggregate.categories.items() if count > 0),
+        key=lambda item: (-item[1], item[0] or ""),
+    )[:top_limit]
+    top_ids = [cid for cid, _ in top if cid is not None]
+    categories = {}
+    if top_ids:
+        categories = {
+            c.id: c
+            for c in db.query(models.Category.id, models.Category.name, models.Category.type)
+            .filter(models.Category.id.in_(top_ids))
+            .all()
+        }
 
-    base_q = (
-        db.query(models.Transaction)
-        .filter(
-            models.Transaction.user_id == user.id,
-            models.Transaction.occurred_at >= start,
-            models.Transaction.occurred_at <= end,
-        )
-    )
-
-    income = (
-        base_q.filter(models.Transaction.type == models.TransactionType.income)
-        .with_entities(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .scalar()
-    )
-    expense = (
-        base_q.filter(models.Transaction.type == models.TransactionType.expense)
-        .with_entities(func.coalesce(func.sum(models.Transaction.amount), 0))
-        .scalar()
-    )
-
-    top_q = (
-        db.query(
-            models.Transaction.category_id,
-            func.coalesce(models.Category.name, "Uncategorized").label("name"),
-            func.coalesce(func.sum(models.Transaction.amount), 0).label("total"),
-            func.coalesce(models.Category.type, models.Transaction.type).label("type"),
-        )
-        .join(models.Category, models.Category.id == models.Transaction.category_id, isouter=True)
-        .filter(
-            models.Transaction.user_id == user.id,
-            models.Transaction.occurred_at >= start,
-            models.Transaction.occurred_at <= end,
-            models.Transaction.type == models.TransactionType.expense,
-        )
-        .group_by(
-            models.Transaction.category_id,
-            models.Category.name,
-            models.Category.type,
-            models.Transaction.type,
-        )
-        .order_by(func.sum(models.Transaction.amount).desc())
-        .limit(top_limit)
-        .all()
-    )
-
-    income_dec = _to_decimal(income)
-    expense_dec = _to_decimal(expense)
+    income_dec = _to_decimal(aggregate.income)
+    expense_dec = _to_decimal(aggregate.expense)
     balance_dec = _to_decimal(income_dec - expense_dec)
 
     summary = schemas.DashboardSummary(
@@ -119,14 +163,118 @@ def get_summary(
         ),
         top_categories=[
             schemas.DashboardTopCategory(
-                category_id=row.category_id,
-                name=row.name,
-                amount=_to_decimal(row.total),
-                type=row.type,
+                category_id=cid,
+                name=categories[cid].name if cid in categories else "Uncategorized",
+                amount=_to_decimal(amount),
+                type=categories[cid].type if cid in categories else models.TransactionType.expense,
             )
-            for row in top_q
+            for cid, amount in top
         ],
         currency="IDR",
     )
-    _summary_cache[cache_key] = (now_ts + SUMMARY_CACHE_TTL_SECONDS, summary)
+    _summary_cache.set(user.id, cache_key, summary, gen=gen)
     return summary
+
+
+def _bucket_start(day: date, granularity: Granularity) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket_start(start: date, granularity: Granularity) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _bucket_ranges(start: date, end: date, granularity: Granularity) -> list[tuple[date, date]]:
+    """Calendar buckets covering [start, end], the first and last clipped to the range."""
+    ranges = []
+    natural = _bucket_start(start, granularity)
+    while natural <= end:
+        following = _next_bucket_start(natural, granularity)
+        ranges.append((max(natural, start), min(following - timedelta(days=1), end)))
+        if len(ranges) > TIMESERIES_MAX_BUCKETS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Range yields more than {TIMESERIES_MAX_BUCKETS} buckets; use a coarser granularity",
+            )
+        natural = following
+    return ranges
+
+
+def _query_buckets(
+    db: Session, user_id: str, ranges: list[tuple[date, date]], granularity: Granularity
+) -> list[schemas.DashboardBucket]:
+    """One grouped query over the daily rollups, folded into the given buckets."""
+    r = models.DailyRollup
+    sums = {_bucket_start(b_start, granularity): [Decimal("0"), Decimal("0")] for b_start, _ in ranges}
+    rows = (
+        db.query(r.local_date, r.type, func.coalesce(func.sum(r.amount_sum), 0))
+        .filter(
+            r.user_id == user_id,
+            r.local_date >= ranges[0][0],
+            r.local_date <= ranges[-1][1],
+            r.type.in_([models.TransactionType.income, models.TransactionType.expense]),
+        )
+        .group_by(r.local_date, r.type)
+        .all()
+    )
+    for local_date, tx_type, total in rows:
+        slot = 0 if tx_type == models.TransactionType.income else 1
+        sums[_bucket_start(local_date, granularity)][slot] += Decimal(str(total))
+    buckets = []
+    for b_start, b_end in ranges:
+        income, expense = sums[_bucket_start(b_start, granularity)]
+        buckets.append(
+            schemas.DashboardBucket(
+                start_date=b_start,
+                end_date=b_end,
+                income=_to_decimal(income),
+                expense=_to_decimal(expense),
+                balance=_to_decimal(income - expense),
+            )
+        )
+    return buckets
+
+
+@router.get("/timeseries", response_model=schemas.DashboardTimeseries, dependencies=[Depends(conditional_get)])
+def get_timeseries(
+    granularity: Granularity = Query(default="day", description="Bucket size, calendar-aligned in Asia/Jakarta"),
+    start_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta)"),
+    end_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta)"),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    _, _, start_date_local, end_date_local = _resolve_period(start_date, end_date)
+    ranges = _bucket_ranges(start_date_local, end_date_local, granularity)
+
+    # Buckets ending before today are immutable; only the rest is recomputed per request.
+    today = rollups.today_local()
+    closed = [b for b in ranges if b[1] < today]
+    open_ranges = ranges[len(closed) :]
+    closed_key = (granularity, start_date_local.isoformat(), closed[-1][1].isoformat()) if closed else None
+    gen = _closed_series_cache.current_generation(user.id)
+    closed_buckets = _closed_series_cache.get(user.id, *closed_key, gen=gen) if closed else []
+
+    if closed_buckets is None:
+        check_rate_limit(user.id, "dashboard:timeseries")
+        buckets = _query_buckets(db, user.id, ranges, granularity)
+        _closed_series_cache.set(user.id, closed_key, buckets[: len(closed)], gen=gen)
+    elif open_ranges:
+        check_rate_limit(user.id, "dashboard:timeseries")
+        buckets = closed_buckets + _query_buckets(db, user.id, open_ranges, granularity)
+    else:
+        buckets = closed_buckets
+
+    return schemas.DashboardTimeseries(
+        granularity=granularity,
+        period=schemas.DashboardPeriod(start_date=start_date_local, end_date=end_date_local),
+        buckets=buckets,
+        currency="IDR",
+    )
@@ -0,0 +1,173 @@
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from app.config import get_settings
+from app.database import get_db
+from app.deps import get_current_user
+from app.import_jobs import SOURCES, excel_supported, import_worker
+from app.rate_limit import check_rate_limit
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Room for multipart boundaries and the other form fields on top of the file itself.
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+ALLOWED_CONTENT_TYPES = {
+    "csv": {"text/csv", "text/plain", "application/csv", "application/vnd.ms-excel", "application/octet-stream"},
+    "excel": {"application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "application/octet-stream"},
+}
+
+
+def _get_job(db: Session, user: models.User, job_id: str) -> models.ImportJob:
+    job = (
+        db.query(models.ImportJob)
+        .filter(models.ImportJob.user_id == user.id, models.ImportJob.id == job_id)
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    return job
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds {max_bytes // (1024 * 1024)} MB")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Stop reading a POST /imports body as soon as it passes IMPORT_MAX_MB.
+
+    Form parsing spools the whole multipart body before the endpoint runs, so
+    the check in _save_upload alone would only fire after an oversized upload
+    had been received in full. This rejects a too-large Content-Length up front
+    and otherwise counts body bytes as they arrive; _save_upload still applies
+    the exact limit to the file part.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"].rstrip("/") != router.prefix:
+            await self.app(scope, receive, send)
+            return
+
+        max_bytes = get_settings().import_max_mb * 1024 * 1024
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            if declared.isdigit() and int(declared) > max_bytes + UPLOAD_FORM_OVERHEAD:
+                raise _too_large(max_bytes)
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes + UPLOAD_FORM_OVERHEAD:
+                    raise _too_large(max_bytes)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _save_upload(file: UploadFile, path: Path, max_bytes: int) -> None:
+    """Copy the upload to `path` in fixed-size chunks, enforcing the size limit as it goes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    try:
+        with path.open("wb") as out:
+            while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise _too_large(max_bytes)
+                out.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    if written == 0:
+        path.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail="File is empty")
+
+
+@router.post("", response_model=schemas.ImportJobOut, status_code=status.HTTP_202_ACCEPTED)
+def create_import(
+    file: UploadFile = File(...),
+    account_id: Optional[str] = Form(default=None),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    check_rate_limit(user.id, "imports:create", limit=10)
+    source = SOURCES.get(Path(file.filename or "").suffix.lower())
+    if source is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type; upload .csv or .xlsx")
+    if source == "excel" and not excel_supported():
+        raise HTTPException(status_code=400, detail="Excel import is not available on this server; upload a CSV instead")
+    content_type = (file.content_type or "application/octet-stream").split(";")[0].strip().lower()
+    if content_type not in ALLOWED_CONTENT_TYPES[source]:
+        raise HTTPException(status_code=400, detail=f"Unsupported content type {content_type}")
+    if account_id and not (
+        db.query(models.Account.id)
+        .filter(models.Account.user_id == user.id, models.Account.id == account_id)
+        .first()
+    ):
+        raise HTTPException(status_code=400, detail="Invalid account")
+
+    settings = get_settings()
+    job_id = models._uuid()
+    path = Path(settings.import_dir) / user.id / f"{job_id}.{'xlsx' if source == 'excel' else 'csv'}"
+    _save_upload(file, path, settings.import_max_mb * 1024 * 1024)
+
+    job = models.ImportJob(
+        id=job_id,
+        user_id=user.id,
+        source=source,
+        filename=file.filename,
+        file_path=str(path),
+        default_account_id=account_id,
+        status=models.ImportStatus.pending,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    import_worker.submit(job.id)
+    return job
+
+
+@router.get("", response_model=list[schemas.ImportJobOut])
+def list_imports(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    return (
+        db.query(models.ImportJob)
+        .filter(models.ImportJob.user_id == user.id)
+        .order_by(models.ImportJob.created_at.desc())
+        .limit(limit)
+        .all()
+    )
+
+
+@router.get("/{job_id}", response_model=schemas.ImportJobOut)
+def get_import(job_id: str, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    return _get_job(db, user, job_id)
+
+
+@router.get("/{job_id}/errors", response_model=schemas.ImportErrorsPage)
+def get_import_errors(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    job = _get_job(db, user, job_id)
+    stored = (job.summary or {}).get("errors", [])
+    return {
+        "items": stored[offset : offset + limit],
+        "total": job.failed_rows,
+        "truncated": job.failed_rows > len(stored),
+    }
@@ -1,19 +1,66 @@
+import base64
+import binascii
+import csv
+import enum
+import io
+import json
 from datetime import date, datetime, time, timezone
 from math import ceil
+from typing import Iterator, Literal, Optional
 from zoneinfo import ZoneInfo
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, tuple_
+from sqlalchemy.orm import Query as OrmQuery, Session
+from sqlalchemy.sql.elements import ColumnElement
 
-from app import models, schemas
-from app.database import get_db
-from app.deps import get_current_user
+from app import bulk_ingest, columnar, models, rollups, schemas, search
+from app.database import SessionLocal, get_db
+from app.deps import conditional_get, get_current_user
 from app.rate_limit import check_rate_limit
 from app.ai.category_classifier import predict_category, load_model
+from app.ai.categorize_worker import categorization_worker
+from app.ai.user_overrides import user_overrides
+from app.config import get_settings
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 JAKARTA_TZ = ZoneInfo("Asia/Jakarta")
 MAX_PAGE_SIZE = 100
+# count=estimate counts exactly up to this many rows, then falls back to the planner estimate.
+COUNT_ESTIMATE_CAP = 1000
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.occurred_at,
+    models.Transaction.type,
+    models.Transaction.amount,
+    models.Transaction.currency,
+    models.Transaction.description,
+    models.Transaction.account_id,
+    models.Transaction.category_id,
+    models.Transaction.status,
+    models.Transaction.source,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+# List items are built from these columns directly (same keys and JSON as TransactionOut).
+LIST_COLUMNS = {
+    column.key: column
+    for column in (
+        models.Transaction.account_id,
+        models.Transaction.category_id,
+        models.Transaction.type,
+        models.Transaction.amount,
+        models.Transaction.currency,
+        models.Transaction.description,
+        models.Transaction.occurred_at,
+        models.Transaction.status,
+        models.Transaction.source,
+        models.Transaction.id,
+        models.Transaction.predicted_category_id,
+        models.Transaction.predicted_confidence,
+    )
+}
 
 
 def _sanitize_search(term: str | None) -> str | None:
@@ -27,6 +74,47 @@ def _sanitize_search(term: str | None) -> str | None:
     return term
 
 
+def _encode_cursor(tx: models.Transaction) -> str:
+    raw = f"{tx.occurred_at.isoformat()}|{tx.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        occurred_at, tx_id = raw.split("|", 1)
+        return datetime.fromisoformat(occurred_at), tx_id
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _planner_estimate(db: Session, query: OrmQuery) -> Optional[int]:
+    """Row estimate from Postgres EXPLAIN; None on other databases or on failure."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    compiled = query.statement.compile(dialect=bind.dialect)
+    try:
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params).scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:  # pragma: no cover - estimate is best effort
+        return None
+
+
+def _count_items(db: Session, query: OrmQuery, mode: str) -> tuple[Optional[int], bool]:
+    """(total_items, is_estimate) for count=exact|estimate|none."""
+    if mode == "none":
+        return None, False
+    if mode == "exact":
+        return query.count(), False
+    capped = query.with_entities(models.Transaction.id).limit(COUNT_ESTIMATE_CAP + 1).subquery()
+    total = db.query(func.count()).select_from(capped).scalar()
+    if total <= COUNT_ESTIMATE_CAP:
+        return total, False
+    estimate = _planner_estimate(db, query)
+    return max(estimate or 0, total), True
+
+
 def _build_bounds(start_date: date | None, end_date: date | None) -> tuple[datetime | None, datetime | None]:
     if start_date and end_date and start_date > end_date:
         raise HTTPException(status_code=400, detail="start_date must be before or equal to end_date")
@@ -44,20 +132,108 @@ def _build_bounds(start_date: date | None, end_date: date | None) -> tuple[datet
     return start_dt, end_dt
 
 
-@router.get("", response_model=schemas.TransactionsPage)
+def _parse_fields(fields: str | None) -> list[str]:
+    """Requested list fields in LIST_COLUMNS order; id is always included."""
+    if not fields:
+        return list(LIST_COLUMNS)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - LIST_COLUMNS.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.add("id")
+    return [name for name in LIST_COLUMNS if name in requested]
+
+
+def _float_or_none(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+_LIST_CONVERTERS = {
+    "type": lambda value: value.value,
+    "status": lambda value: value.value,
+    "amount": float,
+    "predicted_confidence": _float_or_none,
+    "occurred_at": lambda value: value.isoformat(),
+}
+
+
+def _serialize_rows(rows, fields: list[str]) -> list[dict]:
+    """JSON-ready dicts from row tuples whose first len(fields) columns are `fields`."""
+    converters = [_LIST_CONVERTERS.get(name) for name in fields]
+    return [
+        {
+            name: value if convert is None else convert(value)
+            for name, convert, value in zip(fields, converters, row)
+        }
+        for row in rows
+    ]
+
+
+def _filter_transactions(
+    db: Session,
+    query: OrmQuery,
+    user_id: str,
+    start_dt: datetime | None,
+    end_dt: datetime | None,
+    category_id: str | None,
+    tx_type: models.TransactionType | None,
+    search_term: str | None,
+) -> tuple[OrmQuery, Optional[ColumnElement]]:
+    """Filters shared by the list and export endpoints; returns the query and the search rank (if any)."""
+    tx = models.Transaction
+    query = query.filter(tx.user_id == user_id)
+    if start_dt:
+        query = query.filter(tx.occurred_at >= start_dt)
+    if end_dt:
+        query = query.filter(tx.occurred_at <= end_dt)
+    if category_id:
+        query = query.filter(tx.category_id == category_id)
+    if tx_type:
+        query = query.filter(tx.type == tx_type)
+    if search_term:
+        return search.apply_search(db, query, search_term)
+    return query, None
+
+
+@router.get(
+    "",
+    dependencies=[Depends(conditional_get)],
+    responses={
+        200: {
+            "model": schemas.TransactionsPage | schemas.TransactionsSparsePage,
+            "description": "TransactionsPage by default; TransactionsSparsePage when `fields` is given",
+        }
+    },
+)
 def list_transactions(
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
     start_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta, inclusive)"),
     end_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta, inclusive)"),
     category_id: str | None = Query(default=None),
     type: models.TransactionType | None = Query(default=None),
-    q: str | None = Query(default=None, description="search in description"),
+    q: str | None = Query(default=None, description="search in description (all words, case-insensitive substring match)"),
+    sort: Literal["date", "relevance"] = Query(default="date", description="relevance ranks q matches best first"),
     page: int = Query(default=1, description="Page number (default 1)"),
     page_size: int = Query(default=20, description="Page size (default 20, max 100)"),
+    cursor: str | None = Query(default=None, description="next_cursor of the previous page; replaces page"),
+    count: Literal["exact", "estimate", "none"] = Query(
+        default="exact",
+        description=f"exact total, estimate (exact up to {COUNT_ESTIMATE_CAP} rows) or none (has_more only)",
+    ),
+    fields: str | None = Query(
+        default=None,
+        description=f"comma-separated item fields to return (id is always included): {', '.join(LIST_COLUMNS)}",
+    ),
 ):
     check_rate_limit(user.id, "transactions:list")
+    selected = _parse_fields(fields)
     warnings: list[str] = []
+    if cursor and page != 1:
+        warnings.append("page ignored when cursor is given")
+    if sort == "relevance" and cursor:
+        raise HTTPException(status_code=400, detail="cursor pagination requires sort=date")
     if page < 1:
         page = 1
         warnings.append("page reset to 1")
@@ -69,47 +245,140 @@ def list_transactions(
         warnings.append(f"page_size capped at {MAX_PAGE_SIZE}")
 
     start_dt, end_dt = _build_bounds(start_date, end_date)
-    search_term = _sanitize_search(q)
-
-    tx_query = db.query(models.Transaction).filter(models.Transaction.user_id == user.id)
-    if start_dt:
-        tx_query = tx_query.filter(models.Transaction.occurred_at >= start_dt)
-    if end_dt:
-        tx_query = tx_query.filter(models.Transaction.occurred_at <= end_dt)
-    if category_id:
-        tx_query = tx_query.filter(models.Transaction.category_id == category_id)
-    if type:
-        tx_query = tx_query.filter(models.Transaction.type == type)
-    if search_term:
-        like = f"%{search_term}%"
-        tx_query = tx_query.filter(models.Transaction.description.ilike(like))
-
-    total_items = tx_query.count()
-    total_pages = ceil(total_items / page_size) if total_items else 0
-    items = (
-        tx_query.order_by(models.Transaction.occurred_at.desc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
+    # Only the selected columns are fetched and rows stay plain tuples: no ORM
+    # instances, identity map or from_attributes validation per item.
+    columns = [LIST_COLUMNS[name] for name in selected]
+    if "occurred_at" not in selected:
+        columns.append(models.Transaction.occurred_at)  # for next_cursor
+    tx_query, rank = _filter_transactions(
+        db, db.query(*columns), user.id, start_dt, end_dt, category_id, type, _sanitize_search(q)
     )
-    return {
-        "items": items,
+
+    total_items, total_is_estimate = _count_items(db, tx_query, count)
+    total_pages = None if total_items is None else ceil(total_items / page_size)
+
+    # (occurred_at, id) is a total order, so a cursor continues exactly where the
+    # previous page stopped; keyset pages seek through ix_transactions_user_occurred_at
+    # instead of scanning and discarding OFFSET rows.
+    tx = models.Transaction
+    by_relevance = sort == "relevance" and rank is not None
+    order = (rank, tx.occurred_at.desc(), tx.id.desc()) if by_relevance else (tx.occurred_at.desc(), tx.id.desc())
+    page_query = tx_query.order_by(*order)
+    if cursor:
+        after_occurred_at, after_id = _decode_cursor(cursor)
+        page_query = page_query.filter(tuple_(tx.occurred_at, tx.id) < tuple_(after_occurred_at, after_id))
+    else:
+        page_query = page_query.offset((page - 1) * page_size)
+    rows = page_query.limit(page_size + 1).all()
+    items = rows[:page_size]
+    next_cursor = _encode_cursor(items[-1]) if len(rows) > page_size and not by_relevance else None
+    payload = {
+        "items": _serialize_rows(items, selected),
         "pagination": {
-            "page": page,
+            "page": None if cursor else page,
             "page_size": page_size,
             "total_items": total_items,
             "total_pages": total_pages,
+            "total_is_estimate": total_is_estimate,
+            "has_more": len(rows) > page_size,
+            "next_cursor": next_cursor,
             "warnings": warnings or None,
         },
     }
+    # Returned as-is: the items are already JSON-ready, so there is no response_model
+    # validation; the shapes are declared in `responses` for the OpenAPI schema and
+    # pinned by the tests. Carry over conditional_get's headers.
+    return JSONResponse(payload, headers=dict(response.headers))
+
+
+def _export_value(value):
+    if value is None:
+        return None
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value  # Decimal amounts: str() in CSV, numbers in NDJSON
+
+
+def _export_chunks(
+    export_format: str,
+    user_id: str,
+    start_dt: datetime | None,
+    end_dt: datetime | None,
+    category_id: str | None,
+    tx_type: models.TransactionType | None,
+    search_term: str | None,
+) -> Iterator[bytes]:
+    """
+    Stream the filtered transactions newest first. Runs after the request's
+    session is closed, so it owns one; yield_per keeps a server-side cursor
+    open on Postgres and rows are written from plain tuples, never ORM objects.
+    """
+    tx = models.Transaction
+    db = SessionLocal()
+    try:
+        query, _ = _filter_transactions(
+            db, db.query(*EXPORT_COLUMNS), user_id, start_dt, end_dt, category_id, tx_type, search_term
+        )
+        statement = query.order_by(tx.occurred_at.desc(), tx.id.desc()).statement
+        rows = db.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(EXPORT_FIELDS)
+        for chunk in rows.partitions():
+            for row in chunk:
+                values = [_export_value(value) for value in row]
+                if export_format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False, default=float))
+                    buffer.write("\n")
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+    finally:
+        db.close()
+
+
+@router.get("/export")
+def export_transactions(
+    user: models.User = Depends(get_current_user),
+    format: Literal["csv", "ndjson"] = Query(default="csv"),
+    start_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta, inclusive)"),
+    end_date: date | None = Query(default=None, description="YYYY-MM-DD (Asia/Jakarta, inclusive)"),
+    category_id: str | None = Query(default=None),
+    type: models.TransactionType | None = Query(default=None),
+    q: str | None = Query(default=None, description="search in description (all words, case-insensitive substring match)"),
+):
+    """All matching transactions in one streamed response (same filters as the list endpoint)."""
+    check_rate_limit(user.id, "transactions:export", limit=10)
+    # Validate before streaming starts; errors cannot change the status code afterwards.
+    start_dt, end_dt = _build_bounds(start_date, end_date)
+    chunks = _export_chunks(format, user.id, start_dt, end_dt, category_id, type, _sanitize_search(q))
+    filename = f"transactions-{datetime.now(JAKARTA_TZ):%Y%m%d}.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        chunks,
+        media_type="text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.post("", response_model=schemas.TransactionOut, status_code=status.HTTP_201_CREATED)
 def create_transaction(
     payload: schemas.TransactionCreate,
+    defer_prediction: bool | None = Query(
+        default=None,
+        description="Classify in the background after commit (default from AUTO_CATEGORIZE_MODE)",
+    ),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    if defer_prediction is None:
+        defer_prediction = get_settings().auto_categorize_mode == "deferred"
     category_id = payload.category_id
     predicted_category_id = None
     predicted_confidence = None
@@ -134,10 +403,11 @@ def create_transaction(
         )
         if not category:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid category")
-    else:
-        # Auto-predict category if not provided
+    elif not defer_prediction:
+        # Auto-predict category if not provided. Deferred rows stay pending (no category,
+        # predicted_confidence NULL) with the requested status until the worker scores them.
         model = load_model()
-        result = predict_category(payload.description or "", model=model)
+        result = predict_category(payload.description or "", model=model, user_id=user.id, db=db)
         predicted_category_id = result.category_id
         predicted_confidence = result.confidence
         if predicted_category_id:
@@ -159,6 +429,52 @@ def create_transaction(
         status=status_value,
     )
     db.add(tx)
+    rollups.apply_transaction(db, tx)
     db.commit()
     db.refresh(tx)
+    generation = rollups.invalidate_cached(user.id, [rollups.local_date_of(tx.occurred_at)])
+    if columnar.enabled():
+        columnar.store.append(user.id, tx, generation)
+    if defer_prediction and not payload.category_id:
+        categorization_worker.submit(tx.id)
+    if tx.status == models.TransactionStatus.confirmed:
+        user_overrides.record(user.id, tx.description, tx.category_id)
     return tx
+
+
+@router.post("/bulk", response_model=schemas.TransactionBulkResult)
+def create_transactions_bulk(
+    payload: schemas.TransactionBulkCreate,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    check_rate_limit(user.id, "transactions:bulk")
+    rows, errors = bulk_ingest.validate_rows(payload.items)
+    result = bulk_ingest.ingest(db, user.id, rows, classify=payload.classify)
+    errors = sorted(errors + result.errors, key=lambda err: err.index)
+    return {
+        "created": result.created,
+        "errors": [{"index": err.index, "message": err.message} for err in errors],
+        "duplicates": result.duplicates,
+    }
+
+
+@router.delete("/{tx_id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_transaction(tx_id: str, db: Session = Depends(get_db), user: models.User = Depends(get_current_user)):
+    tx = (
+        db.query(models.Transaction)
+        .filter(models.Transaction.user_id == user.id, models.Transaction.id == tx_id)
+        .first()
+    )
+    if not tx:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
+    rollups.apply_transaction(db, tx, sign=-1)
+    local_date = rollups.local_date_of(tx.occurred_at)
+    confirmed = tx.status == models.TransactionStatus.confirmed
+    description, category_id = tx.description, tx.category_id
+    db.delete(tx)
+    db.commit()
+    rollups.invalidate_cached(user.id, [local_date])
+    if confirmed:
+        user_overrides.forget(user.id, description, category_id)
+    return None
@@ -1,11 +1,11 @@
 from datetime import date, datetime, timedelta
-from typing import Optional
+from typing import Any, Literal, Optional
 
 from decimal import Decimal
 
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
 
-from app.models import TransactionStatus, TransactionType
+from app.models import ImportStatus, TransactionStatus, TransactionType
 
 
 class UserBase(BaseModel):
@@ -81,6 +81,23 @@ class TransactionOut(TransactionBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TransactionBulkCreate(BaseModel):
+    # Raw dicts so one malformed row is reported per index instead of failing the request.
+    items: list[dict[str, Any]] = Field(min_length=1, max_length=1000, description="TransactionCreate objects")
+    classify: bool = True
+
+
+class BulkRowError(BaseModel):
+    index: int
+    message: str
+
+
+class TransactionBulkResult(BaseModel):
+    created: list[TransactionOut]
+    errors: list[BulkRowError]
+    duplicates: list[int] = []  # indexes of rows already stored (same fingerprint)
+
+
 class DashboardPeriod(BaseModel):
     start_date: date
     end_date: date
@@ -106,6 +123,21 @@ class DashboardSummary(BaseModel):
     currency: str = "IDR"
 
 
+class DashboardBucket(BaseModel):
+    start_date: date
+    end_date: date
+    income: Decimal
+    expense: Decimal
+    balance: Decimal
+
+
+class DashboardTimeseries(BaseModel):
+    granularity: Literal["day", "week", "month"]
+    period: DashboardPeriod
+    buckets: list[DashboardBucket]
+    currency: str = "IDR"
+
+
 class CategoryScore(BaseModel):
     label: str
     score: float
@@ -122,16 +154,85 @@ class PredictCategoryResponse(BaseModel):
     confidence: float
     model_version: Optional[str] = None
     top_k: list[CategoryScore] = []
+    source: str = "model"
+
+
+class PredictCategoryBatchRequest(BaseModel):
+    items: list[PredictCategoryRequest] = Field(min_length=1, max_length=1000)
+    top_k: int = Field(default=3, ge=1, le=10)
+
+
+class PredictCategoryBatchResponse(BaseModel):
+    results: list[PredictCategoryResponse]
+
+
+class PredictionCacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+
+
+class ModelStats(BaseModel):
+    loaded: bool
+    model_version: Optional[str] = None
+    load_count: int
+    loaded_at: Optional[datetime] = None
+    age_seconds: Optional[float] = None
+    prediction_cache: Optional[PredictionCacheStats] = None
 
 
 class Pagination(BaseModel):
-    page: int
+    page: Optional[int] = None  # None in cursor mode
     page_size: int
-    total_items: int
-    total_pages: int
+    total_items: Optional[int] = None  # None with count=none
+    total_pages: Optional[int] = None
+    total_is_estimate: bool = False
+    has_more: bool = False
+    next_cursor: Optional[str] = None
     warnings: list[str] | None = None
 
 
 class TransactionsPage(BaseModel):
     items: list[TransactionOut]
     pagination: Pagination
+
+
+class TransactionFields(BaseModel):
+    id: str
+    model_config = ConfigDict(extra="allow")  # plus whichever columns `fields` named
+
+
+class TransactionsSparsePage(BaseModel):
+    """GET /transactions?fields=...: each item carries only id and the requested keys."""
+
+    items: list[TransactionFields]
+    pagination: Pagination
+
+
+class ImportJobOut(BaseModel):
+    id: str
+    status: ImportStatus
+    source: str
+    filename: Optional[str] = None
+    total_rows: Optional[int] = None
+    processed_rows: int
+    created_rows: int
+    failed_rows: int
+    duplicate_rows: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row, header excluded
+    message: str
+
+
+class ImportErrorsPage(BaseModel):
+    items: list[ImportRowError]
+    total: int  # rows that failed, including ones beyond the stored error cap
+    truncated: bool
@@ -0,0 +1,170 @@
+"""
+Indexed search over transaction descriptions. Every token is a
+case-insensitive substring match ("enang" finds "Kenangan") on every backend:
+
+    - PostgreSQL: pg_trgm GIN index on description; every token becomes an
+      ILIKE '%token%' the index can answer, ranked by word_similarity().
+    - SQLite: FTS5 table `transactions_fts` with the trigram tokenizer, so a
+      quoted token is a substring query, ranked by bm25. It stores the
+      transaction id next to the description (the implicit rowid of
+      `transactions` is not stable across VACUUM), and
+      `transactions_fts_keys` maps ids to FTS rows for the sync triggers.
+      Tokens shorter than a trigram fall back to LIKE.
+    - Anything else, or a SQLite database without the index (migration 0005
+      not applied, or no FTS5/trigram support), uses unindexed ILIKE per token.
+
+All tokens must match (AND). The index is created by migration 0005 and, for
+create_all() databases, by the DDL listeners at the bottom of this module.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import column, event, func, table, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Query, Session
+from sqlalchemy.sql.elements import ColumnElement
+
+from app import models
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "transactions_fts"
+FTS_KEYS_TABLE = "transactions_fts_keys"
+MAX_TOKENS = 8
+TRIGRAM = 3
+
+# Keep in step with migration 0005, which carries its own copy of this DDL.
+SQLITE_FTS_DDL = (
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        id UNINDEXED, description, tokenize='trigram'
+    )
+    """,
+    f"CREATE TABLE IF NOT EXISTS {FTS_KEYS_TABLE} (tx_id TEXT PRIMARY KEY, fts_rowid INTEGER NOT NULL)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions BEGIN
+        INSERT INTO {FTS_TABLE}(id, description) VALUES (new.id, new.description);
+        INSERT INTO {FTS_KEYS_TABLE}(tx_id, fts_rowid) VALUES (new.id, last_insert_rowid());
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT fts_rowid FROM {FTS_KEYS_TABLE} WHERE tx_id = old.id);
+        DELETE FROM {FTS_KEYS_TABLE} WHERE tx_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE OF description ON transactions BEGIN
+        UPDATE {FTS_TABLE} SET description = new.description
+        WHERE rowid = (SELECT fts_rowid FROM {FTS_KEYS_TABLE} WHERE tx_id = new.id);
+    END
+    """,
+)
+SQLITE_FTS_REBUILD = (
+    f"DELETE FROM {FTS_TABLE}",
+    f"DELETE FROM {FTS_KEYS_TABLE}",
+    f"INSERT INTO {FTS_TABLE}(id, description) SELECT id, description FROM transactions",
+    f"INSERT INTO {FTS_KEYS_TABLE}(tx_id, fts_rowid) SELECT id, rowid FROM {FTS_TABLE}",
+)
+SQLITE_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS transactions_fts_ai",
+    "DROP TRIGGER IF EXISTS transactions_fts_ad",
+    "DROP TRIGGER IF EXISTS transactions_fts_au",
+    f"DROP TABLE IF EXISTS {FTS_KEYS_TABLE}",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+)
+POSTGRES_TRGM_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm ON transactions USING gin (description gin_trgm_ops)",
+)
+
+_fts = table(FTS_TABLE, column("id"), column("rank"))
+_fts_available: dict[str, bool] = {}
+
+
+def tokenize(term: str) -> list[str]:
+    return re.findall(r"[^\W_]+", term.lower())[:MAX_TOKENS]
+
+
+def fts_match_expression(tokens: list[str]) -> str:
+    # With the trigram tokenizer a quoted string matches anywhere in the text.
+    return " AND ".join(f'"{token}"' for token in tokens)
+
+
+def _sqlite_fts_ready(db: Session) -> bool:
+    key = str(db.get_bind().url)
+    if key not in _fts_available:
+        # Both objects of the current layout; older or partial schemas use ILIKE.
+        found = db.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN (:fts, :keys)"),
+            {"fts": FTS_TABLE, "keys": FTS_KEYS_TABLE},
+        ).scalar()
+        _fts_available[key] = found == 2
+    return _fts_available[key]
+
+
+def apply_search(db: Session, query: Query, term: str) -> tuple[Query, Optional[ColumnElement]]:
+    """
+    Restrict a Transaction query to descriptions containing every token of `term`.
+    Returns the query and an ascending "best first" sort key (None if unranked).
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return query, None
+    tx = models.Transaction
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "sqlite" and _sqlite_fts_ready(db):
+        indexed = [token for token in tokens if len(token) >= TRIGRAM]
+        for token in tokens:
+            if len(token) < TRIGRAM:
+                query = query.filter(tx.description.ilike(f"%{token}%"))
+        if not indexed:
+            return query, None
+        query = query.join(_fts, _fts.c.id == tx.id).filter(
+            text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=fts_match_expression(indexed))
+        )
+        return query, _fts.c.rank  # bm25: lower is better
+
+    for token in tokens:
+        query = query.filter(tx.description.ilike(f"%{token}%"))
+    if dialect == "postgresql":
+        return query, -func.word_similarity(" ".join(tokens), tx.description)
+    return query, None
+
+
+def _sqlite_supports_trigram(connection) -> bool:
+    version = connection.exec_driver_sql("SELECT sqlite_version()").scalar()
+    fts5 = connection.exec_driver_sql("SELECT sqlite_compileoption_used('ENABLE_FTS5')").scalar()
+    return bool(fts5) and tuple(int(part) for part in version.split(".")[:2]) >= (3, 34)
+
+
+@event.listens_for(models.Transaction.__table__, "after_create")
+def _create_search_index(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        if not _sqlite_supports_trigram(connection):
+            logger.warning("SQLite lacks FTS5 trigram support; description search is unindexed")
+        else:
+            for statement in SQLITE_FTS_DROP + SQLITE_FTS_DDL + SQLITE_FTS_REBUILD:
+                connection.exec_driver_sql(statement)
+    elif connection.dialect.name == "postgresql":
+        try:
+            with connection.begin_nested():
+                for statement in POSTGRES_TRGM_DDL:
+                    connection.exec_driver_sql(statement)
+        except DBAPIError:
+            # CREATE EXTENSION needs privileges; search still works unindexed.
+            logger.warning("pg_trgm index not created; run migration 0005 as a privileged role")
+    _fts_available.clear()
+
+
+@event.listens_for(models.Transaction.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw) -> None:
+    if connection.dialect.name == "sqlite":
+        for statement in SQLITE_FTS_DROP:
+            connection.exec_driver_sql(statement)
+    _fts_available.clear()
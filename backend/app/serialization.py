@@ -0,0 +1,175 @@
+"""
+Compact binary encoding of cached read models.
+
+Dashboard summaries are cached in a shared backend (see app.cache), so they
+cross the network on every hit. JSON via pydantic is several times larger and
+slower to parse than this fixed struct layout:
+
+    header   <B I I q q q>  version, start/end date ordinals, income/expense/balance in cents
+    currency <B> length + utf-8
+    top      <H> count, then per category: <B q> type code, amount in cents,
+             followed by category_id and name as <H> length + utf-8 (0xFFFF = None)
+
+Time-series buckets are a <H> count followed by <I I q q> records (start/end
+ordinals, income/expense in cents). Period aggregates are <q q H> (income,
+expense, category count) followed by <q i> amount/tx_count and the
+category_id string per category. Amounts are Numeric(16,2) everywhere, so
+cents always fit in int64.
+"""
+
+from __future__ import annotations
+
+import struct
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+from app import schemas
+from app.models import TransactionType
+from app.rollups import PeriodAggregate
+
+SUMMARY_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BIIqqq")
+_CATEGORY = struct.Struct("<Bq")
+_BUCKET = struct.Struct("<IIqq")
+_AGGREGATE = struct.Struct("<qqH")
+_AGGREGATE_CATEGORY = struct.Struct("<qi")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_NONE_LEN = 0xFFFF
+
+_TYPE_CODES = {t: i for i, t in enumerate(TransactionType)}
+_TYPES_BY_CODE = list(TransactionType)
+
+
+def _cents(value: Decimal) -> int:
+    return int(value.scaleb(2).to_integral_value())
+
+
+def _from_cents(value: int) -> Decimal:
+    return Decimal(value).scaleb(-2)
+
+
+def _pack_str(parts: list[bytes], value: Optional[str]) -> None:
+    if value is None:
+        parts.append(_U16.pack(_NONE_LEN))
+        return
+    data = value.encode()
+    parts.append(_U16.pack(len(data)))
+    parts.append(data)
+
+
+def _unpack_str(buf: memoryview, offset: int) -> tuple[Optional[str], int]:
+    (length,) = _U16.unpack_from(buf, offset)
+    offset += _U16.size
+    if length == _NONE_LEN:
+        return None, offset
+    return bytes(buf[offset : offset + length]).decode(), offset + length
+
+
+def encode_summary(summary: schemas.DashboardSummary) -> bytes:
+    totals = summary.totals
+    currency = summary.currency.encode()
+    parts = [
+        _HEADER.pack(
+            SUMMARY_FORMAT_VERSION,
+            summary.period.start_date.toordinal(),
+            summary.period.end_date.toordinal(),
+            _cents(totals.income),
+            _cents(totals.expense),
+            _cents(totals.balance),
+        ),
+        _U8.pack(len(currency)),
+        currency,
+        _U16.pack(len(summary.top_categories)),
+    ]
+    for cat in summary.top_categories:
+        parts.append(_CATEGORY.pack(_TYPE_CODES[TransactionType(cat.type)], _cents(cat.amount)))
+        _pack_str(parts, cat.category_id)
+        _pack_str(parts, cat.name)
+    return b"".join(parts)
+
+
+def decode_summary(data: bytes) -> schemas.DashboardSummary:
+    buf = memoryview(data)
+    version, start, end, income, expense, balance = _HEADER.unpack_from(buf, 0)
+    if version != SUMMARY_FORMAT_VERSION:
+        raise ValueError(f"unsupported summary format version {version}")
+    offset = _HEADER.size
+    (currency_len,) = _U8.unpack_from(buf, offset)
+    offset += _U8.size
+    currency = bytes(buf[offset : offset + currency_len]).decode()
+    offset += currency_len
+    (count,) = _U16.unpack_from(buf, offset)
+    offset += _U16.size
+
+    top = []
+    for _ in range(count):
+        type_code, amount = _CATEGORY.unpack_from(buf, offset)
+        offset += _CATEGORY.size
+        category_id, offset = _unpack_str(buf, offset)
+        name, offset = _unpack_str(buf, offset)
+        top.append(
+            schemas.DashboardTopCategory(
+                category_id=category_id,
+                name=name,
+                amount=_from_cents(amount),
+                type=_TYPES_BY_CODE[type_code],
+            )
+        )
+    return schemas.DashboardSummary(
+        period=schemas.DashboardPeriod(start_date=date.fromordinal(start), end_date=date.fromordinal(end)),
+        totals=schemas.DashboardTotals(
+            income=_from_cents(income),
+            expense=_from_cents(expense),
+            balance=_from_cents(balance),
+        ),
+        top_categories=top,
+        currency=currency,
+    )
+
+
+def encode_buckets(buckets: list[schemas.DashboardBucket]) -> bytes:
+    parts = [_U16.pack(len(buckets))]
+    for b in buckets:
+        parts.append(
+            _BUCKET.pack(b.start_date.toordinal(), b.end_date.toordinal(), _cents(b.income), _cents(b.expense))
+        )
+    return b"".join(parts)
+
+
+def decode_buckets(data: bytes) -> list[schemas.DashboardBucket]:
+    (count,) = _U16.unpack_from(data, 0)
+    buckets = []
+    for start, end, income, expense in _BUCKET.iter_unpack(data[_U16.size : _U16.size + count * _BUCKET.size]):
+        buckets.append(
+            schemas.DashboardBucket(
+                start_date=date.fromordinal(start),
+                end_date=date.fromordinal(end),
+                income=_from_cents(income),
+                expense=_from_cents(expense),
+                balance=_from_cents(income - expense),
+            )
+        )
+    return buckets
+
+
+def encode_aggregate(agg: PeriodAggregate) -> bytes:
+    parts = [_AGGREGATE.pack(_cents(agg.income), _cents(agg.expense), len(agg.categories))]
+    for category_id, (amount, count) in agg.categories.items():
+        parts.append(_AGGREGATE_CATEGORY.pack(_cents(amount), count))
+        _pack_str(parts, category_id)
+    return b"".join(parts)
+
+
+def decode_aggregate(data: bytes) -> PeriodAggregate:
+    buf = memoryview(data)
+    income, expense, count = _AGGREGATE.unpack_from(buf, 0)
+    offset = _AGGREGATE.size
+    categories = {}
+    for _ in range(count):
+        amount, tx_count = _AGGREGATE_CATEGORY.unpack_from(buf, offset)
+        offset += _AGGREGATE_CATEGORY.size
+        category_id, offset = _unpack_str(buf, offset)
+        categories[category_id] = (_from_cents(amount), tx_count)
+    return PeriodAggregate(income=_from_cents(income), expense=_from_cents(expense), categories=categories)
@@ -0,0 +1,33 @@
+"""
+Rebuild daily_rollups from raw transactions.
+
+Usage:
+    DATABASE_URL=... python scripts/backfill_rollups.py [user_id]
+
+Without a user_id every user's rollups are recomputed. Run it after bulk
+fixes made directly in SQL; normal API writes keep rollups current.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from app import rollups
+from app.database import SessionLocal
+
+
+def main():
+    user_id = sys.argv[1] if len(sys.argv) >= 2 else None
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        written = rollups.rebuild(db, user_id=user_id)
+    finally:
+        db.close()
+    scope = f"user {user_id}" if user_id else "all users"
+    print(f"rebuilt {written} rollup rows for {scope} in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+Latency/throughput benchmark for the category classifier.
+
+Usage:
+    python scripts/benchmark_classifier.py [--synthetic N] [--formats joblib,arrays,arrays-int8]
+                                           [--iterations N] [--out results.json]
+
+Trains on ml_artifacts/training_data_id.csv (or N synthetic descriptions) into
+a temporary artifact directory, then for each artifact format measures
+(format "current" benchmarks the artifacts already deployed in ml_artifacts/):
+    - load time (cold load from disk, no resident cache)
+    - resident memory growth after loading and warming the model
+    - single-item predict() latency p50/p95/p99
+    - predict_many() throughput at several batch sizes
+Prints one JSON document (also written to --out) so runs can be diffed
+across model versions and artifact formats before deploying.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gc
+import json
+import platform
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from app.ai import category_classifier as cc
+
+BATCH_SIZES = (1, 16, 64, 256, 1024)
+TRAINING_CSV = cc.ARTIFACT_DIR / "training_data_id.csv"
+
+_MERCHANTS = {
+    "food": ["warteg", "nasi padang", "gofood", "bakso", "kopi kenangan", "mcd", "sate ayam"],
+    "transport": ["grab bike", "gojek", "krl", "transjakarta", "parkir", "tol jagorawi", "bluebird"],
+    "groceries": ["indomaret", "alfamart", "superindo", "hypermart", "pasar minggu"],
+    "utilities": ["pln token", "pdam", "indihome", "telkomsel pulsa", "bpjs"],
+    "fuel": ["pertamina", "shell", "bensin pertalite", "vivo"],
+    "income-salary": ["gaji bulanan", "payroll kantor", "thr"],
+}
+_TEMPLATES = ["{m}", "bayar {m}", "{m} {n}", "beli di {m}", "{m} cabang {n}", "trx {m} {n}"]
+
+
+def _synthetic(n: int, seed: int = 7) -> tuple[list[str], list[str]]:
+    rng = random.Random(seed)
+    labels = list(_MERCHANTS)
+    texts, ys = [], []
+    for _ in range(n):
+        label = rng.choice(labels)
+        template = rng.choice(_TEMPLATES)
+        texts.append(template.format(m=rng.choice(_MERCHANTS[label]), n=rng.randint(1, 999)))
+        ys.append(label)
+    return texts, ys
+
+
+def _csv_rows() -> tuple[list[str], list[str]]:
+    with TRAINING_CSV.open() as f:
+        rows = list(csv.DictReader(f))
+    return [r["description"] for r in rows], [r["category_id"] for r in rows]
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _use_artifact_dir(path: Path) -> None:
+    cc.ARTIFACT_DIR = path
+    cc.MODEL_PATH = path / "category_model.pkl"
+    cc.META_PATH = path / "category_meta.json"
+    cc.reset_model_cache()
+
+
+def _artifact_bytes() -> int:
+    meta = cc._read_meta()
+    if meta.get("format") == "arrays":
+        files = [p for p in (cc.ARTIFACT_DIR / cc.ARRAY_DIR_NAME / meta["arrays_path"]).iterdir() if p.is_file()]
+    else:
+        files = [cc.MODEL_PATH]
+    return sum(p.stat().st_size for p in files) + cc.META_PATH.stat().st_size
+
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    arr = np.asarray(samples_ms)
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "p99_ms": round(float(np.percentile(arr, 99)), 4),
+        "mean_ms": round(float(arr.mean()), 4),
+    }
+
+
+def bench_format(
+    fmt: str,
+    texts: list[str],
+    labels: list[str],
+    queries: list[str],
+    iterations: int,
+    deployed_dir: Path,
+) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        if fmt == "current":
+            _use_artifact_dir(deployed_dir)
+        else:
+            _use_artifact_dir(Path(tmp))
+            cc.train(
+                texts,
+                labels,
+                threshold=0.0,
+                model_version=f"bench-{fmt}",
+                artifact_format="joblib" if fmt == "joblib" else "arrays",
+                quantize=fmt == "arrays-int8",
+            )
+
+        gc.collect()
+        rss_before = _rss_mb()
+        started = time.perf_counter()
+        model = cc._load_from_disk()
+        load_ms = (time.perf_counter() - started) * 1000
+        if model is None:
+            raise RuntimeError(f"failed to load {fmt} artifacts")
+        model.predict_many(queries[:256])  # warm up: touch mapped pages
+        rss_after = _rss_mb()
+
+        single = []
+        for i in range(iterations):
+            text = queries[i % len(queries)]
+            t0 = time.perf_counter()
+            model.predict(text)
+            single.append((time.perf_counter() - t0) * 1000)
+
+        throughput = {}
+        for size in BATCH_SIZES:
+            batch = [queries[i % len(queries)] for i in range(size)]
+            rounds = max(3, min(200, 2000 // size))
+            t0 = time.perf_counter()
+            for _ in range(rounds):
+                model.predict_many(batch)
+            elapsed = time.perf_counter() - t0
+            throughput[str(size)] = {
+                "items_per_sec": round(size * rounds / elapsed, 1),
+                "ms_per_batch": round(elapsed / rounds * 1000, 4),
+            }
+
+        artifact_bytes = _artifact_bytes()
+        model_version = model.model_version
+        del model
+        return {
+            "format": fmt,
+            "model_version": model_version,
+            "load_ms": round(load_ms, 3),
+            "rss_delta_mb": round(rss_after - rss_before, 2),
+            "artifact_bytes": artifact_bytes,
+            "single": _percentiles(single),
+            "batch": throughput,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="train on N synthetic rows instead of the CSV")
+    parser.add_argument("--formats", default="joblib,arrays,arrays-int8")
+    parser.add_argument("--iterations", type=int, default=2000, help="single-item predictions to time")
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    texts, labels = _synthetic(args.synthetic) if args.synthetic else _csv_rows()
+    queries, _ = _synthetic(2048, seed=11)
+
+    original_dir = cc.ARTIFACT_DIR
+    try:
+        results = [
+            bench_format(fmt, texts, labels, queries, args.iterations, original_dir)
+            for fmt in args.formats.split(",")
+        ]
+    finally:
+        _use_artifact_dir(original_dir)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "training_rows": len(texts),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+End-to-end benchmark for the CSV import pipeline against the 5k-rows SLA.
+
+Usage:
+    python scripts/benchmark_import.py [--rows 5000] [--chunk-size 500] [--categorized 0.3]
+                                       [--database-url URL] [--out results.json]
+
+Generates a synthetic bank-statement CSV (a share of rows with a category
+column, the rest left to the classifier), trains a category model on similar
+synthetic descriptions into a temporary artifact dir, creates a throwaway
+user/account and runs the import job in-process exactly as the worker does.
+Without --database-url a temporary SQLite database is used, so neither the
+configured DB nor ml_artifacts/ is touched. Reports wall time, rows/sec, peak RSS and the margin against
+the SLA (docs/pipeline_import_ocr.md: 5k rows in under 5 minutes); exits 1 if
+the SLA is missed.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+SLA_SECONDS = 300
+SLA_ROWS = 5000
+
+_MERCHANTS = {
+    "Makan": ["warteg bahari", "nasi padang sederhana", "gofood ayam geprek", "bakso malang", "kopi kenangan"],
+    "Transport": ["grab bike", "gojek", "krl commuter", "transjakarta", "parkir mall", "tol jagorawi"],
+    "Tagihan": ["pln token listrik", "pdam", "indihome", "telkomsel pulsa", "bpjs kesehatan"],
+    "Kesehatan": ["apotek k24", "kimia farma", "klinik pratama", "halodoc"],
+}
+
+
+def _write_csv(path: Path, rows: int, categorized: float, seed: int = 7) -> None:
+    rng = random.Random(seed)
+    start = date(2025, 1, 1)
+    with path.open("w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["date", "description", "amount", "type", "account", "category"])
+        for i in range(rows):
+            day = start + timedelta(days=rng.randrange(365))
+            if rng.random() < 0.05:
+                writer.writerow([day.isoformat(), "gaji bulanan", rng.randrange(5_000, 15_000) * 1000, "income", "Bench", "Gaji"])
+                continue
+            category = rng.choice(list(_MERCHANTS))
+            merchant = rng.choice(_MERCHANTS[category])
+            writer.writerow(
+                [
+                    day.strftime("%d/%m/%Y") if i % 2 else day.isoformat(),
+                    f"{merchant} {rng.randrange(1000)}",
+                    f"{rng.randrange(5, 500) * 1000:,}",
+                    "expense",
+                    "Bench",
+                    category if rng.random() < categorized else "",
+                ]
+            )
+
+
+def _train_classifier(db, models, artifact_dir: Path, seed: int = 11) -> str:
+    """Train and load a category model on the global categories, published under `artifact_dir`."""
+    from app.ai import category_classifier as cc
+
+    cc.ARTIFACT_DIR = artifact_dir
+    cc.MODEL_PATH = artifact_dir / "category_model.pkl"
+    cc.META_PATH = artifact_dir / "category_meta.json"
+    ids = dict(db.query(models.Category.name, models.Category.id).filter(models.Category.user_id.is_(None)))
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for _ in range(2000):
+        category = rng.choice(list(_MERCHANTS))
+        texts.append(f"{rng.choice(_MERCHANTS[category])} {rng.randrange(1000)}")
+        labels.append(ids[category])
+    texts += ["gaji bulanan", "gaji bonus"] * 20
+    labels += [ids["Gaji"]] * 40
+    cc.train(texts, labels, model_version="bench")
+    cc.reset_model_cache()
+    classifier = cc.load_model()
+    if classifier is None:
+        raise RuntimeError(f"trained model could not be loaded from {artifact_dir}")
+    return classifier.model_version
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=SLA_ROWS)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--categorized", type=float, default=0.3, help="share of rows with a category column")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-import-"))
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.setdefault("SEED_DEMO_DATA", "false")
+
+    # Imported after DATABASE_URL is set: app.database binds its engine at import time.
+    from app import import_jobs, models, search  # noqa: F401  (search registers the FTS listeners)
+    from app.database import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    csv_path = workdir / "statement.csv"
+    _write_csv(csv_path, args.rows, args.categorized)
+    rss_before = _peak_rss_mb()
+
+    db = SessionLocal()
+    try:
+        for name, ctype in [("Gaji", "income"), *((name, "expense") for name in _MERCHANTS)]:
+            if not db.query(models.Category).filter_by(user_id=None, name=name).first():
+                db.add(models.Category(user_id=None, name=name, type=models.TransactionType(ctype)))
+        user = models.User(email=f"bench_{uuid4().hex}@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.add(models.Account(user_id=user.id, name="Bench", type="bank", currency="IDR"))
+        job = models.ImportJob(user_id=user.id, source="csv", filename=csv_path.name, file_path=str(csv_path))
+        db.add(job)
+        db.commit()
+        model_version = _train_classifier(db, models, workdir / "ml_artifacts")
+
+        started = time.perf_counter()
+        job = import_jobs.process_job(db, job.id, args.chunk_size or import_jobs.CHUNK_SIZE)
+        elapsed = time.perf_counter() - started
+        result = {
+            "status": job.status.value,
+            "error": job.error,
+            "rows": job.total_rows,
+            "created": job.created_rows,
+            "failed": job.failed_rows,
+            "categorized": db.query(models.Transaction)
+            .filter(models.Transaction.user_id == user.id, models.Transaction.category_id.isnot(None))
+            .count(),
+            "model_version": model_version,
+        }
+    finally:
+        db.close()
+
+    projected = elapsed * SLA_ROWS / max(args.rows, 1)
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "database": engine.dialect.name,
+        "chunk_size": args.chunk_size or import_jobs.CHUNK_SIZE,
+        "csv_bytes": csv_path.stat().st_size,
+        **result,
+        "seconds": round(elapsed, 3),
+        "rows_per_second": round(args.rows / elapsed, 1) if elapsed else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+        "sla": {
+            "rows": SLA_ROWS,
+            "seconds": SLA_SECONDS,
+            "projected_seconds": round(projected, 3),
+            "margin": round(SLA_SECONDS / projected, 1) if projected else None,
+        },
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(output)
+    print(output)
+    if result["status"] != "completed" or projected > SLA_SECONDS:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
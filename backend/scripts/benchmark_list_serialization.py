@@ -0,0 +1,164 @@
+"""
+Per-row cost of building GET /transactions pages: ORM + TransactionOut vs row tuples.
+
+Usage:
+    python scripts/benchmark_list_serialization.py [--rows 20000] [--page-size 100]
+                                                   [--iterations 200] [--out results.json]
+
+Seeds a temporary SQLite database with --rows transactions for one user, then
+times fetching and serializing pages of --page-size rows to JSON bytes with:
+    orm         db.query(Transaction) + TransactionsPage validation (from_attributes)
+                + model_dump(mode="json"), what the endpoint did before `fields=`
+    core        the selected LIST_COLUMNS as row tuples + _serialize_rows (current default)
+    core-sparse the same with fields=occurred_at,description,amount
+Reports microseconds per row (median over iterations), split into fetching the
+rows and turning them into JSON, and the speedups vs orm.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+SPARSE_FIELDS = "occurred_at,description,amount"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--out", type=Path, default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-list-"))
+    os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+
+    # Imported after DATABASE_URL is set: app.database binds its engine at import time.
+    import sqlalchemy as sa
+
+    from app import models, schemas
+    from app.database import Base, SessionLocal, engine
+    from app.routers.transactions import LIST_COLUMNS, _parse_fields, _serialize_rows
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = models.User(email="bench@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    account = models.Account(user_id=user.id, name="Bench", type="bank")
+    db.add(account)
+    db.flush()
+    start = datetime(2025, 1, 1)
+    db.execute(
+        sa.insert(models.Transaction.__table__),
+        [
+            {
+                "id": models._uuid(),
+                "user_id": user.id,
+                "account_id": account.id,
+                "type": models.TransactionType.expense,
+                "amount": Decimal(1000 + i),
+                "currency": "IDR",
+                "description": f"warteg bahari {i}",
+                "occurred_at": start + timedelta(minutes=i),
+                "source": "manual",
+                "status": models.TransactionStatus.confirmed,
+            }
+            for i in range(args.rows)
+        ],
+    )
+    db.commit()
+    tx = models.Transaction
+    order = (tx.occurred_at.desc(), tx.id.desc())
+
+    def page_offset(i: int) -> int:
+        # Stay within the first pages so OFFSET scanning does not drown the per-row costs.
+        return (i % 10) * args.page_size
+
+    def orm_page(session, i: int):
+        rows = (
+            session.query(tx)
+            .filter(tx.user_id == user.id)
+            .order_by(*order)
+            .offset(page_offset(i))
+            .limit(args.page_size)
+            .all()
+        )
+        fetched = time.perf_counter()
+        page = schemas.TransactionsPage.model_validate({"items": rows, "pagination": {"page_size": args.page_size}})
+        return fetched, json.dumps(page.model_dump(mode="json")).encode()
+
+    def core_page(fields):
+        selected = _parse_fields(fields)
+        columns = [LIST_COLUMNS[name] for name in selected]
+
+        def run(session, i: int):
+            rows = (
+                session.query(*columns)
+                .filter(tx.user_id == user.id)
+                .order_by(*order)
+                .offset(page_offset(i))
+                .limit(args.page_size)
+                .all()
+            )
+            fetched = time.perf_counter()
+            items = _serialize_rows(rows, selected)
+            return fetched, json.dumps({"items": items, "pagination": {"page_size": args.page_size}}).encode()
+
+        return run
+
+    variants = {"orm": orm_page, "core": core_page(None), "core-sparse": core_page(SPARSE_FIELDS)}
+    results = []
+    for name, build in variants.items():
+        fetch, serialize, size = [], [], 0
+        for i in range(args.iterations):
+            session = SessionLocal()  # a fresh session per request, like get_db
+            started = time.perf_counter()
+            fetched, body = build(session, i)
+            finished = time.perf_counter()
+            session.close()
+            fetch.append(fetched - started)
+            serialize.append(finished - fetched)
+            size = len(body)
+        per_row = lambda timings: round(statistics.median(timings) / args.page_size * 1e6, 2)  # noqa: E731
+        results.append(
+            {
+                "variant": name,
+                "fetch_us_per_row": per_row(fetch),
+                "serialize_us_per_row": per_row(serialize),
+                "total_us_per_row": per_row([f + s for f, s in zip(fetch, serialize)]),
+                "page_bytes": size,
+            }
+        )
+    db.close()
+
+    baseline = results[0]
+    for result in results:
+        result["serialize_speedup"] = round(baseline["serialize_us_per_row"] / result["serialize_us_per_row"], 2)
+        result["total_speedup"] = round(baseline["total_us_per_row"] / result["total_us_per_row"], 2)
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "sqlalchemy": sa.__version__,
+        "rows": args.rows,
+        "page_size": args.page_size,
+        "iterations": args.iterations,
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
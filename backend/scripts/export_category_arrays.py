@@ -0,0 +1,25 @@
+"""
+Convert the joblib category classifier in ml_artifacts/ to the pickle-free
+memory-mapped array format and repoint category_meta.json at it.
+
+Usage:
+    python scripts/export_category_arrays.py [--quantize]
+
+Serving processes pick up the new format on their next artifact revalidation.
+"""
+
+from __future__ import annotations
+
+import sys
+
+from app.ai.category_classifier import export_current_to_arrays
+
+
+def main():
+    quantize = "--quantize" in sys.argv[1:]
+    version = export_current_to_arrays(quantize=quantize)
+    print(f"exported {version} (quantized={quantize})")
+
+
+if __name__ == "__main__":
+    main()
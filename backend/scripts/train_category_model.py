@@ -0,0 +1,33 @@
+"""
+Train the category model from every confirmed transaction in the database,
+streaming rows in fixed-size chunks so memory stays bounded.
+
+Usage:
+    DATABASE_URL=... python scripts/train_category_model.py [chunk_size] [epochs]
+
+Prints a JSON line with rows, rows_per_sec, peak_rss_mb and the published
+model_version.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+
+from app.ai.online_training import CHUNK_SIZE, train_from_database
+from app.database import SessionLocal
+
+
+def main():
+    chunk_size = int(sys.argv[1]) if len(sys.argv) >= 2 else CHUNK_SIZE
+    epochs = int(sys.argv[2]) if len(sys.argv) >= 3 else 1
+    db = SessionLocal()
+    try:
+        stats = train_from_database(db, chunk_size=chunk_size, epochs=epochs)
+    finally:
+        db.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
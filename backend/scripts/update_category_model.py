@@ -0,0 +1,34 @@
+"""
+Fold newly confirmed category corrections into the incremental model and
+publish a new model_version.
+
+Usage:
+    DATABASE_URL=... python scripts/update_category_model.py [chunk_size]
+
+Safe to run on a schedule: only corrections newer than the saved watermark
+are read, and nothing is published when there are none. The first run, and
+any run after new global categories were added, rebuilds the model from the
+whole confirmed history instead.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+
+from app.ai.online_training import CHUNK_SIZE, consume_corrections
+from app.database import SessionLocal
+
+
+def main():
+    chunk_size = int(sys.argv[1]) if len(sys.argv) >= 2 else CHUNK_SIZE
+    db = SessionLocal()
+    try:
+        stats = consume_corrections(db, chunk_size=chunk_size)
+    finally:
+        db.close()
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,22 @@
+from uuid import uuid4
+
 import pytest
 from httpx import AsyncClient, ASGITransport
 
-from app.main import app
+from app.main import app, seed_default_categories
 from app import models
 from app.ai.category_classifier import PredictionResult
+from app.ai.user_overrides import user_overrides
+from app.database import Base, engine
+from app.routers import dashboard
+
+
+def setup_module():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+    dashboard._summary_cache.clear()  # type: ignore[attr-defined]
+    user_overrides.clear()
 
 
 @pytest.mark.anyio
@@ -52,7 +65,7 @@ async def test_transaction_auto_predict(monkeypatch):
         def fake_load_model():
             return object()
 
-        def fake_predict(description, model=None):
+        def fake_predict(description, model=None, user_id=None, db=None):
             return dummy_result
 
         monkeypatch.setattr("app.routers.transactions.load_model", fake_load_model)
@@ -74,3 +87,254 @@ async def test_transaction_auto_predict(monkeypatch):
         assert data["predicted_confidence"] == pytest.approx(0.9)
         assert data["category_id"] == category_id
         assert data["status"] == models.TransactionStatus.predicted
+
+
+@pytest.mark.anyio
+async def test_transaction_deferred_predict_filled_by_worker(monkeypatch):
+    from app.ai.categorize_worker import categorization_worker
+    from app.database import SessionLocal
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        cred = {"email": "deferred@example.com", "password": "secret123"}
+        await client.post("/auth/register", json=cred)
+        res = await client.post("/auth/login", json=cred)
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+        account_id = res.json()["id"]
+        res = await client.post("/categories", json={"name": "AI Later", "type": "expense"}, headers=headers)
+        category_id = res.json()["id"]
+
+        def fake_predict_categories(descriptions, model=None, top_k=3, user_id=None, db=None):
+            return [
+                PredictionResult(category_id=category_id, confidence=0.8, top_k=[(category_id, 0.8)], model_version="vtest")
+                for _ in descriptions
+            ]
+
+        def fail_inline(*args, **kwargs):
+            raise AssertionError("inline prediction must not run in deferred mode")
+
+        monkeypatch.setattr("app.ai.categorize_worker.predict_categories", fake_predict_categories)
+        monkeypatch.setattr("app.routers.transactions.predict_category", fail_inline)
+
+        payload = {
+            "account_id": account_id,
+            "type": "expense",
+            "amount": 12000,
+            "currency": "IDR",
+            "description": "Deferred predict",
+            "occurred_at": "2025-02-01T10:00:00Z",
+            "status": "confirmed",
+        }
+        res = await client.post("/transactions", params={"defer_prediction": True}, json=payload, headers=headers)
+        assert res.status_code == 201
+        data = res.json()
+        assert data["status"] == models.TransactionStatus.confirmed
+        assert data["predicted_confidence"] is None
+
+        assert categorization_worker.drain(timeout=5.0)
+        db = SessionLocal()
+        try:
+            tx = db.get(models.Transaction, data["id"])
+            assert tx.predicted_category_id == category_id
+            assert float(tx.predicted_confidence) == pytest.approx(0.8)
+            assert tx.category_id == category_id
+            assert tx.status == models.TransactionStatus.predicted
+        finally:
+            db.close()
+
+
+@pytest.mark.anyio
+async def test_deferred_row_without_a_match_keeps_the_inline_status(monkeypatch):
+    from app.ai.categorize_worker import categorization_worker
+    from app.database import SessionLocal
+
+    no_match = PredictionResult(category_id=None, confidence=0.0, top_k=[], model_version=None)
+    monkeypatch.setattr(
+        "app.ai.categorize_worker.predict_categories", lambda descriptions, **kwargs: [no_match for _ in descriptions]
+    )
+    monkeypatch.setattr("app.routers.transactions.predict_category", lambda *args, **kwargs: no_match)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        cred = {"email": f"nomatch_{uuid4().hex}@example.com", "password": "secret123"}
+        await client.post("/auth/register", json=cred)
+        res = await client.post("/auth/login", json=cred)
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+        payload = {
+            "account_id": res.json()["id"],
+            "type": "expense",
+            "amount": 7000,
+            "description": "zzqx unknown merchant",
+            "occurred_at": "2025-02-02T10:00:00Z",
+            "status": "confirmed",
+        }
+        created = [
+            await client.post("/transactions", params={"defer_prediction": defer}, json=payload, headers=headers)
+            for defer in (False, True)
+        ]
+
+    assert categorization_worker.drain(timeout=5.0)
+    db = SessionLocal()
+    try:
+        for res in created:
+            tx = db.get(models.Transaction, res.json()["id"])
+            assert (tx.status, tx.category_id) == (models.TransactionStatus.confirmed, None)
+            assert float(tx.predicted_confidence) == 0.0
+        assert categorization_worker.requeue_pending() == 0
+    finally:
+        db.close()
+
+
+@pytest.mark.anyio
+async def test_predict_uses_user_confirmed_history():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        cred = {"email": "history@example.com", "password": "secret123"}
+        await client.post("/auth/register", json=cred)
+        res = await client.post("/auth/login", json=cred)
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+        res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+        account_id = res.json()["id"]
+        res = await client.post("/categories", json={"name": "Bensin", "type": "expense"}, headers=headers)
+        bensin_id = res.json()["id"]
+
+        # Warm the per-user index before the writes so they are applied incrementally.
+        res = await client.post("/ai/predict_category", headers=headers, json={"description": "Pertamina"})
+        assert res.json()["source"] != "user"
+
+        created = []
+        for _ in range(3):
+            res = await client.post(
+                "/transactions",
+                json={
+                    "account_id": account_id,
+                    "category_id": bensin_id,
+                    "type": "expense",
+                    "amount": 50000,
+                    "description": "PERTAMINA  ",
+                    "occurred_at": "2025-02-01T10:00:00Z",
+                    "status": "confirmed",
+                },
+                headers=headers,
+            )
+            assert res.status_code == 201
+            created.append(res.json()["id"])
+
+        res = await client.post("/ai/predict_category", headers=headers, json={"description": "pertamina"})
+        data = res.json()
+        assert data["category_id"] == bensin_id
+        assert data["source"] == "user"
+        assert data["confidence"] == pytest.approx(1.0)
+
+        # Deleted rows stop counting: one confirmation left is below MIN_COUNT.
+        for tx_id in created[:2]:
+            assert (await client.delete(f"/transactions/{tx_id}", headers=headers)).status_code == 204
+        res = await client.post("/ai/predict_category", headers=headers, json={"description": "pertamina"})
+        assert res.json()["source"] != "user"
+
+
+@pytest.mark.anyio
+async def test_deleted_category_is_not_returned_from_history():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        cred = {"email": "history_delete@example.com", "password": "secret123"}
+        await client.post("/auth/register", json=cred)
+        res = await client.post("/auth/login", json=cred)
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+        account_id = res.json()["id"]
+        res = await client.post("/categories", json={"name": "Parkir", "type": "expense"}, headers=headers)
+        parkir_id = res.json()["id"]
+        for _ in range(2):
+            await client.post(
+                "/transactions",
+                json={
+                    "account_id": account_id,
+                    "category_id": parkir_id,
+                    "type": "expense",
+                    "amount": 5000,
+                    "description": "Parkir mall",
+                    "occurred_at": "2025-02-01T10:00:00Z",
+                    "status": "confirmed",
+                },
+                headers=headers,
+            )
+        res = await client.post("/ai/predict_category", headers=headers, json={"description": "parkir mall"})
+        assert res.json()["category_id"] == parkir_id
+
+        assert (await client.delete(f"/categories/{parkir_id}", headers=headers)).status_code == 204
+        res = await client.post("/ai/predict_category", headers=headers, json={"description": "parkir mall"})
+        assert res.json()["category_id"] != parkir_id
+        assert res.json()["source"] != "user"
+
+
+@pytest.mark.anyio
+async def test_rule_hits_are_limited_to_visible_categories(tmp_path, monkeypatch):
+    import json
+
+    from app.ai import rules
+    from app.database import SessionLocal
+
+    monkeypatch.setattr(rules, "RULES_PATH", tmp_path / "category_rules.json")
+    rules.reset_rules()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        tokens = []
+        for email in ("rules_owner@example.com", "rules_other@example.com"):
+            cred = {"email": email, "password": "secret123"}
+            await client.post("/auth/register", json=cred)
+            res = await client.post("/auth/login", json=cred)
+            tokens.append({"Authorization": f"Bearer {res.json()['access_token']}"})
+        owner, other = tokens
+        res = await client.post("/categories", json={"name": "Rahasia", "type": "expense"}, headers=owner)
+        private_id = res.json()["id"]
+        db = SessionLocal()
+        try:
+            global_id = db.query(models.Category.id).filter(models.Category.user_id == None).first()[0]  # noqa: E711
+        finally:
+            db.close()
+        rules.RULES_PATH.write_text(json.dumps({"global": {"rahasia": private_id, "indomaret": global_id}}))
+        try:
+            res = await client.post("/ai/predict_category", headers=other, json={"description": "Rahasia 01"})
+            assert res.json()["category_id"] is None
+            res = await client.post("/ai/predict_category", headers=owner, json={"description": "Rahasia 01"})
+            assert (res.json()["category_id"], res.json()["source"]) == (private_id, "rule")
+            res = await client.post("/ai/predict_category", headers=other, json={"description": "INDOMARET"})
+            assert res.json()["category_id"] == global_id
+        finally:
+            rules.reset_rules()
+
+
+@pytest.mark.anyio
+async def test_model_labels_outside_visible_categories_are_dropped():
+    from app.ai.category_classifier import clear_prediction_cache, predict_categories
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        owner = models.User(email=f"labels_{uuid4().hex}@example.com", password_hash="x")
+        other = models.User(email=f"labels_{uuid4().hex}@example.com", password_hash="x")
+        db.add_all([owner, other])
+        db.flush()
+        private = models.Category(user_id=owner.id, name="Rahasia", type=models.TransactionType.expense)
+        db.add(private)
+        db.commit()
+
+        class _Model:
+            model_version = "vlabels"
+
+            def predict_many(self, texts, top_k=3):
+                return [PredictionResult(private.id, 0.9, [(private.id, 0.9)], model_version="vlabels") for _ in texts]
+
+        clear_prediction_cache()
+        [leaked] = predict_categories(["kode rahasia"], model=_Model(), user_id=other.id, db=db)
+        assert (leaked.category_id, leaked.top_k) == (None, [])
+        [own] = predict_categories(["kode rahasia"], model=_Model(), user_id=owner.id, db=db)
+        assert own.category_id == private.id
+    finally:
+        clear_prediction_cache()
+        db.close()
@@ -0,0 +1,177 @@
+import socket
+import socketserver
+import threading
+import time
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from app import cache, schemas
+from app.cache import LRUCache
+from app.serialization import decode_summary, encode_summary
+
+
+def test_lru_cache_bounds_expires_and_invalidates_per_user():
+    lru = LRUCache(maxsize=3, ttl_seconds=60)
+    lru.set(("u1", "a"), 1)
+    lru.set(("u1", "b"), 2)
+    lru.set(("u2", "a"), 3)
+    assert lru.get(("u1", "a")) == 1  # refresh recency of u1/a
+    lru.set(("u2", "b"), 4)  # evicts least recently used u1/b
+    assert lru.get(("u1", "b")) is None
+    assert len(lru) == 3
+
+    assert lru.invalidate_user("u2") == 2
+    assert lru.get(("u2", "a")) is None
+    assert lru.get(("u1", "a")) == 1
+
+    lru.set(("u3", "x"), 5, ttl_seconds=0.01)
+    time.sleep(0.02)
+    assert lru.get(("u3", "x")) is None
+
+    stats = lru.stats()
+    assert stats["evictions"] == 1
+    assert stats["invalidations"] == 2
+    assert stats["expirations"] == 1
+    assert stats["hits"] == 2
+    assert stats["misses"] == 3
+
+
+class _FakeRedisHandler(socketserver.StreamRequestHandler):
+    """Just enough of RESP2 for RedisBackend: GET/SET [PX|NX]/DEL/INCR/SCAN/SELECT."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while (args := self._read_command()) is not None:
+            cmd = args[0].upper()
+            if cmd == b"GET":
+                value = store.get(args[1])
+                self.wfile.write(b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value))
+            elif cmd == b"SET":
+                if b"NX" in args[3:] and args[1] in store:
+                    self.wfile.write(b"$-1\r\n")
+                    continue
+                store[args[1]] = args[2]
+                self.wfile.write(b"+OK\r\n")
+            elif cmd == b"DEL":
+                removed = sum(store.pop(k, None) is not None for k in args[1:])
+                self.wfile.write(b":%d\r\n" % removed)
+            elif cmd == b"INCR":
+                store[args[1]] = b"%d" % (int(store.get(args[1], b"0")) + 1)
+                self.wfile.write(b":%s\r\n" % store[args[1]])
+            elif cmd == b"SCAN":
+                prefix = args[3].rstrip(b"*")
+                keys = [k for k in store if k.startswith(prefix)]
+                self.wfile.write(b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys))
+                for k in keys:
+                    self.wfile.write(b"$%d\r\n%s\r\n" % (len(k), k))
+            elif cmd == b"SELECT":
+                self.wfile.write(b"+OK\r\n")
+            else:
+                self.wfile.write(b"-ERR unknown command\r\n")
+
+
+@pytest.fixture
+def fake_redis():
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeRedisHandler)
+    server.daemon_threads = True
+    server.store = {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _summary() -> schemas.DashboardSummary:
+    return schemas.DashboardSummary(
+        period=schemas.DashboardPeriod(start_date=date(2025, 3, 1), end_date=date(2025, 3, 31)),
+        totals=schemas.DashboardTotals(
+            income=Decimal("1500000.00"), expense=Decimal("250000.50"), balance=Decimal("1249999.50")
+        ),
+        top_categories=[
+            schemas.DashboardTopCategory(category_id="c1", name="Makan", amount=Decimal("200000.50"), type="expense"),
+            schemas.DashboardTopCategory(category_id=None, name="Uncategorized", amount=Decimal("50000.00"), type="expense"),
+        ],
+    )
+
+
+def test_summary_binary_roundtrip_is_exact_and_compact():
+    summary = _summary()
+    data = encode_summary(summary)
+    assert decode_summary(data) == summary
+    assert len(data) < len(summary.model_dump_json()) / 2
+
+
+def test_redis_backend_shares_entries_and_invalidates_by_generation(fake_redis):
+    url = "redis://127.0.0.1:%d/0" % fake_redis.server_address[1]
+    writer, reader = cache.RedisBackend(url), cache.RedisBackend(url)  # two "workers"
+    summaries = cache.UserScopedCache("summary", 60, encode_summary, decode_summary)
+    try:
+        cache.set_backend(writer)
+        summaries.set("u1", ("2025-03-01", "2025-03-31", 5), _summary(), gen=summaries.current_generation("u1"))
+        cache.set_backend(reader)
+        assert summaries.get("u1", "2025-03-01", "2025-03-31", 5) == _summary()
+
+        cache.invalidate_user("u1")
+        cache.set_backend(writer)
+        assert summaries.get("u1", "2025-03-01", "2025-03-31", 5) is None
+        assert (summaries.hits, summaries.misses) == (1, 1)
+
+        summaries.set("u1", ("x",), _summary(), gen=summaries.current_generation("u1"))
+        summaries.clear()
+        assert not [k for k in fake_redis.store if k.startswith(b"fintrack:summary:")]
+    finally:
+        cache.set_backend(None)
+
+
+def test_redis_backend_degrades_to_misses_when_unreachable():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    backend = cache.RedisBackend("redis://127.0.0.1:%d/0" % port, timeout=0.1)
+    assert backend.get("k") is None
+    backend.set("k", b"v", 10)  # skipped while marked down, no second connect attempt
+    assert backend.incr("gen") is None
+    assert backend.counter("gen", 7) is None
+    assert backend.errors == 1
+
+
+def test_value_computed_before_a_write_is_not_served_after_it():
+    summaries = cache.UserScopedCache("summary", 60, encode_summary, decode_summary)
+    cache.set_backend(cache.InProcessBackend())
+    try:
+        gen = summaries.current_generation("u1")  # read before the DB query
+        cache.invalidate_user("u1")  # a write commits while the reader aggregates
+        summaries.set("u1", ("2025-03",), _summary(), gen=gen)
+        assert summaries.get("u1", "2025-03") is None
+    finally:
+        cache.set_backend(None)
+
+
+def test_failed_invalidation_is_logged_and_bypasses_the_cache(caplog):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    summaries = cache.UserScopedCache("summary", 60, encode_summary, decode_summary)
+    cache.set_backend(cache.RedisBackend("redis://127.0.0.1:%d/0" % port, timeout=0.1))
+    try:
+        with caplog.at_level("ERROR", logger="app.cache"):
+            assert cache.invalidate_user("u1") is None
+        assert "Could not invalidate" in caplog.text
+        assert summaries.current_generation("u1") is None
+        summaries.set("u1", ("x",), _summary(), gen=None)
+        assert summaries.get("u1", "x") is None
+    finally:
+        cache.set_backend(None)
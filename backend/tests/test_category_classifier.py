@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from app.ai import category_classifier as cc
+from app.ai import rules
+
+TRAINING_CSV = Path(__file__).resolve().parents[1] / "ml_artifacts" / "training_data_id.csv"
+
+
+def _training_rows() -> tuple[list[str], list[str]]:
+    with TRAINING_CSV.open() as f:
+        rows = list(csv.DictReader(f))
+    return [r["description"] for r in rows], [r["category_id"] for r in rows]
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc, "ARTIFACT_DIR", tmp_path)
+    monkeypatch.setattr(cc, "MODEL_PATH", tmp_path / "category_model.pkl")
+    monkeypatch.setattr(cc, "META_PATH", tmp_path / "category_meta.json")
+    monkeypatch.setattr(cc, "MODEL_REVALIDATE_SECONDS", 0.0)
+    monkeypatch.setattr(rules, "RULES_PATH", tmp_path / "category_rules.json")
+    monkeypatch.setattr(rules, "RULES_REVALIDATE_SECONDS", 0.0)
+    rules.reset_rules()
+    cc.reset_model_cache()
+    cc.clear_prediction_cache()
+    yield tmp_path
+    rules.reset_rules()
+    cc.reset_model_cache()
+    cc.clear_prediction_cache()
+
+
+def test_load_model_is_resident_and_hot_reloads(artifacts):
+    texts, labels = _training_rows()
+    assert cc.load_model() is None
+
+    cc.train(texts, labels, threshold=0.0, model_version="v1")
+    first = cc.load_model()
+    assert first is not None and first.model_version == "v1"
+    assert cc.load_model() is first
+    assert cc.model_stats()["load_count"] >= 1
+    loads = cc.model_stats()["load_count"]
+
+    cc.train(texts, labels, threshold=0.0, model_version="v2")
+    # Make sure the mtime moves even on coarse-grained filesystems.
+    os.utime(cc.MODEL_PATH, ns=(0, cc.MODEL_PATH.stat().st_mtime_ns + 1_000_000))
+    second = cc.load_model()
+    assert second is not first
+    assert second.model_version == "v2"
+    assert cc.model_stats()["load_count"] == loads + 1
+    assert cc.model_stats()["model_version"] == "v2"
+
+
+def test_predict_many_matches_single_predictions(artifacts):
+    texts, labels = _training_rows()
+    cc.train(texts, labels, threshold=0.0, model_version="vbatch")
+    model = cc.load_model()
+
+    batch = ["Gaji bulan Januari", "", "Bonus akhir tahun", "bayar listrik"]
+    results = model.predict_many(batch, top_k=3)
+    assert len(results) == len(batch)
+    assert results[1].category_id is None and results[1].top_k == []
+    for text, result in zip(batch, results):
+        if not text:
+            continue
+        single = model.predict(text, top_k=3)
+        assert result.category_id == single.category_id
+        assert result.confidence == pytest.approx(single.confidence)
+        assert [lbl for lbl, _ in result.top_k] == [lbl for lbl, _ in single.top_k]
+        scores = [score for _, score in result.top_k]
+        assert scores == sorted(scores, reverse=True)
+        assert result.top_k[0][1] == pytest.approx(result.confidence)
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_array_format_matches_joblib_model(artifacts, quantize):
+    texts, labels = _training_rows()
+    cc.train(texts, labels, threshold=0.0, model_version="vjoblib")
+    joblib_model = cc.load_model()
+    samples = ["Gaji bulan Januari", "Bonus akhir tahun", "makan siang kantor", "xyz"]
+    expected = joblib_model.predict_many(samples)
+
+    cc.export_current_to_arrays(quantize=quantize)
+    array_model = cc.load_model()
+    assert array_model is not joblib_model
+    assert type(array_model.model).__name__ == "ArrayLinearModel"
+    assert not array_model.model.coef.flags.writeable  # memory-mapped, read-only
+
+    tolerance = 0.05 if quantize else 1e-4
+    for exp, got in zip(expected, array_model.predict_many(samples)):
+        assert got.confidence == pytest.approx(exp.confidence, abs=tolerance)
+        if not quantize:
+            assert got.category_id == exp.category_id
+            assert [lbl for lbl, _ in got.top_k] == [lbl for lbl, _ in exp.top_k]
+
+
+def test_prediction_cache_hits_on_normalized_description_and_resets_on_new_version(artifacts):
+    texts, labels = _training_rows()
+    cc.train(texts, labels, threshold=0.0, model_version="vcache1")
+    model = cc.load_model()
+
+    first = cc.predict_category("Makan  Siang", model=model)
+    again = cc.predict_category("  makan siang ", model=model)
+    assert again is first
+    stats = cc.prediction_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    results = cc.predict_categories(["MAKAN SIANG", "Bonus akhir tahun", "bonus akhir tahun"], model=model)
+    assert results[0] is first
+    assert results[1] is results[2]
+    assert cc.prediction_cache_stats()["size"] == 2
+
+    cc.train(texts, labels, threshold=0.0, model_version="vcache2")
+    newer = cc.load_model(force_reload=True)
+    result = cc.predict_category("makan siang", model=newer)
+    assert result.model_version == "vcache2"
+    stats = cc.prediction_cache_stats()
+    assert stats["size"] == 1
+    assert stats["model_version"] == "vcache2"
+
+
+def test_keyword_rules_run_before_model_and_reload(artifacts):
+    rules.RULES_PATH.write_text(
+        json.dumps(
+            {
+                "global": {"grab": "transport", "grab food": "food", "indomaret": "groceries"},
+                "users": {"u1": {"pertamina": "bensin-u1"}},  # ignored: rules are global only
+            }
+        )
+    )
+    result = cc.predict_category("GRAB*Food order 123")
+    assert (result.category_id, result.confidence, result.source) == ("food", 1.0, "rule")
+    assert cc.predict_category("Grab bike").category_id == "transport"
+    assert cc.predict_category("Isi bensin Pertamina", user_id="u1").source == "model"
+    assert cc.predict_category("grabbed something").category_id is None
+
+    batch = cc.predict_categories(["Indomaret", "unknown"], user_id="u1")
+    assert [r.source for r in batch] == ["rule", "model"]
+
+    rules.RULES_PATH.write_text(json.dumps({"global": {"alfamart": "groceries"}}))
+    rules.reload_rules()
+    assert cc.predict_category("Grab bike").category_id is None
+    assert cc.predict_category("ALFAMART 01").category_id == "groceries"
@@ -0,0 +1,111 @@
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app import columnar
+from app.main import app, seed_default_categories
+from app.database import Base, SessionLocal, engine
+from app.routers import dashboard
+from tests.test_dashboard_rollups import _create_tx, _setup_user
+
+
+@pytest.fixture(scope="module")
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def columnar_engine(monkeypatch):
+    monkeypatch.setattr(columnar, "enabled", lambda: True)
+    store = columnar.ColumnarStore(memory_budget_bytes=64 * 1024 * 1024)
+    monkeypatch.setattr(columnar, "store", store)
+    yield store
+
+
+def setup_module():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+
+
+def _unit_columns() -> columnar.UserColumns:
+    columns = columnar.UserColumns(generation=0, capacity=2, category_ids=[None, "food"])
+    income = columnar.INCOME
+    columns.fill(
+        occurred=np.array([100, 200, 300], dtype=np.int64),
+        amount=np.array([500, 700, 900], dtype=np.int64),
+        category=np.array([1, 0, 1], dtype=np.int32),
+        type_code=np.array([columnar.EXPENSE, income, columnar.EXPENSE], dtype=np.int8),
+    )
+    return columns
+
+
+def test_columns_append_grows_capacity_and_categories():
+    columns = _unit_columns()
+    assert columns.append("t4", 400, 100, "rent", columnar.EXPENSE)
+    assert columns.append("t4", 400, 100, "rent", columnar.EXPENSE)  # already present: no double count
+    assert not columns.append("t5", 50, 100, "rent", columnar.EXPENSE)  # out of order
+    assert columns.length == 4 and columns.capacity >= 4
+    assert columns.category_amount_prefix[4].tolist() == [0, 1400, 100]
+    assert columns.category_count_prefix[4].tolist() == [0, 2, 1]
+    assert columns.income_prefix[4] == 700 and columns.expense_prefix[4] == 1500
+
+
+@pytest.mark.anyio
+async def test_columnar_summary_matches_rollups_and_appends_in_place(client: AsyncClient, columnar_engine):
+    headers, account_id, category_id = await _setup_user(client)
+    await _create_tx(client, headers, account_id, category_id, "income", 100000, "2025-05-01T03:00:00Z")
+    await _create_tx(client, headers, account_id, category_id, "expense", 20000, "2025-05-09T18:30:00Z")
+    await _create_tx(client, headers, account_id, None, "expense", 5000, "2025-05-20T09:00:00Z")
+
+    async def summary(start: str, end: str) -> dict:
+        res = await client.get("/dashboard/summary", params={"start_date": start, "end_date": end}, headers=headers)
+        assert res.status_code == 200
+        return res.json()
+
+    data = await summary("2025-05-10", "2025-05-31")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("25000.00")
+    assert [c["category_id"] for c in data["top_categories"]] == [category_id, None]
+    assert columnar_engine.stats()["loads"] == 1
+
+    user_id = next(iter(columnar_engine._users))
+    db = SessionLocal()
+    try:
+        for start, end in [(date(2025, 5, 1), date(2025, 5, 9)), (date(2025, 4, 1), date(2025, 6, 30))]:
+            assert columnar_engine.aggregate(db, user_id, start, end) == dashboard._aggregate_period(
+                db, user_id, start, end
+            )
+    finally:
+        db.close()
+
+    # In-order insert is appended; a backdated one forces a reload.
+    await _create_tx(client, headers, account_id, category_id, "expense", 1000, "2025-06-01T03:00:00Z")
+    assert columnar_engine.stats()["appends"] == 1
+    data = await summary("2025-05-01", "2025-06-30")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("26000.00")
+    assert columnar_engine.stats()["loads"] == 1
+
+    await _create_tx(client, headers, account_id, category_id, "expense", 300, "2025-05-02T03:00:00Z")
+    data = await summary("2025-05-01", "2025-06-30")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("26300.00")
+    assert columnar_engine.stats()["loads"] == 2
+
+
+def test_store_evicts_to_memory_budget_and_rejects_oversized_users(monkeypatch):
+    columns = _unit_columns()
+    store = columnar.ColumnarStore(memory_budget_bytes=int(columns.nbytes * 2.5))
+    monkeypatch.setattr(columnar, "_load", lambda db, user_id, generation: _unit_columns())
+    monkeypatch.setattr(columnar, "MAX_USER_SHARE", 1.0)
+    for user_id in ("a", "b", "c"):
+        assert store.aggregate(None, user_id, date(1970, 1, 1), date(1970, 1, 1)).expense == Decimal("14.00")
+    assert list(store._users) == ["b", "c"]
+    assert store.stats()["evictions"] == 1
+
+    monkeypatch.setattr(columnar, "MAX_USER_SHARE", 0.1)
+    assert store.aggregate(None, "d", date(1970, 1, 1), date(1970, 1, 1)) is None
+    assert store.stats()["rejected"] == 1
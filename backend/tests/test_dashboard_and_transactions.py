@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 from datetime import datetime, date
 from decimal import Decimal
 from uuid import uuid4
@@ -9,6 +12,7 @@ from app.main import app, seed_default_categories
 from app.database import Base, engine
 from app.routers import dashboard
 from app import models
+from app import search as search_module
 
 @pytest.fixture(scope="module")
 async def client():
@@ -156,3 +160,335 @@ async def test_dashboard_invalid_period_returns_validation_error(client: AsyncCl
     assert "start_date" in data["message"]
     # trace_id should be present for debugging
     assert "trace_id" in data
+
+
+@pytest.mark.anyio
+async def test_transactions_cursor_pagination_walks_all_rows_once(client: AsyncClient):
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    # Two rows share a timestamp, so ordering must fall back to id.
+    for i, occurred_at in enumerate(
+        ["2025-01-05T10:00:00", "2025-01-04T10:00:00", "2025-01-04T10:00:00", "2025-01-03T10:00:00", "2025-01-01T10:00:00"]
+    ):
+        await client.post(
+            "/transactions",
+            json={
+                "account_id": account_id,
+                "type": "expense",
+                "amount": 1000 + i,
+                "description": f"row {i}",
+                "occurred_at": occurred_at,
+            },
+            headers=headers,
+        )
+
+    res = await client.get("/transactions", params={"page_size": 100}, headers=headers)
+    expected = [item["id"] for item in res.json()["items"]]
+    assert len(expected) == 5
+    assert res.json()["pagination"]["next_cursor"] is None
+
+    seen, cursor = [], None
+    while True:
+        params = {"page_size": 2, **({"cursor": cursor} if cursor else {})}
+        res = await client.get("/transactions", params=params, headers=headers)
+        assert res.status_code == 200
+        data = res.json()
+        seen += [item["id"] for item in data["items"]]
+        assert data["pagination"]["page"] == (None if cursor else 1)
+        cursor = data["pagination"]["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+    res = await client.get("/transactions", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert res.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_transactions_count_modes(client: AsyncClient, monkeypatch):
+    from app.routers import transactions as transactions_router
+
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    for day in range(1, 5):
+        await client.post(
+            "/transactions",
+            json={
+                "account_id": account_id,
+                "type": "income",
+                "amount": 500,
+                "description": "Gaji",
+                "occurred_at": f"2025-02-0{day}T10:00:00",
+            },
+            headers=headers,
+        )
+
+    res = await client.get("/transactions", params={"page_size": 3, "count": "none"}, headers=headers)
+    pagination = res.json()["pagination"]
+    assert (pagination["total_items"], pagination["total_pages"], pagination["has_more"]) == (None, None, True)
+
+    res = await client.get("/transactions", params={"page_size": 3, "count": "estimate"}, headers=headers)
+    pagination = res.json()["pagination"]
+    assert (pagination["total_items"], pagination["total_is_estimate"]) == (4, False)
+
+    monkeypatch.setattr(transactions_router, "COUNT_ESTIMATE_CAP", 2)
+    res = await client.get("/transactions", params={"page": 2, "page_size": 3, "count": "estimate"}, headers=headers)
+    pagination = res.json()["pagination"]
+    assert pagination["total_is_estimate"] is True
+    assert pagination["total_items"] >= 3
+    assert pagination["has_more"] is False
+
+
+@pytest.mark.anyio
+async def test_transactions_search_substring_multi_token_and_relevance(client: AsyncClient):
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    ids = {}
+    for i, description in enumerate(
+        ["Kopi Kenangan Senopati", "kopi susu", "Kenangan kopi kopi kopi", "Nasi padang", "Kopi"]
+    ):
+        res = await client.post(
+            "/transactions",
+            json={
+                "account_id": account_id,
+                "type": "expense",
+                "amount": 1000,
+                "description": description,
+                "occurred_at": f"2025-03-0{i + 1}T10:00:00",
+            },
+            headers=headers,
+        )
+        ids[description] = res.json()["id"]
+
+    async def search(**params) -> list[str]:
+        res = await client.get("/transactions", params=params, headers=headers)
+        assert res.status_code == 200
+        return [item["description"] for item in res.json()["items"]]
+
+    assert await search(q="kop kenang") == ["Kenangan kopi kopi kopi", "Kopi Kenangan Senopati"]
+    assert set(await search(q="KOPI")) == {"Kopi Kenangan Senopati", "kopi susu", "Kenangan kopi kopi kopi", "Kopi"}
+    by_date = await search(q="kopi")
+    by_relevance = await search(q="kopi", sort="relevance")
+    assert sorted(by_relevance) == sorted(by_date)
+    assert by_relevance[-1] == "Kopi Kenangan Senopati"  # longest single-mention row ranks last
+    assert await search(q="%_") == await search()  # no searchable tokens: no filter
+
+    # Substring semantics, the same as the Postgres/ILIKE path; short tokens still filter.
+    assert await search(q="enang senop") == ["Kopi Kenangan Senopati"]
+    assert await search(q="ng pad") == ["Nasi padang"]
+
+    await client.delete(f"/transactions/{ids['kopi susu']}", headers=headers)
+    assert "kopi susu" not in await search(q="susu")
+
+    # The index is keyed on transactions.id, so renumbered rowids do not matter.
+    with engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    assert set(await search(q="kopi")) == {"Kopi Kenangan Senopati", "Kenangan kopi kopi kopi", "Kopi"}
+
+    # Without the index (migration 0005 not applied) the ILIKE fallback gives the same rows.
+    with engine.begin() as conn:
+        for statement in search_module.SQLITE_FTS_DROP:
+            conn.exec_driver_sql(statement)
+    search_module._fts_available.clear()
+    try:
+        assert set(await search(q="enang")) == {"Kopi Kenangan Senopati", "Kenangan kopi kopi kopi"}
+    finally:
+        with engine.begin() as conn:
+            for statement in search_module.SQLITE_FTS_DDL + search_module.SQLITE_FTS_REBUILD:
+                conn.exec_driver_sql(statement)
+        search_module._fts_available.clear()
+
+
+@pytest.mark.anyio
+async def test_bulk_create_validates_set_based_and_reports_row_errors(client: AsyncClient):
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    other_account = await _make_account(client, await _auth_headers(client))
+    res = await client.post("/categories", json={"name": "Groceries", "type": "expense"}, headers=headers)
+    category_id = res.json()["id"]
+
+    base = {"account_id": account_id, "type": "expense", "occurred_at": "2025-05-02T03:00:00"}
+    items = [
+        {**base, "amount": 1000, "description": "Superindo", "category_id": category_id},
+        {**base, "amount": "not a number"},
+        {**base, "amount": 2000, "account_id": other_account},
+        {**base, "amount": 3000, "category_id": "missing"},
+        {**base, "amount": 4000, "description": "Indomaret"},
+    ]
+    res = await client.post("/transactions/bulk", json={"items": items}, headers=headers)
+    assert res.status_code == 200
+    data = res.json()
+    assert [(e["index"], e["message"]) for e in data["errors"]][1:] == [(2, "Invalid account"), (3, "Invalid category")]
+    assert data["errors"][0]["index"] == 1 and "amount" in data["errors"][0]["message"]
+    assert [c["amount"] for c in data["created"]] == [1000, 4000]
+
+    res = await client.get("/transactions", params={"page_size": 100}, headers=headers)
+    assert {item["id"] for item in res.json()["items"]} == {c["id"] for c in data["created"]}
+    res = await client.get(
+        "/dashboard/summary", params={"start_date": "2025-05-01", "end_date": "2025-05-31"}, headers=headers
+    )
+    assert Decimal(str(res.json()["totals"]["expense"])) == Decimal("5000.00")
+
+
+@pytest.mark.anyio
+async def test_export_streams_csv_and_ndjson_with_list_filters(client: AsyncClient, monkeypatch):
+    from app.routers import transactions
+
+    monkeypatch.setattr(transactions, "EXPORT_CHUNK_SIZE", 2)
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    base = {"account_id": account_id, "type": "expense", "status": "confirmed"}
+    items = [
+        {**base, "amount": 1000 + day, "description": f"Kopi, \"susu\" {day}", "occurred_at": f"2025-06-{day:02d}T03:00:00"}
+        for day in range(1, 6)
+    ] + [{**base, "type": "income", "amount": 9000000, "description": "Gaji", "occurred_at": "2025-06-03T03:00:00"}]
+    res = await client.post("/transactions/bulk", json={"items": items, "classify": False}, headers=headers)
+    assert res.status_code == 200
+
+    res = await client.get("/transactions/export", params={"type": "expense"}, headers=headers)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert "attachment" in res.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(res.text)))
+    assert [r["description"] for r in rows] == [f"Kopi, \"susu\" {day}" for day in range(5, 0, -1)]
+    assert rows[0]["amount"] == "1005.00" and rows[0]["type"] == "expense"
+    assert rows[0]["occurred_at"] == "2025-06-05T03:00:00"
+
+    res = await client.get(
+        "/transactions/export",
+        params={"format": "ndjson", "start_date": "2025-06-02", "end_date": "2025-06-03", "q": "kopi"},
+        headers=headers,
+    )
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [(line["description"], line["amount"]) for line in lines] == [
+        ("Kopi, \"susu\" 3", 1003.0),
+        ("Kopi, \"susu\" 2", 1002.0),
+    ]
+    assert set(lines[0]) == set(transactions.EXPORT_FIELDS)
+
+    other = await client.get("/transactions/export", headers=await _auth_headers(client))
+    assert other.text.splitlines() == [",".join(transactions.EXPORT_FIELDS)]
+    bad = await client.get(
+        "/transactions/export", params={"start_date": "2025-06-05", "end_date": "2025-06-01"}, headers=headers
+    )
+    assert bad.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_bulk_create_skips_duplicates_by_fingerprint(client: AsyncClient, monkeypatch):
+    from app import bulk_ingest
+
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    base = {"account_id": account_id, "type": "expense", "occurred_at": "2025-07-01T03:00:00"}
+    items = [
+        {**base, "amount": 5000, "description": "Parkir Mall"},
+        {**base, "amount": 5000, "description": "parkir  mall!"},  # same normalized row, kept as occurrence 2
+        {**base, "amount": 12000, "description": "Kopi"},
+    ]
+    res = await client.post("/transactions/bulk", json={"items": items, "classify": False}, headers=headers)
+    assert len(res.json()["created"]) == 3 and res.json()["duplicates"] == []
+
+    # A retried upload (one extra row) only inserts what is new.
+    retry = items + [{**base, "amount": 5000, "description": "Parkir Mall"}]
+    res = await client.post("/transactions/bulk", json={"items": retry, "classify": False}, headers=headers)
+    assert res.json()["duplicates"] == [0, 1, 2]
+    assert [c["description"] for c in res.json()["created"]] == ["Parkir Mall"]
+
+    # Same row on another Jakarta day is not a duplicate.
+    res = await client.post(
+        "/transactions/bulk",
+        json={"items": [{**items[2], "occurred_at": "2025-07-01T18:00:00"}], "classify": False},
+        headers=headers,
+    )
+    assert len(res.json()["created"]) == 1
+
+    # A concurrent upload that wins the race trips the unique index; the INSERT is retried without it.
+    lookups = []
+    real_lookup = bulk_ingest._existing_fingerprints
+
+    def stale_first_lookup(db, user_id, fps):
+        lookups.append(len(fps))
+        return set() if len(lookups) == 1 else real_lookup(db, user_id, fps)
+
+    monkeypatch.setattr(bulk_ingest, "_existing_fingerprints", stale_first_lookup)
+    fresh = {**base, "amount": 777, "description": "Baru"}
+    res = await client.post("/transactions/bulk", json={"items": [fresh, items[2]], "classify": False}, headers=headers)
+    assert res.status_code == 200
+    assert res.json()["duplicates"] == [1]
+    assert [c["description"] for c in res.json()["created"]] == ["Baru"]
+    res = await client.get("/transactions", params={"page_size": 100}, headers=headers)
+    assert res.json()["pagination"]["total_items"] == 6
+
+
+@pytest.mark.anyio
+async def test_list_sparse_fields_and_lean_items_match_transaction_out(client: AsyncClient):
+    from app import schemas
+    from app.database import SessionLocal
+
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    base = {"account_id": account_id, "type": "expense", "status": "confirmed"}
+    items = [
+        {**base, "amount": 1500.5, "description": f"Item {day}", "occurred_at": f"2025-08-{day:02d}T03:04:05.123456"}
+        for day in range(1, 4)
+    ]
+    await client.post("/transactions/bulk", json={"items": items}, headers=headers)
+
+    res = await client.get("/transactions", headers=headers)
+    assert res.headers["etag"]
+    full = res.json()["items"]
+    db = SessionLocal()
+    try:
+        ids = [item["id"] for item in full]
+        orm_rows = {tx.id: tx for tx in db.query(models.Transaction).filter(models.Transaction.id.in_(ids))}
+        assert full == [schemas.TransactionOut.model_validate(orm_rows[i["id"]]).model_dump(mode="json") for i in full]
+    finally:
+        db.close()
+
+    res = await client.get(
+        "/transactions", params={"fields": "description, amount", "page_size": 2, "count": "none"}, headers=headers
+    )
+    data = res.json()
+    assert data["items"] == [
+        {"amount": 1500.5, "description": "Item 3", "id": full[0]["id"]},
+        {"amount": 1500.5, "description": "Item 2", "id": full[1]["id"]},
+    ]
+    res = await client.get(
+        "/transactions",
+        params={"fields": "description", "cursor": data["pagination"]["next_cursor"], "page_size": 2},
+        headers=headers,
+    )
+    assert [i["description"] for i in res.json()["items"]] == ["Item 1"]
+
+    res = await client.get("/transactions", params={"fields": "amount,user_id"}, headers=headers)
+    assert res.status_code == 400
+    assert "user_id" in res.json()["message"]
+
+
+@pytest.mark.anyio
+async def test_list_responses_match_declared_page_schemas(client: AsyncClient):
+    from app import schemas
+
+    headers = await _auth_headers(client)
+    account_id = await _make_account(client, headers)
+    tx = {
+        "account_id": account_id,
+        "type": "expense",
+        "amount": 12000,
+        "description": "Parkir",
+        "occurred_at": "2025-09-01T08:00:00",
+    }
+    assert (await client.post("/transactions", json=tx, headers=headers)).status_code == 201
+
+    # The list endpoint skips response_model validation, so pin both shapes here.
+    data = (await client.get("/transactions", headers=headers)).json()
+    page = schemas.TransactionsPage.model_validate(data)
+    assert len(page.items) == 1
+    assert set(data["items"][0]) == set(schemas.TransactionOut.model_fields) | {"id"}
+    assert set(data["pagination"]) == set(schemas.Pagination.model_fields)
+
+    data = (await client.get("/transactions", params={"fields": "amount"}, headers=headers)).json()
+    schemas.TransactionsSparsePage.model_validate(data)
+    assert data["items"] == [{"id": page.items[0].id, "amount": 12000}]
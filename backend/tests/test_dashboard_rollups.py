@@ -0,0 +1,269 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app, seed_default_categories
+from app.database import Base, SessionLocal, engine
+from app.routers import dashboard
+from app import models, rollups
+
+
+@pytest.fixture(scope="module")
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+def setup_module():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+    dashboard._summary_cache.clear()  # type: ignore[attr-defined]
+
+
+def test_local_date_of_converts_aware_values_and_reads_naive_ones_as_utc():
+    assert rollups.local_date_of(datetime(2024, 1, 1, 16, 30)) == date(2024, 1, 1)
+    assert rollups.local_date_of(datetime(2024, 1, 1, 17, 30)) == date(2024, 1, 2)
+    jakarta, new_york = timezone(timedelta(hours=7)), timezone(timedelta(hours=-5))
+    assert rollups.local_date_of(datetime(2024, 1, 1, 23, 30, tzinfo=jakarta)) == date(2024, 1, 1)
+    assert rollups.local_date_of(datetime(2024, 1, 1, 12, 0, tzinfo=new_york)) == date(2024, 1, 2)
+
+
+async def _setup_user(client: AsyncClient) -> tuple[dict[str, str], str, str]:
+    payload = {"email": f"rollup_{uuid4().hex}@example.com", "password": "secret123"}
+    await client.post("/auth/register", json=payload)
+    res = await client.post("/auth/login", json=payload)
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+    account_id = res.json()["id"]
+    res = await client.post("/categories", json={"name": "Food", "type": "expense"}, headers=headers)
+    return headers, account_id, res.json()["id"]
+
+
+async def _create_tx(client, headers, account_id, category_id, tx_type, amount, occurred_at) -> str:
+    res = await client.post(
+        "/transactions",
+        json={
+            "account_id": account_id,
+            "category_id": category_id,
+            "type": tx_type,
+            "amount": amount,
+            "currency": "IDR",
+            "description": f"{tx_type} {amount}",
+            "occurred_at": occurred_at,
+            "status": "confirmed",
+        },
+        headers=headers,
+    )
+    assert res.status_code == 201
+    return res.json()["id"]
+
+
+@pytest.mark.anyio
+async def test_summary_from_rollups_tracks_creates_and_deletes(client: AsyncClient):
+    headers, account_id, category_id = await _setup_user(client)
+    # 18:30 UTC on 9 March is 01:30 on 10 March in Jakarta.
+    await _create_tx(client, headers, account_id, category_id, "income", 100000, "2025-03-10T03:00:00Z")
+    await _create_tx(client, headers, account_id, category_id, "expense", 20000, "2025-03-09T18:30:00Z")
+    to_delete = await _create_tx(client, headers, account_id, None, "expense", 5000, "2025-03-10T09:00:00Z")
+    await _create_tx(client, headers, account_id, category_id, "expense", 7000, "2025-03-09T10:00:00Z")
+
+    res = await client.delete(f"/transactions/{to_delete}", headers=headers)
+    assert res.status_code == 204
+    assert (await client.delete(f"/transactions/{to_delete}", headers=headers)).status_code == 404
+
+    res = await client.get(
+        "/dashboard/summary",
+        params={"start_date": "2025-03-10", "end_date": "2025-03-10"},
+        headers=headers,
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert Decimal(str(data["totals"]["income"])) == Decimal("100000.00")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("20000.00")
+    assert [c["category_id"] for c in data["top_categories"]] == [category_id]
+
+
+def _rollup_snapshot(db, user_id=None) -> dict:
+    r = models.DailyRollup
+    query = db.query(r.user_id, r.local_date, r.category_id, r.type, r.amount_sum, r.tx_count).filter(r.tx_count != 0)
+    if user_id is not None:
+        query = query.filter(r.user_id == user_id)
+    totals: dict = {}
+    for user_id, local_date, category_id, tx_type, amount, count in query.all():
+        key = (user_id, local_date, category_id, tx_type)
+        prev = totals.get(key, (Decimal("0"), 0))
+        totals[key] = (prev[0] + Decimal(str(amount)), prev[1] + count)
+    return totals
+
+
+def test_rebuild_matches_incremental_rollups():
+    db = SessionLocal()
+    try:
+        before = _rollup_snapshot(db)
+        assert before
+        rollups.rebuild(db)
+        assert _rollup_snapshot(db) == before
+    finally:
+        db.close()
+
+
+@pytest.mark.anyio
+async def test_category_and_account_deletes_keep_rollups_in_sync(client: AsyncClient):
+    headers, account_id, food_id = await _setup_user(client)
+    res = await client.post("/accounts", json={"name": "Bank", "type": "bank", "currency": "IDR"}, headers=headers)
+    bank_id = res.json()["id"]
+    await _create_tx(client, headers, account_id, food_id, "expense", 3000, "2025-05-02T03:00:00Z")
+    await _create_tx(client, headers, account_id, None, "expense", 1000, "2025-05-02T04:00:00Z")
+    await _create_tx(client, headers, bank_id, food_id, "expense", 8000, "2025-05-03T03:00:00Z")
+    await _create_tx(client, headers, bank_id, None, "income", 50000, "2025-05-03T03:00:00Z")
+    params = {"start_date": "2025-05-01", "end_date": "2025-05-31"}
+    await client.get("/dashboard/summary", params=params, headers=headers)
+
+    assert (await client.delete(f"/categories/{food_id}", headers=headers)).status_code == 204
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    data = res.json()
+    assert [(c["category_id"], Decimal(str(c["amount"]))) for c in data["top_categories"]] == [
+        (None, Decimal("12000.00"))
+    ]
+
+    res = await client.delete(f"/accounts/{bank_id}", headers=headers)
+    assert res.status_code == 409 and res.json()["code"] == "CONFLICT"
+    res = await client.get("/transactions", params={"page_size": 100}, headers=headers)
+    assert len(res.json()["items"]) == 4
+    assert (await client.delete(f"/accounts/{bank_id}", params={"cascade": True}, headers=headers)).status_code == 204
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    data = res.json()
+    assert Decimal(str(data["totals"]["income"])) == Decimal("0")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("4000.00")
+
+    db = SessionLocal()
+    try:
+        user_id = db.query(models.Account.user_id).filter(models.Account.id == account_id).scalar()
+        r = models.DailyRollup
+        assert db.query(r).filter(r.category_id == food_id).count() == 0
+        before = _rollup_snapshot(db, user_id)
+        rollups.rebuild(db, user_id=user_id)
+        assert _rollup_snapshot(db, user_id) == before
+    finally:
+        db.close()
+
+    res = await client.post("/accounts", json={"name": "Empty", "type": "cash", "currency": "IDR"}, headers=headers)
+    assert (await client.delete(f"/accounts/{res.json()['id']}", headers=headers)).status_code == 204
+
+
+@pytest.mark.anyio
+async def test_summary_cache_invalidated_by_writes(client: AsyncClient):
+    headers, account_id, category_id = await _setup_user(client)
+    params = {"start_date": "2025-04-01", "end_date": "2025-04-30"}
+    await _create_tx(client, headers, account_id, category_id, "expense", 1000, "2025-04-02T03:00:00Z")
+
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    assert Decimal(str(res.json()["totals"]["expense"])) == Decimal("1000.00")
+    hits = dashboard._summary_cache.stats()["hits"]
+    await client.get("/dashboard/summary", params=params, headers=headers)
+    assert dashboard._summary_cache.stats()["hits"] == hits + 1
+
+    tx_id = await _create_tx(client, headers, account_id, category_id, "expense", 2500, "2025-04-03T03:00:00Z")
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    assert Decimal(str(res.json()["totals"]["expense"])) == Decimal("3500.00")
+
+    await client.delete(f"/transactions/{tx_id}", headers=headers)
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    assert Decimal(str(res.json()["totals"]["expense"])) == Decimal("1000.00")
+
+
+@pytest.mark.anyio
+async def test_timeseries_buckets_in_jakarta_and_caches_closed_buckets(client: AsyncClient):
+    headers, account_id, category_id = await _setup_user(client)
+    # Sunday 18:30 UTC is Monday 01:30 in Jakarta, so it lands in the second ISO week.
+    await _create_tx(client, headers, account_id, category_id, "expense", 4000, "2025-06-08T18:30:00Z")
+    await _create_tx(client, headers, account_id, category_id, "income", 9000, "2025-06-03T03:00:00Z")
+    await _create_tx(client, headers, account_id, category_id, "expense", 1000, "2025-07-15T03:00:00Z")
+
+    params = {"granularity": "week", "start_date": "2025-06-04", "end_date": "2025-06-15"}
+    res = await client.get("/dashboard/timeseries", params=params, headers=headers)
+    assert res.status_code == 200
+    buckets = res.json()["buckets"]
+    assert [(b["start_date"], b["end_date"]) for b in buckets] == [
+        ("2025-06-04", "2025-06-08"),
+        ("2025-06-09", "2025-06-15"),
+    ]
+    assert [Decimal(str(b["expense"])) for b in buckets] == [Decimal("0"), Decimal("4000")]
+    assert Decimal(str(buckets[0]["income"])) == Decimal("0")  # 3 June is before the range
+
+    params = {"granularity": "month", "start_date": "2025-05-20", "end_date": "2025-07-31"}
+    res = await client.get("/dashboard/timeseries", params=params, headers=headers)
+    months = res.json()["buckets"]
+    assert [b["start_date"] for b in months] == ["2025-05-20", "2025-06-01", "2025-07-01"]
+    assert [Decimal(str(b["balance"])) for b in months] == [Decimal("0"), Decimal("5000"), Decimal("-1000")]
+
+    hits = dashboard._closed_series_cache.stats()["hits"]
+    await client.get("/dashboard/timeseries", params=params, headers=headers)
+    assert dashboard._closed_series_cache.stats()["hits"] == hits + 1
+
+    # A backdated write invalidates closed buckets.
+    await _create_tx(client, headers, account_id, category_id, "expense", 500, "2025-07-20T03:00:00Z")
+    res = await client.get("/dashboard/timeseries", params=params, headers=headers)
+    assert Decimal(str(res.json()["buckets"][2]["expense"])) == Decimal("1500")
+
+
+@pytest.mark.anyio
+async def test_timeseries_recomputes_open_bucket_only(client: AsyncClient):
+    headers, account_id, category_id = await _setup_user(client)
+    today = rollups.today_local()
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    params = {"granularity": "day", "start_date": (today - timedelta(days=3)).isoformat(), "end_date": today.isoformat()}
+
+    await _create_tx(client, headers, account_id, category_id, "expense", 1000, now)
+    res = await client.get("/dashboard/timeseries", params=params, headers=headers)
+    assert Decimal(str(res.json()["buckets"][-1]["expense"])) == Decimal("1000")
+
+    hits = dashboard._closed_series_cache.stats()["hits"]
+    await _create_tx(client, headers, account_id, category_id, "expense", 250, now)
+    res = await client.get("/dashboard/timeseries", params=params, headers=headers)
+    buckets = res.json()["buckets"]
+    assert len(buckets) == 4
+    assert Decimal(str(buckets[-1]["expense"])) == Decimal("1250")
+    assert dashboard._closed_series_cache.stats()["hits"] == hits + 1  # closed days served from cache
+
+
+@pytest.mark.anyio
+async def test_summary_merges_cached_closed_months_exactly(client: AsyncClient):
+    headers, account_id, food_id = await _setup_user(client)
+    res = await client.post("/categories", json={"name": "Rent", "type": "expense"}, headers=headers)
+    rent_id = res.json()["id"]
+    # Food wins no single month but leads over the whole range.
+    await _create_tx(client, headers, account_id, rent_id, "expense", 5000, "2025-01-20T03:00:00Z")
+    await _create_tx(client, headers, account_id, food_id, "expense", 4000, "2025-01-25T03:00:00Z")
+    await _create_tx(client, headers, account_id, food_id, "expense", 4000, "2025-02-10T03:00:00Z")
+    await _create_tx(client, headers, account_id, rent_id, "expense", 1000, "2025-03-05T03:00:00Z")
+    await _create_tx(client, headers, account_id, food_id, "income", 20000, "2025-03-31T18:00:00Z")  # 1 April local
+
+    params = {"start_date": "2025-01-15", "end_date": "2025-04-10", "top_limit": 1}
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    data = res.json()
+    assert Decimal(str(data["totals"]["income"])) == Decimal("20000.00")
+    assert Decimal(str(data["totals"]["expense"])) == Decimal("14000.00")
+    assert [(c["category_id"], Decimal(str(c["amount"]))) for c in data["top_categories"]] == [
+        (food_id, Decimal("8000.00"))
+    ]
+
+    # Different range over the same closed months: Feb and Mar come from the month cache.
+    hits = dashboard._month_cache.stats()["hits"]
+    res = await client.get(
+        "/dashboard/summary", params={"start_date": "2025-02-01", "end_date": "2025-03-31"}, headers=headers
+    )
+    assert Decimal(str(res.json()["totals"]["expense"])) == Decimal("5000.00")
+    assert dashboard._month_cache.stats()["hits"] == hits + 2
+
+    # A backdated write into a cached month is visible immediately.
+    await _create_tx(client, headers, account_id, rent_id, "expense", 9000, "2025-02-14T03:00:00Z")
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    top = res.json()["top_categories"][0]
+    assert (top["category_id"], top["name"]) == (rent_id, "Rent")
+    assert Decimal(str(top["amount"])) == Decimal("15000.00")
@@ -0,0 +1,101 @@
+import socket
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app, seed_default_categories
+from app.database import Base, engine
+from app.routers import dashboard
+
+
+@pytest.fixture(scope="module")
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+def setup_module():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+
+
+async def _auth_headers(client: AsyncClient) -> dict[str, str]:
+    payload = {"email": f"etag_{uuid4().hex}@example.com", "password": "secret123"}
+    await client.post("/auth/register", json=payload)
+    res = await client.post("/auth/login", json=payload)
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+@pytest.mark.anyio
+async def test_conditional_get_returns_304_until_a_write(client: AsyncClient):
+    headers = await _auth_headers(client)
+    res = await client.get("/accounts", headers=headers)
+    assert res.status_code == 200
+    etag = res.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    for path in ("/accounts", "/categories", "/transactions"):
+        res = await client.get(path, headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 304, path
+        assert res.content == b""
+        assert res.headers["ETag"] == etag
+
+    res = await client.post("/accounts", json={"name": "Cash", "type": "cash", "currency": "IDR"}, headers=headers)
+    assert res.status_code == 201
+    res = await client.get("/accounts", headers={**headers, "If-None-Match": etag})
+    assert res.status_code == 200
+    assert len(res.json()) == 1
+    assert res.headers["ETag"] != etag
+
+
+@pytest.mark.anyio
+async def test_summary_304_skips_cache_and_queries(client: AsyncClient):
+    headers = await _auth_headers(client)
+    params = {"start_date": "2025-01-01", "end_date": "2025-01-31"}
+    res = await client.get("/dashboard/summary", params=params, headers=headers)
+    etag = res.headers["ETag"]
+    stats = dashboard._summary_cache.stats()
+
+    res = await client.get("/dashboard/summary", params=params, headers={**headers, "If-None-Match": f"\"x\", {etag}"})
+    assert res.status_code == 304
+    after = dashboard._summary_cache.stats()
+    assert (after["hits"], after["misses"]) == (stats["hits"], stats["misses"])
+
+    # Another user's version is independent.
+    other = await _auth_headers(client)
+    res = await client.get("/dashboard/summary", params=params, headers={**other, "If-None-Match": etag})
+    assert res.status_code == 200
+
+
+@pytest.mark.anyio
+async def test_no_etag_when_the_version_is_not_shared(client: AsyncClient):
+    from app import cache
+    from app.config import get_settings
+
+    headers = await _auth_headers(client)
+    etag = (await client.get("/accounts", headers=headers)).headers["ETag"]
+
+    settings = get_settings()
+    settings.web_concurrency, original = 4, settings.web_concurrency  # per-process counters, several workers
+    try:
+        res = await client.get("/accounts", headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert "ETag" not in res.headers
+        res = await client.get("/transactions", headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200 and "ETag" not in res.headers
+    finally:
+        settings.web_concurrency = original
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    cache.set_backend(cache.RedisBackend("redis://127.0.0.1:%d/0" % port, timeout=0.1))  # unreachable
+    try:
+        res = await client.get("/accounts", headers={**headers, "If-None-Match": etag})
+        assert res.status_code == 200
+        assert "ETag" not in res.headers
+    finally:
+        cache.set_backend(None)
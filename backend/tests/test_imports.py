@@ -0,0 +1,211 @@
+import tempfile
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app, seed_default_categories
+from app.config import get_settings
+from app.database import Base, SessionLocal, engine
+from app.import_jobs import _parse_amount, excel_supported, import_worker, process_job
+from app.routers import dashboard
+from app import models
+
+
+@pytest.fixture(scope="module")
+async def client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://testserver") as client:
+        yield client
+
+
+def setup_module():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    seed_default_categories()
+    dashboard._summary_cache.clear()  # type: ignore[attr-defined]
+    get_settings().import_dir = tempfile.mkdtemp(prefix="imports-")
+
+
+async def _setup_user(client: AsyncClient) -> tuple[dict[str, str], str]:
+    payload = {"email": f"import_{uuid4().hex}@example.com", "password": "secret123"}
+    await client.post("/auth/register", json=payload)
+    res = await client.post("/auth/login", json=payload)
+    headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    res = await client.post("/accounts", json={"name": "BCA", "type": "bank", "currency": "IDR"}, headers=headers)
+    return headers, res.json()["id"]
+
+
+async def _upload(client: AsyncClient, headers, content: str, filename: str = "mutasi.csv", **data):
+    return await client.post(
+        "/imports", files={"file": (filename, content.encode(), "text/csv")}, data=data, headers=headers
+    )
+
+
+@pytest.mark.anyio
+async def test_import_csv_creates_rows_and_reports_row_errors(client: AsyncClient):
+    headers, account_id = await _setup_user(client)
+    content = "\n".join(
+        [
+            "Date,Description,Amount,Type,Account,Category",
+            "2025-04-01,Gaji April,10000000,income,BCA,Gaji",
+            "02/04/2025,Nasi padang,\"Rp 25,000\",expense,bca,Makan",
+            "03/04/2025,Grab bike,-18000,,BCA,",
+            "2025-04-04,Kopi,abc,expense,BCA,",
+            "2025-04-05,Bensin,50000,expense,Mandiri,",
+            "",
+            "31/02/2025,Tanggal salah,1000,expense,BCA,",
+            "2025-04-06,Listrik,300000,expense,BCA,Hiburan",
+        ]
+    )
+    res = await _upload(client, headers, content)
+    assert res.status_code == 202
+    job = res.json()
+    assert job["status"] in {"pending", "running", "completed"}
+    assert import_worker.drain()
+
+    res = await client.get(f"/imports/{job['id']}", headers=headers)
+    job = res.json()
+    assert job["status"] == "completed"
+    assert (job["total_rows"], job["processed_rows"], job["created_rows"], job["failed_rows"]) == (8, 8, 3, 4)
+
+    res = await client.get(f"/imports/{job['id']}/errors", headers=headers)
+    errors = res.json()
+    assert [e["row"] for e in errors["items"]] == [4, 5, 7, 8]
+    assert "amount" in errors["items"][0]["message"]
+    assert "account" in errors["items"][1]["message"]
+    assert "date" in errors["items"][2]["message"]
+    assert "category" in errors["items"][3]["message"]
+    assert errors["total"] == 4 and errors["truncated"] is False
+
+    res = await client.get("/transactions", params={"page_size": 100}, headers=headers)
+    items = {item["description"]: item for item in res.json()["items"]}
+    assert set(items) == {"Gaji April", "Nasi padang", "Grab bike"}
+    assert all(item["source"] == "import" and item["account_id"] == account_id for item in items.values())
+    assert items["Grab bike"]["type"] == "expense" and items["Grab bike"]["amount"] == 18000
+    res = await client.get(
+        "/dashboard/summary", params={"start_date": "2025-04-01", "end_date": "2025-04-30"}, headers=headers
+    )
+    totals = res.json()["totals"]
+    assert Decimal(str(totals["income"])) == Decimal("10000000")
+    assert Decimal(str(totals["expense"])) == Decimal("43000")
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("50.000", Decimal("50000")),
+        ("Rp 50.000", Decimal("50000")),
+        ("1.250.000", Decimal("1250000")),
+        ("1.250.000,50", Decimal("1250000.50")),
+        ("1,250.50", Decimal("1250.50")),
+        ("Rp 25,000", Decimal("25000")),
+        ("12.5", Decimal("12.5")),
+        ("-18000", Decimal("-18000")),
+    ],
+)
+def test_parse_amount_reads_indonesian_and_english_grouping(text, expected):
+    assert _parse_amount(text) == expected
+
+
+@pytest.mark.parametrize("text", ["1,250,50", "1.25.000", "12,345.678,9", "abc", ""])
+def test_parse_amount_rejects_ambiguous_values(text):
+    with pytest.raises(ValueError):
+        _parse_amount(text)
+
+
+def _write_csv(lines: list[str]) -> str:
+    handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+    handle.write("\n".join(lines))
+    handle.close()
+    return handle.name
+
+
+@pytest.mark.anyio
+async def test_import_resumes_abandoned_job_after_committed_chunks(client: AsyncClient):
+    headers, account_id = await _setup_user(client)
+    rows = [f"2025-03-{day:02d},Warteg {day},{day * 1000},expense" for day in range(1, 8)]
+    rows[5] = rows[1]  # row 6 repeats row 2: a second, genuine purchase
+    header = "date,description,amount,type"
+
+    db = SessionLocal()
+    try:
+        user_id = db.query(models.Account.user_id).filter(models.Account.id == account_id).scalar()
+        # A previous worker committed the first 3 rows, then died.
+        committed = models.ImportJob(
+            user_id=user_id, source="csv", file_path=_write_csv([header] + rows[:3]), default_account_id=account_id
+        )
+        job = models.ImportJob(
+            user_id=user_id,
+            source="csv",
+            file_path=_write_csv([header] + rows),
+            default_account_id=account_id,
+            status=models.ImportStatus.running,
+            processed_rows=3,
+        )
+        db.add_all([committed, job])
+        db.commit()
+        assert process_job(db, committed.id).created_rows == 3
+        assert process_job(db, job.id, chunk_size=2) is None  # still held by the other worker
+        job.updated_at = datetime.utcnow() - timedelta(hours=1)
+        db.commit()
+        job = process_job(db, job.id, chunk_size=2)
+        assert job.status == models.ImportStatus.completed
+        assert (job.processed_rows, job.created_rows, job.failed_rows, job.duplicate_rows) == (7, 4, 0, 0)
+        descriptions = sorted(d for (d,) in db.query(models.Transaction.description).filter_by(user_id=user_id))
+        assert descriptions == sorted(f"Warteg {day}" for day in (1, 2, 2, 3, 4, 5, 7))
+    finally:
+        db.close()
+
+
+@pytest.mark.anyio
+async def test_reimporting_a_statement_reports_duplicates(client: AsyncClient):
+    headers, account_id = await _setup_user(client)
+    content = "date,description,amount,type\n2025-02-01,Parkir,5000,expense\n2025-02-01,Parkir,5000,expense\n"
+    first = (await _upload(client, headers, content, account_id=account_id)).json()
+    second = (await _upload(client, headers, content + "2025-02-02,Tol,9000,expense\n", account_id=account_id)).json()
+    assert import_worker.drain()
+
+    first = (await client.get(f"/imports/{first['id']}", headers=headers)).json()
+    second = (await client.get(f"/imports/{second['id']}", headers=headers)).json()
+    assert (first["created_rows"], first["duplicate_rows"]) == (2, 0)
+    assert (second["created_rows"], second["duplicate_rows"], second["failed_rows"]) == (1, 2, 0)
+
+
+@pytest.mark.anyio
+async def test_import_rejects_bad_uploads_and_fails_on_missing_columns(client: AsyncClient):
+    headers, account_id = await _setup_user(client)
+    res = await _upload(client, headers, "date,amount\n", filename="notes.txt")
+    assert res.status_code == 400
+    res = await _upload(client, headers, "date,description,amount\n", account_id="not-mine")
+    assert res.status_code == 400
+
+    settings = get_settings()
+    settings.import_max_mb, original = 0, settings.import_max_mb
+    try:
+        res = await _upload(client, headers, "date,description,amount\n")
+        assert res.status_code == 413
+        # Far past the limit: refused from Content-Length before the form is parsed.
+        res = await _upload(client, headers, "date,description,amount\n" + "2025-01-01,x,1\n" * 20_000)
+        assert res.status_code == 413
+        assert res.json()["code"] == "PAYLOAD_TOO_LARGE"
+    finally:
+        settings.import_max_mb = original
+
+    if not excel_supported():
+        res = await _upload(client, headers, "not a workbook", filename="mutasi.xlsx")
+        assert res.status_code == 400
+
+    res = await _upload(client, headers, "tanggal,keterangan,nominal\n2025-01-01,x,1\n", account_id=account_id)
+    assert res.status_code == 202
+    assert import_worker.drain()
+    job = (await client.get(f"/imports/{res.json()['id']}", headers=headers)).json()
+    assert job["status"] == "failed"
+    assert "Missing required columns" in job["error"]
+
+    other_headers, _ = await _setup_user(client)
+    assert (await client.get(f"/imports/{job['id']}", headers=other_headers)).status_code == 404
+    res = await client.get("/imports", headers=headers)
+    assert [j["id"] for j in res.json()] == [job["id"]]
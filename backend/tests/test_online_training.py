@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from uuid import uuid4
+
+import pytest
+
+from app.main import app  # noqa: F401  (creates tables)
+from app import models
+from app.ai import category_classifier as cc
+from app.ai import online_training
+from app.database import SessionLocal
+
+
+@pytest.fixture
+def artifacts(tmp_path, monkeypatch):
+    monkeypatch.setattr(cc, "ARTIFACT_DIR", tmp_path)
+    monkeypatch.setattr(cc, "MODEL_PATH", tmp_path / "category_model.pkl")
+    monkeypatch.setattr(cc, "META_PATH", tmp_path / "category_meta.json")
+    monkeypatch.setattr(cc, "MODEL_REVALIDATE_SECONDS", 0.0)
+    monkeypatch.setattr(online_training, "ONLINE_STATE_PATH", tmp_path / "category_online.pkl")
+    cc.reset_model_cache()
+    yield tmp_path
+    cc.reset_model_cache()
+
+
+def _global_category(db, name: str) -> models.Category:
+    category = models.Category(user_id=None, name=f"{name} {uuid4().hex[:8]}", type=models.TransactionType.expense)
+    db.add(category)
+    db.flush()
+    return category
+
+
+def _seed_corrections(db, n: int, categories=None, base=None) -> tuple[str, str]:
+    user = models.User(email=f"online_{uuid4().hex}@example.com", password_hash="x")
+    db.add(user)
+    db.flush()
+    account = models.Account(user_id=user.id, name="Cash", type="cash")
+    db.add(account)
+    food, fuel = categories or (_global_category(db, "Food"), _global_category(db, "Fuel"))
+    db.flush()
+    base = base or datetime.utcnow()
+    for i in range(n):
+        is_fuel = i % 2 == 0
+        db.add(
+            models.Transaction(
+                user_id=user.id,
+                account_id=account.id,
+                category_id=fuel.id if is_fuel else food.id,
+                predicted_category_id=food.id if is_fuel else fuel.id,
+                predicted_confidence=Decimal("0.6"),
+                type=models.TransactionType.expense,
+                amount=Decimal("10000"),
+                description="Pertamina isi bensin" if is_fuel else "Nasi padang makan siang",
+                occurred_at=base,
+                updated_at=base + timedelta(seconds=i),
+                status=models.TransactionStatus.confirmed,
+            )
+        )
+    db.commit()
+    return food, fuel
+
+
+def test_consume_corrections_is_incremental_and_publishes(artifacts):
+    db = SessionLocal()
+    try:
+        food, fuel = _seed_corrections(db, 40)
+        food_id, fuel_id = food.id, fuel.id
+        # No saved state: bootstrap from the whole history instead of publishing corrections alone.
+        stats = online_training.consume_corrections(db, chunk_size=16)
+        assert stats["rebuilt"] is True
+        assert stats["rows_used"] >= 40
+        assert stats["model_version"].startswith("stream-")
+
+        watermark = online_training.IncrementalCategoryModel.load().watermark[0]
+        _seed_corrections(db, 40, categories=(food, fuel), base=watermark + timedelta(seconds=1))
+        stats = online_training.consume_corrections(db, chunk_size=16)
+        assert stats["rebuilt"] is False
+        assert (stats["rows_read"], stats["rows_used"]) == (40, 40)
+        assert stats["chunks"] == 3
+        assert stats["model_version"].startswith("online-")
+
+        model = cc.load_model(force_reload=True)
+        assert model.model_version == stats["model_version"]
+        assert model.predict("bensin pertamina").top_k[0][0] == fuel_id
+        assert model.predict("makan nasi padang").top_k[0][0] == food_id
+
+        again = online_training.consume_corrections(db)
+        assert again["rows_read"] == 0
+        assert again["model_version"] is None
+
+        # A global category created after the state was built forces a rebuild with a grown label set.
+        newer = _global_category(db, "Parkir")
+        db.commit()
+        stats = online_training.consume_corrections(db)
+        assert stats["rebuilt"] is True
+        assert newer.id in online_training.IncrementalCategoryModel.load().label_encoder
+    finally:
+        db.close()
+
+
+def test_train_from_database_streams_in_chunks(artifacts):
+    db = SessionLocal()
+    try:
+        _seed_corrections(db, 30)
+        owner = models.User(email=f"online_{uuid4().hex}@example.com", password_hash="x")
+        db.add(owner)
+        db.flush()
+        private = models.Category(user_id=owner.id, name="Rahasia", type=models.TransactionType.expense)
+        db.add(private)
+        db.flush()
+        _seed_corrections(db, 4, categories=(private, private))
+        stats = online_training.train_from_database(db, chunk_size=8, epochs=2)
+        assert stats["rows"] >= 60
+        assert stats["chunks"] >= 8
+        assert stats["rows_per_sec"] > 0
+        assert stats["model_version"].startswith("stream-")
+        assert cc.load_model(force_reload=True).model_version == stats["model_version"]
+
+        state = online_training.IncrementalCategoryModel.load()
+        assert state.watermark[0] is not None
+        assert private.id not in state.label_encoder
+        assert online_training.consume_corrections(db)["rows_read"] == 0
+    finally:
+        db.close()